@@ -1,2 +1,4 @@
 # Config module
+from app.config.settings import Settings, settings
 
+__all__ = ["Settings", "settings"]
@@ -1,5 +1,5 @@
 import os
-from typing import List
+from typing import Dict, List
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -7,14 +7,140 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 class Settings(BaseSettings):
     APP_NAME: str = "Playlist-KE Backend"
     API_V1_PREFIX: str = "/api/v1"
+    # "production" verifies the schema version at startup instead of creating tables
+    ENVIRONMENT: str = "development"
     
     # Database
     DATABASE_URL: str = "sqlite:///./playlist_ke.db"
     
+    # Read replicas: GET handlers read from these, everything else uses DATABASE_URL
+    DATABASE_REPLICA_URLS: List[str] = []
+    REPLICA_HEALTH_CHECK_INTERVAL_SECONDS: int = 30
+    # After a client writes, its reads stay on the primary for this long
+    READ_YOUR_WRITES_WINDOW_SECONDS: int = 5
+    
+    # Connection pool (ignored for in-memory SQLite)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_SECONDS: int = 30
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_POOL_PRE_PING: bool = False
+    
+    # SQLite performance profile (ignored for other databases)
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_MMAP_SIZE: int = 268435456  # 256 MiB
+    SQLITE_CACHE_SIZE: int = -65536  # negative values are KiB, i.e. 64 MiB
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_SERIALIZE_WRITES: bool = True
+    
+    # Profiling - can be changed at runtime through the admin API
+    SQL_PROFILING_ENABLED: bool = False
+    SLOW_QUERY_THRESHOLD_MS: float = 100
+    SLOW_QUERY_EXPLAIN: bool = True
+    SERVER_TIMING_ENABLED: bool = False
+    
+    # Analytics partitions: daily rows in months older than these ages are compacted
+    ANALYTICS_WEEKLY_AFTER_MONTHS: int = 3
+    ANALYTICS_MONTHLY_AFTER_MONTHS: int = 12
+    # Partitions older than this many months are dropped (0 keeps everything);
+    # daily rollups, and so trends, are kept
+    ANALYTICS_RETENTION_MONTHS: int = 36
+    
+    # Background job scheduler (app.services.scheduler_service)
+    SCHEDULER_ENABLED: bool = True
+    SCHEDULER_MAX_WORKERS: int = 2
+    # Default lease per job; should outlast the job's longest run
+    SCHEDULER_LEASE_SECONDS: int = 3600
+    # Job schedules: intervals in seconds (0 disables) or cron expressions in UTC ("" disables)
+    MONTHLY_LISTENERS_INTERVAL_SECONDS: int = 900
+    MONTHLY_LISTENERS_BATCH_SIZE: int = 500
+    ANALYTICS_ROLLUP_INTERVAL_SECONDS: int = 300
+    PLAYLIST_RECONCILE_CRON: str = "30 3 * * *"
+    ANALYTICS_MAINTENANCE_CRON: str = "0 4 * * *"
+    EXPORT_CRON: str = ""
+    # Purge of soft-deleted artists and songs: rows per DELETE, sleep between
+    # batches, and the longest a single run may take
+    PURGE_INTERVAL_SECONDS: int = 60
+    PURGE_BATCH_SIZE: int = 500
+    PURGE_PAUSE_SECONDS: float = 0.1
+    PURGE_MAX_SECONDS: float = 50
+    # Change log behind /sync: entries older than this are pruned daily, and clients
+    # with older tokens get a full sync
+    CHANGE_LOG_RETENTION_DAYS: int = 30
+    CHANGE_LOG_RETENTION_CRON: str = "45 4 * * *"
+    # Deletion of expired refresh tokens
+    REFRESH_TOKEN_CLEANUP_CRON: str = "15 5 * * *"
+    
+    # Parquet snapshot export (python -m app.services.export_service)
+    EXPORT_DIR: str = "./exports"
+    EXPORT_BATCH_SIZE: int = 50000
+    
+    # Rate limiting: token buckets per user (from the JWT) or client IP.
+    # Limits are "<requests>/<second|minute|hour|day>"; policies are keyed by
+    # "METHOD /path" or "/path", with a trailing * for prefixes; "" exempts a route
+    RATE_LIMIT_ENABLED: bool = True
+    # Routes without a policy ("" = unlimited)
+    RATE_LIMIT_DEFAULT: str = "600/minute"
+    RATE_LIMIT_POLICIES: Dict[str, str] = {
+        "POST /api/v1/auth/login": "10/minute",
+        "POST /api/v1/auth/register": "5/minute",
+        "GET /api/v1/songs/trending": "60/minute",
+        "GET /api/v1/charts/weekly": "60/minute",
+        "/health": "",
+        "/metrics*": "",
+    }
+    # Active keys kept per process; least recently used buckets are evicted
+    RATE_LIMIT_MAX_KEYS: int = 100000
+    # Shared buckets for multi-worker deployments, e.g. "sqlite:///./ratelimit.db" ("" = per process)
+    RATE_LIMIT_STORAGE_URL: str = ""
+    
+    # Single-flight: concurrent identical requests to these routes share one computation
+    SINGLE_FLIGHT_ROUTES: List[str] = ["charts.weekly", "songs.trending", "analytics.overview"]
+    # Waiters give up with 503 after this long; the computation itself carries on
+    SINGLE_FLIGHT_TIMEOUT_SECONDS: float = 10
+    
+    # Per-process cache of songs, artists and playlists by id, shared by single and
+    # batch gets and invalidated on commit; other workers' writes arrive through the outbox
+    ENTITY_CACHE_MAX_ENTRIES: int = 50000
+    ENTITY_CACHE_TTL_SECONDS: float = 30  # 0 disables the cache
+    # Most ids accepted by the /batch endpoints
+    BATCH_MAX_IDS: int = 1000
+    
+    # Memory-mapped song/artist catalog shared by the workers on a host ("" = disabled);
+    # rebuilt by the scheduler, checked for a new file every CHECK seconds
+    CATALOG_SNAPSHOT_PATH: str = ""
+    CATALOG_SNAPSHOT_INTERVAL_SECONDS: int = 300
+    CATALOG_SNAPSHOT_CHECK_SECONDS: float = 1
+    
+    # Delta sync (/sync): rows per page by default and at most
+    SYNC_PAGE_SIZE: int = 1000
+    SYNC_MAX_PAGE_SIZE: int = 5000
+    
+    # Change outbox: fans change_log records out to in-process consumers, polling every
+    # POLL seconds and right after local commits; BATCH is records per handler call
+    OUTBOX_ENABLED: bool = True
+    OUTBOX_POLL_SECONDS: float = 1.0
+    OUTBOX_BATCH_SIZE: int = 500
+    
+    # Live push (/live/sse, /live/ws): connections and topics per connection a worker
+    # accepts, messages buffered per connection before it is resent snapshots, seconds
+    # between reloads of a topic without a change, and SSE keep-alive comments
+    LIVE_MAX_CONNECTIONS: int = 50000
+    LIVE_MAX_TOPICS: int = 20
+    LIVE_BUFFER_SIZE: int = 32
+    LIVE_REFRESH_SECONDS: float = 30
+    LIVE_HEARTBEAT_SECONDS: float = 25
+    LIVE_TRENDING_LIMIT: int = 10
+    # Threads loading topic state, apart from the request threadpool
+    LIVE_LOAD_WORKERS: int = 2
+    
     # Security
     SECRET_KEY: str = "your-secret-key-change-in-production"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    # Refresh tokens rotate on every use; each new one is valid for this long
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 30
     
     # CORS
     CORS_ORIGINS: List[str] = ["http://localhost:5173", "http://localhost:3000"]
@@ -1,27 +1,102 @@
+from fastapi import Request
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-import os
+from app.config.settings import settings
+from app.database.instrumentation import InstrumentedQueuePool, instrument_pool
+from app.database.routing import ReplicaPool, RoutingSession, WriteStickiness, client_key
+from app.database.soft_delete import install_soft_delete_filter
+from app.database.sqlite import WriteSerializer, apply_sqlite_profile, install_write_serializer, is_sqlite
 
-# Database URL - use environment variable or default
-DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./playlist_ke.db")
+# Database URL - DATABASE_URL environment variable or .env, see Settings
+DATABASE_URL = settings.DATABASE_URL
 
-# Create engine
-engine = create_engine(
-    DATABASE_URL, 
-    connect_args={"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
+
+def _pool_options(url: str) -> dict:
+    """Pool sizing from Settings; in-memory SQLite keeps its single-connection pool"""
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        return {}
+    return {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+def _create_engine(url: str):
+    new_engine = create_engine(
+        url, 
+        connect_args={"check_same_thread": False} if is_sqlite(url) else {},
+        **_pool_options(url)
+    )
+    instrument_pool(new_engine)
+    if is_sqlite(url):
+        apply_sqlite_profile(
+            new_engine,
+            journal_mode=settings.SQLITE_JOURNAL_MODE,
+            synchronous=settings.SQLITE_SYNCHRONOUS,
+            mmap_size=settings.SQLITE_MMAP_SIZE,
+            cache_size=settings.SQLITE_CACHE_SIZE,
+            busy_timeout_ms=settings.SQLITE_BUSY_TIMEOUT_MS
+        )
+    return new_engine
+
+
+# Create engines: the primary takes all writes, replicas serve GET handlers
+engine = _create_engine(DATABASE_URL)
+replica_pool = ReplicaPool(
+    [_create_engine(url) for url in settings.DATABASE_REPLICA_URLS],
+    health_check_interval=settings.REPLICA_HEALTH_CHECK_INTERVAL_SECONDS
 )
+write_stickiness = WriteStickiness(settings.READ_YOUR_WRITES_WINDOW_SECONDS)
 
 # Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = sessionmaker(
+    class_=RoutingSession,
+    autocommit=False,
+    autoflush=False,
+    primary=engine,
+    replicas=replica_pool,
+    stickiness=write_stickiness
+)
+
+# SQLite has a single writer: queue writing sessions instead of racing for the file lock
+write_serializer = WriteSerializer()
+if is_sqlite(DATABASE_URL) and settings.SQLITE_SERIALIZE_WRITES:
+    install_write_serializer(
+        RoutingSession,
+        write_serializer,
+        timeout=settings.SQLITE_BUSY_TIMEOUT_MS / 1000
+    )
+
+# Soft-deleted artists and songs are invisible to ORM reads
+install_soft_delete_filter(RoutingSession)
 
 # Base class for models
 Base = declarative_base()
 
+READ_METHODS = ("GET", "HEAD")
+
+
+def get_db(request: Request = None):
+    """Dependency to get database session.
 
-def get_db():
-    """Dependency to get database session"""
+    Sessions for GET/HEAD requests read from a replica unless the client wrote
+    within the read-your-writes window; all other requests use the primary.
+    """
     db = SessionLocal()
+    if request is not None:
+        key = client_key(
+            request.headers.get("authorization"),
+            request.client.host if request.client else None
+        )
+        db.info["client_key"] = key
+        db.info["read_only"] = request.method in READ_METHODS and not write_stickiness.is_sticky(key)
     try:
         yield db
     finally:
@@ -29,6 +104,10 @@ def get_db():
 
 
 def init_db():
-    """Initialize database tables"""
-    Base.metadata.create_all(bind=engine)
+    """Create tables in development; only verify the schema version in production"""
+    from app.database.schema import check_schema_version, upgrade
 
+    if settings.ENVIRONMENT == "production":
+        check_schema_version(engine)
+    else:
+        upgrade(engine)
@@ -0,0 +1,22 @@
+"""Portable SQL functions compiled per dialect."""
+from sqlalchemy import Date
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+
+class day_of(FunctionElement):
+    """Calendar day of a datetime column, as a DATE"""
+    type = Date()
+    name = "day_of"
+    inherit_cache = True
+
+
+@compiles(day_of)
+def _day_of_default(element, compiler, **kw):
+    return f"CAST({compiler.process(element.clauses, **kw)} AS DATE)"
+
+
+@compiles(day_of, "sqlite")
+def _day_of_sqlite(element, compiler, **kw):
+    # SQLite has no DATE type; date() yields the 'YYYY-MM-DD' text the Date type stores
+    return f"date({compiler.process(element.clauses, **kw)})"
@@ -0,0 +1,160 @@
+import time
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+
+class PoolStats:
+    """Counters for one connection pool, updated by pool events"""
+
+    def __init__(self):
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.in_use = 0
+        self.max_in_use = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record_wait(self, seconds: float):
+        self.wait_seconds_total += seconds
+        if seconds > self.wait_seconds_max:
+            self.wait_seconds_max = seconds
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that times how long callers wait for a connection"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.stats.timeouts += 1
+            raise
+        finally:
+            self.stats.record_wait(time.perf_counter() - start)
+
+
+def instrument_pool(engine: Engine):
+    """Attach checkout/checkin listeners to an engine's pool"""
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        _stats(engine).connects += 1
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        stats = _stats(engine)
+        stats.checkouts += 1
+        stats.in_use += 1
+        if stats.in_use > stats.max_in_use:
+            stats.max_in_use = stats.in_use
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        stats = _stats(engine)
+        stats.checkins += 1
+        stats.in_use = max(stats.in_use - 1, 0)
+
+    @event.listens_for(engine, "invalidate")
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        _stats(engine).invalidations += 1
+
+
+def _stats(engine: Engine) -> PoolStats:
+    pool = engine.pool
+    if not hasattr(pool, "stats"):
+        pool.stats = PoolStats()
+    return pool.stats
+
+
+def pool_snapshot(engine: Engine) -> dict:
+    """Current pool configuration, occupancy and cumulative counters"""
+    pool = engine.pool
+    stats = _stats(engine)
+    snapshot = {
+        "pool_class": type(pool).__name__,
+        "in_use": stats.in_use,
+        "max_in_use": stats.max_in_use,
+        "connects": stats.connects,
+        "checkouts": stats.checkouts,
+        "checkins": stats.checkins,
+        "invalidations": stats.invalidations,
+        "timeouts": stats.timeouts,
+        "checkout_wait_ms_total": round(stats.wait_seconds_total * 1000, 3),
+        "checkout_wait_ms_max": round(stats.wait_seconds_max * 1000, 3),
+    }
+    if isinstance(pool, QueuePool):
+        snapshot.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            # QueuePool reports negative overflow until the base pool is full
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": pool._max_overflow,
+            "timeout_seconds": pool.timeout(),
+        })
+    return snapshot
+
+
+class RequestDBStats:
+    """Queries executed and time spent in the database for one request"""
+
+    __slots__ = ("query_count", "db_time")
+
+    def __init__(self):
+        self.query_count = 0
+        self.db_time = 0.0
+
+
+class DBTimeTotals:
+    """Process-wide totals of per-request database time"""
+
+    def __init__(self):
+        self.requests = 0
+        self.queries = 0
+        self.db_time = 0.0
+        self.db_time_max = 0.0
+
+    def add(self, request_stats: RequestDBStats):
+        self.requests += 1
+        self.queries += request_stats.query_count
+        self.db_time += request_stats.db_time
+        if request_stats.db_time > self.db_time_max:
+            self.db_time_max = request_stats.db_time
+
+    def snapshot(self) -> dict:
+        return {
+            "requests": self.requests,
+            "queries": self.queries,
+            "db_time_ms_total": round(self.db_time * 1000, 3),
+            "db_time_ms_avg": round(self.db_time * 1000 / self.requests, 3) if self.requests else 0.0,
+            "db_time_ms_max": round(self.db_time_max * 1000, 3),
+        }
+
+
+request_db_stats: ContextVar[Optional[RequestDBStats]] = ContextVar("request_db_stats", default=None)
+db_time_totals = DBTimeTotals()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info["query_start"] = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info.pop("query_start", time.perf_counter())
+    stats = request_db_stats.get()
+    if stats is not None:
+        stats.query_count += 1
+        stats.db_time += elapsed
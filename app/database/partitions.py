@@ -0,0 +1,202 @@
+"""Monthly partitions of the analytics table.
+
+Analytics rows live in one table per calendar month, ``analytics_pYYYY_MM``, created
+on first write. This works on every dialect (on PostgreSQL the same layout could be
+swapped for native declarative partitions). Reads union only the partitions that
+overlap the requested range, plus the legacy ``analytics`` table until its rows
+have been migrated.
+
+Each partition has a ``granularity`` column: rows are written as "day" and the
+compaction job later rolls old months up into "week" and "month" rows.
+
+Writes only append, so a partition's max id changes whenever rows are added.
+Jobs that delete or replace rows (compaction, purges, legacy clean-up) also call
+``mark_rewritten``, and ``version`` pairs the two into a cheap change marker.
+"""
+import re
+import threading
+import uuid
+from datetime import date, datetime, time, timezone
+from time import monotonic
+from typing import Callable, Dict, Iterable, List, Optional
+from sqlalchemy import (
+    Column, DateTime, Index, Integer, MetaData, String, Table, func, inspect, literal, select, union_all
+)
+from sqlalchemy.orm import Session
+from app.models import Analytics, AnalyticsDirtyDay, JobCheckpoint
+from app.services.checkpoint_service import get_checkpoint, set_checkpoint
+
+PARTITION_PREFIX = "analytics_p"
+_PARTITION_NAME = re.compile(r"^analytics_p(\d{4})_(\d{2})$")
+VALUE_COLUMNS = ("stream_count", "unique_listeners", "likes_count", "shares_count")
+# job_checkpoints name prefix for the marker mark_rewritten changes
+REWRITE_MARKER = "analytics_rewrite:"
+
+# Partition tables are created at runtime, outside Base.metadata and create_all
+partition_metadata = MetaData()
+_metadata_lock = threading.Lock()
+
+
+def month_start(moment) -> date:
+    return date(moment.year, moment.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARTITION_PREFIX}{month.year:04d}_{month.month:02d}"
+
+
+def partition_month(name: str) -> Optional[date]:
+    match = _PARTITION_NAME.match(name)
+    return date(int(match.group(1)), int(match.group(2)), 1) if match else None
+
+
+def partition_table(name: str) -> Table:
+    """Table object for a partition, whether or not it exists in the database yet"""
+    table = partition_metadata.tables.get(name)
+    if table is not None:
+        return table
+    with _metadata_lock:
+        table = partition_metadata.tables.get(name)
+        if table is None:
+            table = Table(
+                name, partition_metadata,
+                Column("id", Integer, primary_key=True),
+                Column("song_id", Integer),
+                Column("region", String(100)),
+                Column("date", DateTime(timezone=True), nullable=False),
+                Column("granularity", String(8), nullable=False, default="day"),
+                Column("stream_count", Integer, default=0),
+                Column("unique_listeners", Integer, default=0),
+                Column("likes_count", Integer, default=0),
+                Column("shares_count", Integer, default=0),
+                Column("created_at", DateTime(timezone=True), server_default=func.now()),
+                Index(f"ix_{name}_song_date", "song_id", "date"),
+                Index(f"ix_{name}_date", "date"),
+            )
+    return table
+
+
+class AnalyticsPartitions:
+    """Routes analytics writes to monthly tables and prunes reads to the months needed"""
+
+    def __init__(self, cache_seconds: float = 30):
+        # Partitions created by other processes become visible within cache_seconds
+        self.cache_seconds = cache_seconds
+        # database URL -> (loaded at, partition names)
+        self._names: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def names(self, db: Session) -> List[str]:
+        """Existing partition table names, oldest first"""
+        connection = db.connection()
+        url = str(connection.engine.url)
+        loaded_at, names = self._names.get(url, (None, []))
+        if loaded_at is None or monotonic() - loaded_at > self.cache_seconds:
+            names = sorted(
+                name for name in inspect(connection).get_table_names()
+                if partition_month(name) is not None
+            )
+            with self._lock:
+                self._names[url] = (monotonic(), names)
+        return names
+
+    def invalidate(self):
+        with self._lock:
+            self._names.clear()
+
+    def ensure(self, db: Session, month: date) -> Table:
+        """Return the partition for a month, creating it if needed"""
+        name = partition_name(month)
+        table = partition_table(name)
+        if name not in self.names(db):
+            table.create(bind=db.connection(), checkfirst=True)
+            self.invalidate()
+        return table
+
+    def prune(self, db: Session, start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[Table]:
+        """Partitions overlapping [start, end); bounds are naive UTC datetimes"""
+        first = month_start(start) if start is not None else None
+        tables = []
+        for name in self.names(db):
+            month = partition_month(name)
+            if first is not None and month < first:
+                continue
+            if end is not None and datetime.combine(month, time.min) >= end:
+                continue
+            tables.append(partition_table(name))
+        return tables
+
+    def source(
+        self,
+        db: Session,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        filters: Optional[Callable[[Table], Iterable]] = None,
+        include_legacy: bool = True,
+    ):
+        """Subquery over the partitions overlapping [start, end), plus the legacy table.
+
+        ``filters(table)`` returns extra WHERE clauses for each branch so they are
+        applied (and can use indexes) inside every partition rather than on the union.
+        """
+        def branch(table, granularity=None):
+            columns = [table.c.id, table.c.song_id, table.c.region, table.c.date]
+            columns.append(table.c.granularity if granularity is None else literal(granularity).label("granularity"))
+            columns += [table.c[column] for column in VALUE_COLUMNS] + [table.c.created_at]
+            query = select(*columns)
+            if start is not None:
+                query = query.where(table.c.date >= start)
+            if end is not None:
+                query = query.where(table.c.date < end)
+            if filters is not None:
+                query = query.where(*filters(table))
+            return query
+
+        branches = [branch(table) for table in self.prune(db, start, end)]
+        if include_legacy or not branches:
+            branches.append(branch(Analytics.__table__, "day"))
+        query = branches[0] if len(branches) == 1 else union_all(*branches)
+        return query.subquery("analytics")
+
+    def insert(self, db: Session, rows: Iterable[dict]) -> int:
+        """Insert daily analytics rows into their monthly partitions.
+
+        The days written are queued in analytics_dirty_days so the rollup job
+        recomputes them. Runs in the caller's transaction; returns the row count.
+        """
+        by_month: Dict[date, List[dict]] = {}
+        days = set()
+        for row in rows:
+            moment = row["date"]
+            if moment.tzinfo is not None:
+                moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+            by_month.setdefault(month_start(moment), []).append({**row, "date": moment, "granularity": "day"})
+            days.add(moment.date())
+
+        for month, month_rows in by_month.items():
+            db.execute(self.ensure(db, month).insert(), month_rows)
+        if days:
+            db.execute(AnalyticsDirtyDay.__table__.insert(), [{"day": day} for day in sorted(days)])
+        return sum(len(month_rows) for month_rows in by_month.values())
+
+    def mark_rewritten(self, db: Session, table: Table):
+        """Stage a new rewrite marker for a partition (or the legacy table) whose rows were deleted or replaced"""
+        set_checkpoint(db, REWRITE_MARKER + table.name, uuid.uuid4().hex)
+
+    def version(self, db: Session, table: Table) -> list:
+        """Max id and rewrite marker of a table; changes whenever its rows do"""
+        max_id = db.execute(select(func.max(table.c.id))).scalar() or 0
+        return [max_id, get_checkpoint(db, REWRITE_MARKER + table.name, "")]
+
+    def drop(self, db: Session, name: str):
+        partition_table(name).drop(bind=db.connection(), checkfirst=True)
+        db.query(JobCheckpoint).filter(JobCheckpoint.name == REWRITE_MARKER + name).delete(synchronize_session=False)
+        self.invalidate()
+
+
+analytics_partitions = AnalyticsPartitions()
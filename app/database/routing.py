@@ -0,0 +1,129 @@
+import hashlib
+import itertools
+import threading
+import time
+from typing import List, Optional
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+
+class ReplicaPool:
+    """Round-robin selection over read-replica engines with periodic health checks"""
+
+    def __init__(self, engines: List[Engine], health_check_interval: float = 30):
+        self.engines = list(engines)
+        self.health_check_interval = health_check_interval
+        self._healthy = [True] * len(self.engines)
+        self._checked_at = [0.0] * len(self.engines)
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def _probe(self, index: int) -> bool:
+        try:
+            with self.engines[index].connect() as conn:
+                conn.execute(text("SELECT 1"))
+            return True
+        except Exception:
+            return False
+
+    def is_healthy(self, index: int) -> bool:
+        """Return the cached health of a replica, re-probing it once the interval has passed"""
+        now = time.monotonic()
+        if now - self._checked_at[index] < self.health_check_interval:
+            return self._healthy[index]
+
+        with self._lock:
+            # Another thread may have probed while we waited for the lock
+            if now - self._checked_at[index] >= self.health_check_interval:
+                self._healthy[index] = self._probe(index)
+                self._checked_at[index] = time.monotonic()
+        return self._healthy[index]
+
+    def get_engine(self) -> Optional[Engine]:
+        """Pick the next healthy replica, or None when none is available"""
+        for _ in range(len(self.engines)):
+            index = next(self._counter) % len(self.engines)
+            if self.is_healthy(index):
+                return self.engines[index]
+        return None
+
+
+class WriteStickiness:
+    """Remembers which clients wrote recently so their reads go to the primary"""
+
+    def __init__(self, window_seconds: float = 5, max_keys: int = 100_000):
+        self.window_seconds = window_seconds
+        self.max_keys = max_keys
+        self._until = {}
+        self._lock = threading.Lock()
+
+    def mark(self, key: str):
+        if self.window_seconds <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if len(self._until) >= self.max_keys:
+                self._until = {k: v for k, v in self._until.items() if v > now}
+            self._until[key] = now + self.window_seconds
+
+    def is_sticky(self, key: str) -> bool:
+        until = self._until.get(key)
+        if until is None:
+            return False
+        if until <= time.monotonic():
+            with self._lock:
+                # A concurrent mark may have extended it meanwhile
+                if self._until.get(key, 0) <= time.monotonic():
+                    self._until.pop(key, None)
+            return False
+        return True
+
+
+def client_key(authorization: Optional[str], host: Optional[str]) -> str:
+    """Identify a client by its bearer token, falling back to its address"""
+    if authorization:
+        return hashlib.blake2b(authorization.encode(), digest_size=16).hexdigest()
+    return host or "anonymous"
+
+
+class RoutingSession(Session):
+    """Session that reads from a replica unless it has written or is marked for writes.
+
+    ``info["read_only"]`` is set by ``get_db`` for GET/HEAD requests. Once the
+    session flushes or runs a bulk write it is pinned to the primary for the rest
+    of its life, and a successful commit makes the client sticky to the primary.
+    """
+
+    def __init__(self, *args, primary: Engine, replicas: ReplicaPool,
+                 stickiness: WriteStickiness, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.primary = primary
+        self.replicas = replicas
+        self.stickiness = stickiness
+        self._replica_bind = None
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self.info.get("read_only") and not self.info.get("wrote") and not self._flushing:
+            if self._replica_bind is None:
+                self._replica_bind = self.replicas.get_engine() or self.primary
+            return self._replica_bind
+        return self.primary
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _mark_flush_write(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _mark_bulk_write(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["wrote"] = True
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _stick_after_commit(session):
+    key = session.info.get("client_key")
+    if key and session.info.get("wrote"):
+        session.stickiness.mark(key)
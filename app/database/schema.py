@@ -0,0 +1,120 @@
+"""Schema versioning.
+
+Development boots run ``create_all`` and stamp the current version. Production
+boots only compare the stamped version with ``SCHEMA_VERSION`` so workers start
+without issuing DDL; deploys apply schema changes once with:
+
+    python -m app.database.schema upgrade
+
+Bump ``SCHEMA_VERSION`` whenever a model change alters the database schema.
+"""
+import argparse
+from typing import Optional
+from sqlalchemy import Column, DateTime, Integer, func, inspect, select
+from sqlalchemy.schema import CreateColumn
+from sqlalchemy.engine import Engine
+from app.database.connection import Base
+
+SCHEMA_VERSION = 9
+
+
+class SchemaVersion(Base):
+    __tablename__ = "schema_version"
+
+    version = Column(Integer, primary_key=True)
+    applied_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class SchemaVersionError(RuntimeError):
+    """The database schema does not match the version this code expects"""
+
+
+def current_version(engine: Engine) -> Optional[int]:
+    """Highest version stamped in the database, or None if never stamped"""
+    if not inspect(engine).has_table(SchemaVersion.__tablename__):
+        return None
+    with engine.connect() as conn:
+        return conn.execute(select(func.max(SchemaVersion.version))).scalar()
+
+
+def check_schema_version(engine: Engine):
+    """Raise SchemaVersionError unless the database is at SCHEMA_VERSION"""
+    version = current_version(engine)
+    if version != SCHEMA_VERSION:
+        raise SchemaVersionError(
+            f"Database schema is at version {version}, expected {SCHEMA_VERSION}; "
+            f"run `python -m app.database.schema upgrade`"
+        )
+
+
+def add_missing_columns(engine: Engine) -> list:
+    """ALTER TABLE ADD COLUMN for nullable columns added to models of existing tables"""
+    inspector = inspect(engine)
+    added = []
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                if not column.nullable and column.server_default is None:
+                    raise SchemaVersionError(f"{table.name}.{column.name} is NOT NULL without a server default")
+                ddl = CreateColumn(column).compile(dialect=engine.dialect)
+                conn.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {ddl}")
+                added.append(f"{table.name}.{column.name}")
+    return added
+
+
+def _backfill_playlist_counters(engine: Engine):
+    from sqlalchemy.orm import Session
+    from app.services.playlist_service import PlaylistStatsService
+
+    with Session(bind=engine) as db:
+        PlaylistStatsService(db).reconcile()
+
+
+# Run after the named column is added to an existing table, to fill in real values
+BACKFILLS = {
+    "playlists.track_count": _backfill_playlist_counters,
+}
+
+
+def upgrade(engine: Engine) -> int:
+    """Create missing tables and indexes and stamp the current version"""
+    # Every model must be registered on Base.metadata before create_all
+    import app.models  # noqa: F401
+
+    Base.metadata.create_all(bind=engine)
+    # create_all skips existing tables, so add columns declared since they were created
+    added = add_missing_columns(engine)
+    # create_all skips existing tables, so add indexes declared since they were created
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    for column in added:
+        if column in BACKFILLS:
+            BACKFILLS[column](engine)
+    if current_version(engine) != SCHEMA_VERSION:
+        with engine.begin() as conn:
+            conn.execute(SchemaVersion.__table__.insert().values(version=SCHEMA_VERSION))
+    return SCHEMA_VERSION
+
+
+def main():
+    from app.database.connection import engine
+
+    parser = argparse.ArgumentParser(description="Check or upgrade the database schema")
+    parser.add_argument("command", choices=["check", "upgrade"])
+    args = parser.parse_args()
+
+    if args.command == "upgrade":
+        print(f"Schema upgraded to version {upgrade(engine)}")
+    else:
+        check_schema_version(engine)
+        print(f"Schema is at version {SCHEMA_VERSION}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""Soft deletion of catalog rows.
+
+Deleting an artist or song only stamps ``deleted_at``; every ORM SELECT run
+through a session then leaves the row out, in joins and relationship loads too.
+Statements executed with ``execution_options(include_deleted=True)`` still see
+deleted rows, as do Core statements on ``Model.__table__``. The rows and
+everything referencing them are removed later, in small batches, by
+``app.services.purge_service``.
+"""
+from sqlalchemy import Column, DateTime, event
+from sqlalchemy.orm import with_loader_criteria
+
+
+class SoftDeleteMixin:
+    # Set on delete; the purge job removes the row afterwards
+    deleted_at = Column(DateTime(timezone=True), index=True)
+
+
+def install_soft_delete_filter(session_class):
+    """Hide soft-deleted rows from the ORM SELECTs of ``session_class``"""
+
+    @event.listens_for(session_class, "do_orm_execute")
+    def _hide_deleted(orm_execute_state):
+        if (
+            orm_execute_state.is_select
+            and not orm_execute_state.is_column_load
+            and not orm_execute_state.is_relationship_load
+            and not orm_execute_state.execution_options.get("include_deleted", False)
+        ):
+            # Relationship and column loads inherit the criteria from the original query
+            orm_execute_state.statement = orm_execute_state.statement.options(
+                with_loader_criteria(SoftDeleteMixin, lambda cls: cls.deleted_at.is_(None), include_aliases=True)
+            )
@@ -0,0 +1,120 @@
+import asyncio
+import threading
+from collections import deque
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+JOURNAL_MODES = {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"}
+SYNCHRONOUS_MODES = {"OFF", "NORMAL", "FULL", "EXTRA"}
+
+
+def is_sqlite(url: str) -> bool:
+    return url.startswith("sqlite")
+
+
+def apply_sqlite_profile(engine: Engine, journal_mode: str = "WAL", synchronous: str = "NORMAL",
+                         mmap_size: int = 0, cache_size: int = -2000, busy_timeout_ms: int = 5000):
+    """Set performance pragmas on every new connection of a SQLite engine"""
+    journal_mode = journal_mode.upper()
+    synchronous = synchronous.upper()
+    if journal_mode not in JOURNAL_MODES:
+        raise ValueError(f"Unsupported SQLite journal mode: {journal_mode}")
+    if synchronous not in SYNCHRONOUS_MODES:
+        raise ValueError(f"Unsupported SQLite synchronous mode: {synchronous}")
+
+    pragmas = [
+        f"PRAGMA busy_timeout={int(busy_timeout_ms)}",
+        f"PRAGMA journal_mode={journal_mode}",
+        f"PRAGMA synchronous={synchronous}",
+        f"PRAGMA mmap_size={int(mmap_size)}",
+        f"PRAGMA cache_size={int(cache_size)}",
+        "PRAGMA temp_store=MEMORY",
+    ]
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+
+class WriteSerializer:
+    """FIFO queue granting the SQLite write lock to one session at a time.
+
+    SQLite allows a single writer; letting every handler race for the file lock
+    ends in busy-waiting and ``database is locked`` errors. Sessions queue here
+    instead and are admitted in arrival order.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._waiters = deque()
+        self._locked = False
+
+    def acquire(self, timeout: float = None) -> bool:
+        with self._cond:
+            if not self._locked and not self._waiters:
+                self._locked = True
+                return True
+
+            waiter = object()
+            self._waiters.append(waiter)
+            acquired = False
+            try:
+                acquired = self._cond.wait_for(
+                    lambda: not self._locked and self._waiters[0] is waiter, timeout
+                )
+                if acquired:
+                    self._locked = True
+                return acquired
+            finally:
+                self._waiters.remove(waiter)
+                if not acquired:
+                    self._cond.notify_all()
+
+    def release(self):
+        with self._cond:
+            self._locked = False
+            self._cond.notify_all()
+
+
+def _on_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def install_write_serializer(session_class, serializer: WriteSerializer, timeout: float = 5.0):
+    """Make sessions of ``session_class`` queue on ``serializer`` before writing.
+
+    The lock is taken at the first flush or bulk write and released when the
+    session's transaction ends (commit, rollback or close). If it cannot be had
+    within ``timeout`` the write goes ahead and relies on SQLite's busy timeout.
+    Write handlers are plain ``def`` functions, so they run in the threadpool and
+    queue here. A session used on an event loop thread never queues, since waiting
+    would stall every other request; it relies on the busy timeout too.
+    """
+
+    def _acquire(session):
+        if "write_lock" in session.info:
+            return
+        session.info["write_lock"] = False if _on_event_loop() else serializer.acquire(timeout)
+
+    @event.listens_for(session_class, "before_flush")
+    def _serialize_flush(session, flush_context, instances):
+        _acquire(session)
+
+    @event.listens_for(session_class, "do_orm_execute")
+    def _serialize_bulk_write(orm_execute_state):
+        if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+            _acquire(orm_execute_state.session)
+
+    @event.listens_for(session_class, "after_transaction_end")
+    def _release_write_lock(session, transaction):
+        if transaction.parent is None and session.info.pop("write_lock", False):
+            serializer.release()
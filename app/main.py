@@ -1,15 +1,46 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from app.config import settings
-from app.database.connection import init_db
-from app.routers import auth_router, songs_router, artists_router, playlists_router, charts_router, analytics_router, users_router
+from app.database.connection import init_db, engine, replica_pool
+from app.database.instrumentation import db_time_totals, pool_snapshot
+from app.services.metrics_service import MetricsMiddleware, metrics
+from app.services.profiler_service import ProfilingMiddleware
+from app.services.ratelimit_service import RateLimitMiddleware
+from app.services.consumers import register_consumers
+from app.services.jobs import register_jobs
+from app.services.live_service import live_hub
+from app.services.outbox_service import outbox
+from app.services.scheduler_service import scheduler
+from app.routers import auth_router, songs_router, artists_router, playlists_router, charts_router, analytics_router, users_router, admin_router, sync_router, live_router
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Initialize database on startup
+    init_db()
+    if settings.SCHEDULER_ENABLED:
+        register_jobs(scheduler)
+        scheduler.start()
+    if settings.OUTBOX_ENABLED:
+        register_consumers(outbox)
+        outbox.start()
+    print(f"🚀 {settings.APP_NAME} is running!")
+    print(f"📚 API Documentation: http://127.0.0.1:8000{settings.API_V1_PREFIX}/docs")
+    yield
+    await live_hub.stop()
+    await outbox.stop()
+    await scheduler.stop()
+
 
 # Create FastAPI app
 app = FastAPI(
     title=settings.APP_NAME,
     description="Backend API for Playlist-KE music streaming platform",
     version="1.0.0",
-    openapi_url=f"{settings.API_V1_PREFIX}/openapi.json"
+    openapi_url=f"{settings.API_V1_PREFIX}/openapi.json",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -22,6 +53,16 @@ app.add_middleware(
 )
 
 
+# Opt-in SQL profiling and Server-Timing breakdown (see the /admin/profiling endpoints)
+app.add_middleware(ProfilingMiddleware)
+
+# Token-bucket rate limits per user or IP (rejections still show up in request metrics)
+app.add_middleware(RateLimitMiddleware)
+
+# Request metrics, including per-request database time
+app.add_middleware(MetricsMiddleware)
+
+
 # Include routers
 app.include_router(auth_router, prefix=settings.API_V1_PREFIX)
 app.include_router(songs_router, prefix=settings.API_V1_PREFIX)
@@ -30,14 +71,9 @@ app.include_router(playlists_router, prefix=settings.API_V1_PREFIX)
 app.include_router(charts_router, prefix=settings.API_V1_PREFIX)
 app.include_router(analytics_router, prefix=settings.API_V1_PREFIX)
 app.include_router(users_router, prefix=settings.API_V1_PREFIX)
-
-
-# Initialize database on startup
-@app.on_event("startup")
-async def startup_event():
-    init_db()
-    print(f"🚀 {settings.APP_NAME} is running!")
-    print(f"📚 API Documentation: http://127.0.0.1:8000{settings.API_V1_PREFIX}/docs")
+app.include_router(admin_router, prefix=settings.API_V1_PREFIX)
+app.include_router(sync_router, prefix=settings.API_V1_PREFIX)
+app.include_router(live_router, prefix=settings.API_V1_PREFIX)
 
 
 @app.get("/")
@@ -53,3 +89,31 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+
+def _pool_snapshots() -> dict:
+    pools = {"primary": pool_snapshot(engine)}
+    for index, replica in enumerate(replica_pool.engines):
+        pools[f"replica_{index}"] = pool_snapshot(replica)
+    return pools
+
+
+def _pool_gauge(field: str):
+    return lambda: {(name,): snapshot.get(field, 0) for name, snapshot in _pool_snapshots().items()}
+
+
+metrics.gauge_callback("db_pool_checked_out", "Connections currently checked out", ("pool",), _pool_gauge("in_use"))
+metrics.gauge_callback("db_pool_overflow", "Connections open beyond the pool size", ("pool",), _pool_gauge("overflow"))
+metrics.gauge_callback("db_pool_timeouts", "Checkouts that timed out waiting for a connection", ("pool",), _pool_gauge("timeouts"))
+metrics.gauge_callback("db_pool_checkout_wait_ms", "Total time spent waiting for connections", ("pool",), _pool_gauge("checkout_wait_ms_total"))
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Metrics in the Prometheus text exposition format"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.get("/metrics/db")
+async def db_metrics():
+    """Connection pool state and per-request database time"""
+    return {"pools": _pool_snapshots(), "requests": db_time_totals.snapshot()}
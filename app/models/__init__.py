@@ -7,9 +7,13 @@ from app.models.artist import Artist
 from app.models.song import Song
 from app.models.playlist import Playlist, PlaylistSong
 from app.models.chart import Chart, ChartEntry
-from app.models.analytics import Analytics
+from app.models.analytics import Analytics, AnalyticsRollup, AnalyticsDirtyDay, ListenerSketch
+from app.models.job import JobCheckpoint, JobLease
+from app.models.change_log import ChangeLog
+from app.models.refresh_token import RefreshToken
 
 __all__ = [
     "Base", "User", "Artist", "Song", "Playlist", "PlaylistSong", 
-    "Chart", "ChartEntry", "Analytics"
+    "Chart", "ChartEntry", "Analytics", "AnalyticsRollup", "AnalyticsDirtyDay", "ListenerSketch",
+    "JobCheckpoint", "JobLease", "ChangeLog", "RefreshToken"
 ]
@@ -1,10 +1,11 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Date, DateTime, ForeignKey, Index, LargeBinary
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database.connection import Base
 
 
 class Analytics(Base):
+    # Legacy single table; new rows go to monthly partitions (app.database.partitions)
     __tablename__ = "analytics"
     
     id = Column(Integer, primary_key=True, index=True)
@@ -19,3 +20,62 @@ class Analytics(Base):
     
     # Relationships
     song = relationship("Song", back_populates="analytics")
+    
+    __table_args__ = (
+        # Per-song time ranges and date-range scans by the rollup job
+        Index("ix_analytics_song_date", "song_id", "date"),
+        Index("ix_analytics_date", "date"),
+    )
+
+
+class AnalyticsRollup(Base):
+    """Daily totals per entity, maintained by AnalyticsRollupService from the analytics table"""
+    __tablename__ = "analytics_rollups"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    # "all", "song", "artist", "region" or "genre"
+    entity_type = Column(String(16), nullable=False)
+    # Song/artist id or region/genre name; "" for entity_type "all"
+    entity_key = Column(String(255), nullable=False)
+    day = Column(Date, nullable=False)
+    stream_count = Column(Integer, default=0, nullable=False)
+    unique_listeners = Column(Integer, default=0, nullable=False)
+    likes_count = Column(Integer, default=0, nullable=False)
+    shares_count = Column(Integer, default=0, nullable=False)
+    
+    __table_args__ = (
+        # One series lookup is a single range scan on this index
+        Index("ix_analytics_rollups_series", "entity_type", "entity_key", "day", unique=True),
+        Index("ix_analytics_rollups_day", "day"),
+    )
+
+
+class AnalyticsDirtyDay(Base):
+    """Day that received analytics writes since the rollup job last ran"""
+    __tablename__ = "analytics_dirty_days"
+    
+    # Append-only (no uniqueness) so concurrent writers never conflict
+    id = Column(Integer, primary_key=True)
+    day = Column(Date, nullable=False)
+
+
+class ListenerSketch(Base):
+    """HyperLogLog sketch of the listeners of one song (or all songs) in a region and period.
+
+    Written append-only by ListenerSketchService; several rows may share a key until
+    compaction merges them, and readers merge every matching row.
+    """
+    __tablename__ = "listener_sketches"
+    
+    id = Column(Integer, primary_key=True)
+    # NULL: all songs, so catalogue-wide counts merge one row per region and period
+    song_id = Column(Integer, nullable=True)
+    region = Column(String(100), nullable=False)
+    # "day", or "month" with day set to the first of the month
+    period = Column(String(8), nullable=False)
+    day = Column(Date, nullable=False)
+    sketch = Column(LargeBinary, nullable=False)
+    
+    __table_args__ = (
+        Index("ix_listener_sketches_key", "song_id", "period", "day", "region"),
+    )
@@ -2,13 +2,16 @@ from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database.connection import Base
+from app.database.soft_delete import SoftDeleteMixin
 
 
-class Artist(Base):
+class Artist(SoftDeleteMixin, Base):
     __tablename__ = "artists"
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(255), nullable=False)
+    # Identifier in the label's or distributor's catalog, used to match imports
+    external_id = Column(String(100), unique=True, index=True)
     bio = Column(String(2000))
     image_url = Column(String(500))
     region = Column(String(100))
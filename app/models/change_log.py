@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy.sql import func
+from app.database.connection import Base
+
+
+class ChangeLog(Base):
+    """One insert, update or delete of a tracked row, appended in the writing transaction"""
+    __tablename__ = "change_log"
+    
+    # Never reused, so a sync cursor stays valid across pruning
+    id = Column(Integer, primary_key=True)
+    # Table name: "artists", "songs", "playlists", "playlist_songs" or "chart_entries"
+    entity = Column(String(32), nullable=False)
+    entity_id = Column(Integer, nullable=False)
+    # "upsert" or "delete"
+    op = Column(String(8), nullable=False)
+    # Owner of a playlist or playlist track; NULL for the shared catalog
+    user_id = Column(Integer, index=True)
+    changed_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    
+    __table_args__ = {"sqlite_autoincrement": True}
@@ -23,7 +23,7 @@ class ChartEntry(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     chart_id = Column(Integer, ForeignKey("charts.id"), nullable=False)
-    song_id = Column(Integer, ForeignKey("songs.id"), nullable=False)
+    song_id = Column(Integer, ForeignKey("songs.id"), nullable=False, index=True)
     rank = Column(Integer, nullable=False)
     previous_rank = Column(Integer)
     trend = Column(String(50))  # "up", "down", "stable", "new"
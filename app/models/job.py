@@ -0,0 +1,23 @@
+from sqlalchemy import Column, String, DateTime
+from sqlalchemy.sql import func
+from app.database.connection import Base
+
+
+class JobCheckpoint(Base):
+    """Progress marker (watermark) for an incremental background job"""
+    __tablename__ = "job_checkpoints"
+    
+    name = Column(String(100), primary_key=True)
+    value = Column(String(255), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class JobLease(Base):
+    """Which process may run a scheduled job, and until when"""
+    __tablename__ = "job_leases"
+    
+    name = Column(String(100), primary_key=True)
+    owner = Column(String(255), nullable=False)
+    # Naive UTC; the lease is free once this has passed
+    expires_at = Column(DateTime, nullable=False)
+    acquired_at = Column(DateTime, nullable=False)
@@ -13,6 +13,9 @@ class Playlist(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     is_public = Column(Boolean, default=True)
     cover_url = Column(String(500))
+    # Denormalized counters, kept in sync by PlaylistStatsService
+    track_count = Column(Integer, default=0, server_default="0", nullable=False)
+    total_duration_seconds = Column(Integer, default=0, server_default="0", nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
@@ -26,7 +29,7 @@ class PlaylistSong(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     playlist_id = Column(Integer, ForeignKey("playlists.id"), nullable=False)
-    song_id = Column(Integer, ForeignKey("songs.id"), nullable=False)
+    song_id = Column(Integer, ForeignKey("songs.id"), nullable=False, index=True)
     order = Column(Integer, default=0)
     added_at = Column(DateTime(timezone=True), server_default=func.now())
     
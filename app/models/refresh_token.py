@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy.sql import func
+from app.database.connection import Base
+
+
+class RefreshToken(Base):
+    """A refresh token, stored as its SHA-256; each use replaces it with a new one in the same family"""
+    __tablename__ = "refresh_tokens"
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    # Hex SHA-256 of the token; the token itself is never stored
+    token_hash = Column(String(64), unique=True, nullable=False)
+    # Shared by every token rotated from the same login
+    family_id = Column(String(32), nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Naive UTC, like JWT expiry
+    expires_at = Column(DateTime, nullable=False, index=True)
+    # Set when the token is exchanged; presenting it again revokes the family
+    used_at = Column(DateTime)
+    revoked_at = Column(DateTime)
@@ -2,14 +2,15 @@ from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database.connection import Base
+from app.database.soft_delete import SoftDeleteMixin
 
 
-class Song(Base):
+class Song(SoftDeleteMixin, Base):
     __tablename__ = "songs"
     
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(255), nullable=False)
-    artist_id = Column(Integer, ForeignKey("artists.id"), nullable=False)
+    artist_id = Column(Integer, ForeignKey("artists.id"), nullable=False, index=True)
     album = Column(String(255))
     duration_seconds = Column(Integer)
     release_date = Column(DateTime(timezone=True))
@@ -6,6 +6,9 @@ from app.routers.playlists import router as playlists_router
 from app.routers.charts import router as charts_router
 from app.routers.analytics import router as analytics_router
 from app.routers.users import router as users_router
+from app.routers.admin import router as admin_router
+from app.routers.sync import router as sync_router
+from app.routers.live import router as live_router
 
 __all__ = [
     "auth_router",
@@ -15,5 +18,7 @@ __all__ = [
     "charts_router",
     "analytics_router",
     "users_router",
+    "admin_router",
+    "sync_router",
+    "live_router",
 ]
-
@@ -0,0 +1,155 @@
+import io
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from typing import List, Literal, Optional
+from app.config import settings
+from app.database.connection import get_db
+from app.models import JobLease
+from app.schemas.admin import (
+    JobStatus, OutboxConsumerStatus, OutboxStatus, ProfilingSettings, ProfilingUpdate, RequestProfileResponse,
+    SchedulerStatus
+)
+from app.schemas.catalog_import import ImportReport
+from app.schemas.user import UserResponse
+from app.services import get_current_admin_user
+from app.services.profiler_service import ProfiledRoute, recent_profiles
+from app.services.import_service import CatalogImporter, detect_format
+from app.services.outbox_service import head, outbox
+from app.services.scheduler_service import scheduler
+
+router = APIRouter(prefix="/admin", tags=["Admin"], route_class=ProfiledRoute)
+
+
+def _profiling_settings() -> ProfilingSettings:
+    return ProfilingSettings(
+        sql_profiling_enabled=settings.SQL_PROFILING_ENABLED,
+        slow_query_threshold_ms=settings.SLOW_QUERY_THRESHOLD_MS,
+        slow_query_explain=settings.SLOW_QUERY_EXPLAIN,
+        server_timing_enabled=settings.SERVER_TIMING_ENABLED
+    )
+
+
+@router.get("/profiling", response_model=ProfilingSettings)
+async def get_profiling(current_user: UserResponse = Depends(get_current_admin_user)):
+    """Get the current profiling settings"""
+    return _profiling_settings()
+
+
+@router.put("/profiling", response_model=ProfilingSettings)
+async def update_profiling(
+    profiling_data: ProfilingUpdate,
+    current_user: UserResponse = Depends(get_current_admin_user)
+):
+    """Change profiling settings at runtime (this worker only, until restart)"""
+    update_data = profiling_data.model_dump(exclude_unset=True)
+    for field, value in update_data.items():
+        setattr(settings, field.upper(), value)
+    return _profiling_settings()
+
+
+@router.get("/profiling/requests", response_model=List[RequestProfileResponse])
+async def get_recent_profiles(current_user: UserResponse = Depends(get_current_admin_user)):
+    """Get SQL profiles of the most recent requests, newest first"""
+    return [profile.to_dict() for profile in reversed(recent_profiles)]
+
+
+def _scheduler_status(db: Session) -> SchedulerStatus:
+    leases = {lease.name: lease for lease in db.query(JobLease).all()}
+    jobs = []
+    for job in scheduler.status():
+        lease = leases.get(job["name"])
+        jobs.append(JobStatus(
+            **job,
+            lease_owner=lease.owner if lease else None,
+            lease_expires_at=lease.expires_at if lease else None
+        ))
+    return SchedulerStatus(
+        enabled=settings.SCHEDULER_ENABLED,
+        running=scheduler.running,
+        owner=scheduler.owner,
+        max_workers=scheduler.max_workers,
+        jobs=jobs
+    )
+
+
+@router.get("/jobs", response_model=SchedulerStatus)
+async def get_jobs(
+    current_user: UserResponse = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Scheduled jobs with this worker's run history and the cluster-wide lease holder"""
+    return _scheduler_status(db)
+
+
+@router.post("/jobs/{name}/run", response_model=SchedulerStatus, status_code=status.HTTP_202_ACCEPTED)
+async def run_job(
+    name: str,
+    current_user: UserResponse = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Run a scheduled job on this worker's next tick (skipped if another worker holds its lease)"""
+    if name not in scheduler.jobs:
+        raise HTTPException(status_code=404, detail="Job not found")
+    scheduler.run_now(name)
+    return _scheduler_status(db)
+
+
+def _outbox_status(db: Session) -> OutboxStatus:
+    latest = head(db)
+    return OutboxStatus(
+        enabled=settings.OUTBOX_ENABLED,
+        running=outbox.running,
+        head=latest,
+        consumers=[
+            OutboxConsumerStatus(
+                **consumer,
+                lag=None if consumer["position"] is None else latest - consumer["position"]
+            )
+            for consumer in outbox.status()
+        ]
+    )
+
+
+@router.get("/outbox", response_model=OutboxStatus)
+async def get_outbox(
+    current_user: UserResponse = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Change outbox consumers on this worker, with their position and lag behind the log head"""
+    return _outbox_status(db)
+
+
+@router.post("/outbox/{name}/replay", response_model=OutboxStatus, status_code=status.HTTP_202_ACCEPTED)
+async def replay_outbox(
+    name: str,
+    after_id: int = Query(..., ge=0, description="Re-deliver change records after this id"),
+    current_user: UserResponse = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Move a consumer back (or forward) in the change log; durable consumers move on every worker"""
+    if name not in outbox.consumers:
+        raise HTTPException(status_code=404, detail="Consumer not found")
+    await run_in_threadpool(outbox.replay, name, after_id)
+    return _outbox_status(db)
+
+
+@router.post("/import/{kind}", response_model=ImportReport)
+async def import_catalog(
+    kind: Literal["artists", "songs"],
+    file: UploadFile = File(..., description="CSV with a header row, or NDJSON"),
+    format: Optional[Literal["csv", "ndjson"]] = Query(None, description="Defaults to the file extension"),
+    create_artists: bool = False,
+    current_user: UserResponse = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Bulk import artists or songs; rows that fail are reported by line and skipped"""
+    stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    importer = CatalogImporter(db, create_artists=create_artists)
+    try:
+        # Streams the upload and inserts in batches, off the event loop
+        return await run_in_threadpool(importer.run, kind, stream, format or detect_format(file.filename or ""))
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="File is not UTF-8 text")
+    finally:
+        stream.detach()
@@ -1,23 +1,50 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime, timedelta, timezone
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Literal, Optional
 from app.database.connection import get_db
-from app.services.analytics_service import AnalyticsService
-from app.schemas.analytics import AnalyticsOverview, RegionAnalytics
+from app.models import Artist, Song
+from app.services.analytics_service import AnalyticsService, MAX_HOURLY_RANGE, naive_utc
+from app.schemas.analytics import AnalyticsOverview, ListenBatch, ListenBatchResult, RegionAnalytics, TrendSeries
 from app.services import get_current_active_user
+from app.services.coalesce_service import shared_session, single_flight
+from app.services.profiler_service import ProfiledRoute
 from app.schemas.user import UserResponse
 
-router = APIRouter(prefix="/analytics", tags=["Analytics"])
+router = APIRouter(prefix="/analytics", tags=["Analytics"], route_class=ProfiledRoute)
 
 
 @router.get("/overview", response_model=AnalyticsOverview)
 async def get_analytics_overview(
+    current_user: UserResponse = Depends(get_current_active_user)
+):
+    """Get analytics overview"""
+    def build() -> AnalyticsOverview:
+        with shared_session() as db:
+            return AnalyticsService(db).get_overview()
+    
+    # The overview is the same for every user, so concurrent requests share one computation
+    return await single_flight.run("analytics.overview", {}, build)
+
+
+@router.post("/listens", response_model=ListenBatchResult, status_code=status.HTTP_201_CREATED)
+def record_listens(
+    batch: ListenBatch,
     current_user: UserResponse = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """Get analytics overview"""
-    service = AnalyticsService(db)
-    return service.get_overview()
+    """Record the current user's listens (analytics rows and unique-listener sketches)"""
+    song_ids = {listen.song_id for listen in batch.listens}
+    found = {row[0] for row in db.query(Song.id).filter(Song.id.in_(song_ids))}
+    if found != song_ids:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Songs not found: {sorted(song_ids - found)}"
+        )
+    
+    recorded, sketch_rows = AnalyticsService(db).record_listens(current_user.id, batch.listens)
+    db.commit()
+    return ListenBatchResult(recorded=recorded, sketch_rows=sketch_rows)
 
 
 @router.get("/regions", response_model=List[RegionAnalytics])
@@ -30,6 +57,49 @@ async def get_region_analytics(
     return service.get_region_analytics()
 
 
+@router.get("/trends", response_model=TrendSeries)
+async def get_trends(
+    entity: Literal["all", "song", "artist", "region", "genre"] = "all",
+    key: Optional[str] = None,
+    metric: List[Literal["streams", "listeners", "likes", "shares"]] = Query(["streams"]),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    bucket: Literal["hour", "day", "week", "month"] = "day",
+    max_points: int = Query(1000, ge=1, le=5000),
+    fill_gaps: bool = True,
+    current_user: UserResponse = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Get a time series of streams/listeners/likes/shares for an entity (defaults to the last 30 days)"""
+    end = naive_utc(end or datetime.now(timezone.utc))
+    start = naive_utc(start) if start else end - timedelta(days=30)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    if bucket == "hour" and end - start > MAX_HOURLY_RANGE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Hourly buckets are limited to {MAX_HOURLY_RANGE.days} days"
+        )
+    
+    if entity == "all":
+        key = None
+    elif not key:
+        raise HTTPException(status_code=400, detail=f"key is required for entity '{entity}'")
+    elif entity in ("song", "artist"):
+        model = Song if entity == "song" else Artist
+        if not key.isdigit() or db.query(model.id).filter(model.id == int(key)).first() is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"{entity.capitalize()} not found"
+            )
+    
+    service = AnalyticsService(db)
+    return service.get_trends(
+        entity, key, list(dict.fromkeys(metric)), start, end,
+        bucket=bucket, max_points=max_points, fill_gaps=fill_gaps
+    )
+
+
 @router.get("/songs/{song_id}")
 async def get_song_analytics(
     song_id: int,
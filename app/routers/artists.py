@@ -1,14 +1,20 @@
+from datetime import datetime, timezone
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
+from sqlalchemy import select
 from typing import Optional, List
 from app.database.connection import get_db
 from app.models import Artist, Song
-from app.schemas.artist import ArtistCreate, ArtistUpdate, ArtistResponse
+from app.schemas.artist import ArtistCreate, ArtistUpdate, ArtistResponse, ArtistBatchResponse
 from app.schemas.song import SongResponse
 from app.services import get_current_active_user
+from app.services.catalog_snapshot import catalog
+from app.services.change_log import DELETE, log_changes
+from app.services.entity_cache import load_many, load_one, parse_ids
+from app.services.profiler_service import ProfiledRoute
 from app.schemas.user import UserResponse
 
-router = APIRouter(prefix="/artists", tags=["Artists"])
+router = APIRouter(prefix="/artists", tags=["Artists"], route_class=ProfiledRoute)
 
 
 @router.get("/", response_model=List[ArtistResponse])
@@ -20,6 +26,11 @@ async def get_artists(
     db: Session = Depends(get_db)
 ):
     """Get list of artists with optional filters"""
+    if not genre and not region:
+        artists = catalog.page(db, "artists", skip, limit)
+        if artists is not None:
+            return artists
+    
     query = db.query(Artist)
     
     if genre:
@@ -31,10 +42,24 @@ async def get_artists(
     return artists
 
 
+@router.get("/batch", response_model=ArtistBatchResponse)
+async def get_artists_batch(
+    ids: List[str] = Query(..., description="Comma-separated artist ids"),
+    db: Session = Depends(get_db)
+):
+    """Get several artists by ID, in the order given; unknown ids are listed in missing"""
+    artist_ids = parse_ids(ids)
+    found = load_many(db, Artist, ArtistResponse, artist_ids)
+    return ArtistBatchResponse(
+        items=[found[artist_id] for artist_id in artist_ids if artist_id in found],
+        missing=[artist_id for artist_id in artist_ids if artist_id not in found]
+    )
+
+
 @router.get("/{artist_id}", response_model=ArtistResponse)
 async def get_artist(artist_id: int, db: Session = Depends(get_db)):
     """Get artist details by ID"""
-    artist = db.query(Artist).filter(Artist.id == artist_id).first()
+    artist = catalog.get("artists", artist_id) or load_one(db, Artist, ArtistResponse, artist_id)
     if not artist:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -51,19 +76,23 @@ async def get_artist_songs(
     db: Session = Depends(get_db)
 ):
     """Get all songs by an artist"""
-    artist = db.query(Artist).filter(Artist.id == artist_id).first()
+    artist = catalog.get("artists", artist_id) or load_one(db, Artist, ArtistResponse, artist_id)
     if not artist:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Artist not found"
         )
     
+    songs = catalog.page(db, "songs", skip, limit, artist_id=artist_id)
+    if songs is not None:
+        return songs
+    
     songs = db.query(Song).filter(Song.artist_id == artist_id).offset(skip).limit(limit).all()
     return songs
 
 
 @router.post("/", response_model=ArtistResponse)
-async def create_artist(
+def create_artist(
     artist_data: ArtistCreate,
     current_user: UserResponse = Depends(get_current_active_user),
     db: Session = Depends(get_db)
@@ -78,7 +107,7 @@ async def create_artist(
 
 
 @router.put("/{artist_id}", response_model=ArtistResponse)
-async def update_artist(
+def update_artist(
     artist_id: int,
     artist_data: ArtistUpdate,
     current_user: UserResponse = Depends(get_current_active_user),
@@ -103,12 +132,12 @@ async def update_artist(
 
 
 @router.delete("/{artist_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_artist(
+def delete_artist(
     artist_id: int,
     current_user: UserResponse = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """Delete an artist"""
+    """Delete an artist and its songs; dependent rows are purged in the background"""
     artist = db.query(Artist).filter(Artist.id == artist_id).first()
     if not artist:
         raise HTTPException(
@@ -116,6 +145,12 @@ async def delete_artist(
             detail="Artist not found"
         )
     
-    db.delete(artist)
+    deleted_at = datetime.now(timezone.utc)
+    artist.deleted_at = deleted_at
+    # One indexed UPDATE hides the songs; the purge job does the heavy lifting
+    db.query(Song).filter(Song.artist_id == artist_id, Song.deleted_at.is_(None)).update(
+        {Song.deleted_at: deleted_at}, synchronize_session=False
+    )
+    log_changes(db, "songs", DELETE, select(Song.id).where(Song.artist_id == artist_id, Song.deleted_at == deleted_at))
     db.commit()
 
@@ -4,22 +4,45 @@ from sqlalchemy.orm import Session
 from datetime import timedelta
 from app.database.connection import get_db
 from app.models import User
-from app.schemas.user import UserCreate, UserResponse
+from app.schemas.user import RefreshTokenRequest, UserCreate, UserResponse
 from app.services import (
     get_password_hash, 
     verify_password, 
     create_access_token,
     get_current_active_user
 )
+from app.services.token_service import (
+    InvalidRefreshToken,
+    issue_refresh_token,
+    revoke_refresh_token,
+    revoke_user_tokens,
+    rotate_refresh_token
+)
 from app.config import settings
+from app.services.profiler_service import ProfiledRoute
 
-router = APIRouter(prefix="/auth", tags=["Authentication"])
+router = APIRouter(prefix="/auth", tags=["Authentication"], route_class=ProfiledRoute)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
 
+def _tokens(user: User, refresh_token: str) -> dict:
+    """A fresh access token for ``user`` alongside ``refresh_token``"""
+    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token = create_access_token(
+        data={"sub": str(user.id), "email": user.email},
+        expires_delta=access_token_expires
+    )
+    return {
+        "access_token": access_token,
+        "refresh_token": refresh_token,
+        "token_type": "bearer",
+        "expires_in": int(access_token_expires.total_seconds())
+    }
+
+
 @router.post("/register", response_model=UserResponse)
-async def register(user_data: UserCreate, db: Session = Depends(get_db)):
+def register(user_data: UserCreate, db: Session = Depends(get_db)):
     """Register a new user"""
     # Check if user already exists
     existing_user = db.query(User).filter(User.email == user_data.email).first()
@@ -45,7 +68,7 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
 
 
 @router.post("/login", response_model=dict)
-async def login(
+def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_db)
 ):
@@ -65,33 +88,50 @@ async def login(
             detail="User account is disabled"
         )
     
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": user.id, "email": user.email},
-        expires_delta=access_token_expires
-    )
+    refresh_token = issue_refresh_token(db, user.id)
+    db.commit()
     
     return {
-        "access_token": access_token,
-        "token_type": "bearer",
+        **_tokens(user, refresh_token),
         "user": UserResponse.model_validate(user)
     }
 
 
+@router.post("/refresh", response_model=dict)
+def refresh(token_data: RefreshTokenRequest, db: Session = Depends(get_db)):
+    """Exchange a refresh token for a new access token and refresh token (the old one stops working)"""
+    try:
+        user, refresh_token = rotate_refresh_token(db, token_data.refresh_token)
+    except InvalidRefreshToken:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return _tokens(user, refresh_token)
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+def logout(token_data: RefreshTokenRequest, db: Session = Depends(get_db)):
+    """Revoke a refresh token and every token rotated from the same login"""
+    revoke_refresh_token(db, token_data.refresh_token)
+
+
 @router.get("/me", response_model=UserResponse)
 async def get_me(current_user: UserResponse = Depends(get_current_active_user)):
     """Get current user information"""
     return current_user
 
 
-@router.put("/me", response_model=UserResponse)
-async def update_me(
+@router.put("/me", response_model=dict)
+def update_me(
     user_data: UserCreate,
     current_user: UserResponse = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """Update current user information"""
+    """Update current user information; a new password comes back with fresh tokens"""
     user = db.query(User).filter(User.id == current_user.id).first()
+    refresh_token = None
     
     if user_data.email:
         # Check if email is already taken
@@ -103,11 +143,17 @@ async def update_me(
             )
         user.email = user_data.email
     
-    if user_data.password:
+    if user_data.password and not verify_password(user_data.password, user.hashed_password):
         user.hashed_password = get_password_hash(user_data.password)
+        # Sessions started with the old password must log in again; this one carries on
+        revoke_user_tokens(db, user.id)
+        refresh_token = issue_refresh_token(db, user.id)
     
     db.commit()
     db.refresh(user)
     
-    return UserResponse.model_validate(user)
+    response = {"user": UserResponse.model_validate(user)}
+    if refresh_token is not None:
+        response.update(_tokens(user, refresh_token))
+    return response
 
@@ -13,9 +13,13 @@ from app.schemas.chart import (
     WeeklyChartResponse
 )
 from app.services import get_current_active_user
+from app.services.chart_service import entry_responses, weekly_chart
+from app.services.coalesce_service import shared_session, single_flight
+from app.services.loaders import Loaders, get_loaders
+from app.services.profiler_service import ProfiledRoute
 from app.schemas.user import UserResponse
 
-router = APIRouter(prefix="/charts", tags=["Charts"])
+router = APIRouter(prefix="/charts", tags=["Charts"], route_class=ProfiledRoute)
 
 
 @router.get("/", response_model=List[ChartResponse])
@@ -33,8 +37,7 @@ async def get_charts(
 async def get_weekly_chart(
     week: Optional[int] = None,
     year: Optional[int] = None,
-    region: Optional[str] = None,
-    db: Session = Depends(get_db)
+    region: Optional[str] = None
 ):
     """Get weekly chart"""
     import datetime
@@ -42,38 +45,22 @@ async def get_weekly_chart(
     current_week = week or now.isocalendar()[1]
     current_year = year or now.year
     
-    query = db.query(Chart).filter(
-        Chart.week == current_week,
-        Chart.year == current_year
-    )
-    
-    if region:
-        query = query.filter(Chart.region == region)
+    def build() -> WeeklyChartResponse:
+        with shared_session() as db:
+            return weekly_chart(db, Loaders(db), current_week, current_year, region)
     
-    chart = query.first()
-    
-    if not chart:
-        return WeeklyChartResponse(
-            week=current_week,
-            year=current_year,
-            region=region,
-            entries=[]
-        )
-    
-    entries = db.query(ChartEntry).filter(
-        ChartEntry.chart_id == chart.id
-    ).order_by(ChartEntry.rank).all()
-    
-    return WeeklyChartResponse(
-        week=chart.week,
-        year=chart.year,
-        region=chart.region,
-        entries=entries
+    # Concurrent requests for the same chart share one computation
+    return await single_flight.run(
+        "charts.weekly", {"week": current_week, "year": current_year, "region": region}, build
     )
 
 
 @router.get("/{chart_id}", response_model=ChartDetailResponse)
-async def get_chart_details(chart_id: int, db: Session = Depends(get_db)):
+async def get_chart_details(
+    chart_id: int,
+    db: Session = Depends(get_db),
+    loaders: Loaders = Depends(get_loaders)
+):
     """Get chart details with entries"""
     chart = db.query(Chart).filter(Chart.id == chart_id).first()
     if not chart:
@@ -93,7 +80,7 @@ async def get_chart_details(chart_id: int, db: Session = Depends(get_db)):
         year=chart.year,
         region=chart.region,
         created_at=chart.created_at,
-        entries=entries
+        entries=entry_responses(entries, loaders)
     )
 
 
@@ -101,18 +88,19 @@ async def get_chart_details(chart_id: int, db: Session = Depends(get_db)):
 async def get_song_chart_history(
     song_id: int,
     limit: int = Query(50, ge=1, le=500),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    loaders: Loaders = Depends(get_loaders)
 ):
     """Get chart history for a song"""
     entries = db.query(ChartEntry).filter(
         ChartEntry.song_id == song_id
     ).order_by(ChartEntry.created_at.desc()).limit(limit).all()
     
-    return entries
+    return entry_responses(entries, loaders)
 
 
 @router.post("/", response_model=ChartResponse)
-async def create_chart(
+def create_chart(
     chart_data: ChartCreate,
     current_user: UserResponse = Depends(get_current_active_user),
     db: Session = Depends(get_db)
@@ -127,11 +115,12 @@ async def create_chart(
 
 
 @router.post("/{chart_id}/entries", response_model=ChartEntryResponse)
-async def add_chart_entry(
+def add_chart_entry(
     chart_id: int,
     entry_data: ChartEntryCreate,
     current_user: UserResponse = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    loaders: Loaders = Depends(get_loaders)
 ):
     """Add entry to chart"""
     # Verify chart exists
@@ -161,5 +150,5 @@ async def add_chart_entry(
     db.commit()
     db.refresh(new_entry)
     
-    return new_entry
+    return entry_responses([new_entry], loaders)[0]
 
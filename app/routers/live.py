@@ -0,0 +1,97 @@
+import asyncio
+import json
+from fastapi import APIRouter, HTTPException, Query, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from typing import List
+from app.config import settings
+from app.services.live_service import Subscription, encode, live_hub
+from app.services.profiler_service import ProfiledRoute
+
+router = APIRouter(prefix="/live", tags=["Live"], route_class=ProfiledRoute)
+
+TOPIC_HELP = "chart:{year}:{week}[:{region}], song:{id} or trending; repeat for several"
+
+
+@router.get("/sse")
+async def live_events(topic: List[str] = Query(..., description=TOPIC_HELP)):
+    """Server-sent events: a snapshot of each topic, then a diff whenever it changes"""
+    subscription = live_hub.connect()
+    if subscription is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many live connections",
+            headers={"Retry-After": "5"}
+        )
+    try:
+        live_hub.subscribe(subscription, topic)
+    except ValueError as exc:
+        live_hub.disconnect(subscription)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid topic: {exc}"
+        )
+
+    async def events():
+        while True:
+            messages = await subscription.receive(settings.LIVE_HEARTBEAT_SECONDS)
+            # A comment line keeps proxies from closing an idle stream
+            yield "".join(f"data: {message}\n\n" for message in messages) if messages else ": ping\n\n"
+
+    # Runs once the client disconnects and the stream is cancelled
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(live_hub.disconnect, subscription)
+    )
+
+
+async def _read_commands(websocket: WebSocket, subscription: Subscription):
+    """Apply {"subscribe": [...]} and {"unsubscribe": [...]} messages until the client goes away"""
+    try:
+        while True:
+            try:
+                command = json.loads(await websocket.receive_text())
+                if not isinstance(command, dict):
+                    raise ValueError("Expected a JSON object")
+                if "subscribe" in command:
+                    live_hub.subscribe(subscription, command["subscribe"])
+                if "unsubscribe" in command:
+                    live_hub.unsubscribe(subscription, command["unsubscribe"])
+                reply = {"type": "subscribed", "topics": sorted(subscription.topics)}
+            except (ValueError, TypeError) as exc:
+                reply = {"type": "error", "detail": f"Invalid command: {exc}"}
+            # Through the buffer, so replies and topic messages are sent by one writer
+            subscription.push(encode(reply))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        subscription.wake()
+
+
+@router.websocket("/ws")
+async def live_socket(websocket: WebSocket, topic: List[str] = Query([], description=TOPIC_HELP)):
+    """WebSocket: as /live/sse, plus subscribe/unsubscribe messages on the open connection"""
+    subscription = live_hub.connect()
+    if subscription is None:
+        # 1013: try again later
+        await websocket.close(code=1013)
+        return
+    await websocket.accept()
+    reader = None
+    try:
+        try:
+            live_hub.subscribe(subscription, topic)
+        except ValueError as exc:
+            await websocket.send_text(encode({"type": "error", "detail": f"Invalid topic: {exc}"}))
+        reader = asyncio.create_task(_read_commands(websocket, subscription))
+        while not reader.done():
+            for message in await subscription.receive():
+                await websocket.send_text(message)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        if reader is not None:
+            reader.cancel()
+        live_hub.disconnect(subscription)
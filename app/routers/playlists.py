@@ -3,18 +3,47 @@ from sqlalchemy.orm import Session
 from sqlalchemy import func
 from typing import Optional, List
 from app.database.connection import get_db
-from app.models import Playlist, PlaylistSong, User
+from app.models import Playlist, PlaylistSong, Song, User
 from app.schemas.playlist import (
     PlaylistCreate, 
     PlaylistUpdate, 
     PlaylistResponse, 
     PlaylistDetailResponse,
+    PlaylistBatchResponse,
+    PlaylistSongResponse,
     PlaylistSongAdd
 )
-from app.services import get_current_active_user
+from app.services import get_current_active_user, get_optional_user
+from app.services.playlist_service import PlaylistStatsService
+from app.services.entity_cache import load_many, parse_ids
+from app.services.loaders import Loaders, get_loaders
+from app.services.profiler_service import ProfiledRoute
 from app.schemas.user import UserResponse
 
-router = APIRouter(prefix="/playlists", tags=["Playlists"])
+router = APIRouter(prefix="/playlists", tags=["Playlists"], route_class=ProfiledRoute)
+
+
+def _detail_response(playlist: Playlist, db: Session, loaders: Loaders) -> PlaylistDetailResponse:
+    """Playlist with its tracks in order; songs and artists are loaded in batches"""
+    tracks = db.query(PlaylistSong).filter(
+        PlaylistSong.playlist_id == playlist.id
+    ).order_by(PlaylistSong.order, PlaylistSong.id).all()
+    songs = loaders.songs_with_artists(track.song_id for track in tracks)
+    return PlaylistDetailResponse(
+        **PlaylistResponse.model_validate(playlist).model_dump(),
+        songs=[
+            PlaylistSongResponse(
+                id=track.id,
+                playlist_id=track.playlist_id,
+                song_id=track.song_id,
+                order=track.order,
+                added_at=track.added_at,
+                song=songs[track.song_id]
+            )
+            # Tracks of deleted songs stay hidden until the purge job removes them
+            for track in tracks if track.song_id in songs
+        ]
+    )
 
 
 @router.get("/", response_model=List[PlaylistResponse])
@@ -30,8 +59,35 @@ async def get_playlists(
     return playlists
 
 
+@router.get("/batch", response_model=PlaylistBatchResponse)
+async def get_playlists_batch(
+    ids: List[str] = Query(..., description="Comma-separated playlist ids"),
+    current_user: Optional[UserResponse] = Depends(get_optional_user),
+    db: Session = Depends(get_db)
+):
+    """Get several playlists by ID, in the order given.
+
+    Only public playlists and the caller's own are returned; unknown and other
+    users' private ids are listed in missing alike.
+    """
+    playlist_ids = parse_ids(ids)
+    found = {
+        playlist_id: playlist
+        for playlist_id, playlist in load_many(db, Playlist, PlaylistResponse, playlist_ids).items()
+        if playlist.is_public or (current_user is not None and playlist.user_id == current_user.id)
+    }
+    return PlaylistBatchResponse(
+        items=[found[playlist_id] for playlist_id in playlist_ids if playlist_id in found],
+        missing=[playlist_id for playlist_id in playlist_ids if playlist_id not in found]
+    )
+
+
 @router.get("/{playlist_id}", response_model=PlaylistDetailResponse)
-async def get_playlist(playlist_id: int, db: Session = Depends(get_db)):
+async def get_playlist(
+    playlist_id: int,
+    db: Session = Depends(get_db),
+    loaders: Loaders = Depends(get_loaders)
+):
     """Get playlist details by ID"""
     playlist = db.query(Playlist).filter(Playlist.id == playlist_id).first()
     if not playlist:
@@ -39,11 +95,11 @@ async def get_playlist(playlist_id: int, db: Session = Depends(get_db)):
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Playlist not found"
         )
-    return playlist
+    return _detail_response(playlist, db, loaders)
 
 
 @router.post("/", response_model=PlaylistResponse)
-async def create_playlist(
+def create_playlist(
     playlist_data: PlaylistCreate,
     current_user: UserResponse = Depends(get_current_active_user),
     db: Session = Depends(get_db)
@@ -61,7 +117,7 @@ async def create_playlist(
 
 
 @router.put("/{playlist_id}", response_model=PlaylistResponse)
-async def update_playlist(
+def update_playlist(
     playlist_id: int,
     playlist_data: PlaylistUpdate,
     current_user: UserResponse = Depends(get_current_active_user),
@@ -93,7 +149,7 @@ async def update_playlist(
 
 
 @router.delete("/{playlist_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_playlist(
+def delete_playlist(
     playlist_id: int,
     current_user: UserResponse = Depends(get_current_active_user),
     db: Session = Depends(get_db)
@@ -118,11 +174,12 @@ async def delete_playlist(
 
 
 @router.post("/{playlist_id}/songs", response_model=PlaylistDetailResponse)
-async def add_song_to_playlist(
+def add_song_to_playlist(
     playlist_id: int,
     song_data: PlaylistSongAdd,
     current_user: UserResponse = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    loaders: Loaders = Depends(get_loaders)
 ):
     """Add a song to playlist"""
     playlist = db.query(Playlist).filter(Playlist.id == playlist_id).first()
@@ -139,6 +196,13 @@ async def add_song_to_playlist(
             detail="Not authorized to modify this playlist"
         )
     
+    song = db.query(Song).filter(Song.id == song_data.song_id).first()
+    if not song:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Song not found"
+        )
+    
     # Get max order
     max_order = db.query(func.max(PlaylistSong.order)).filter(
         PlaylistSong.playlist_id == playlist_id
@@ -150,14 +214,15 @@ async def add_song_to_playlist(
         order=song_data.order or max_order + 1
     )
     db.add(new_playlist_song)
+    PlaylistStatsService(db).track_added(playlist_id, song.duration_seconds)
     db.commit()
     db.refresh(playlist)
     
-    return playlist
+    return _detail_response(playlist, db, loaders)
 
 
 @router.delete("/{playlist_id}/songs/{song_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def remove_song_from_playlist(
+def remove_song_from_playlist(
     playlist_id: int,
     song_id: int,
     current_user: UserResponse = Depends(get_current_active_user),
@@ -189,7 +254,11 @@ async def remove_song_from_playlist(
             detail="Song not found in playlist"
         )
     
+    duration = db.query(Song.duration_seconds).filter(Song.id == song_id).execution_options(
+        include_deleted=True
+    ).scalar()
     db.delete(playlist_song)
+    PlaylistStatsService(db).track_removed(playlist_id, duration)
     db.commit()
 
 
@@ -1,13 +1,19 @@
+from datetime import datetime, timezone
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
 from typing import Optional, List
 from app.database.connection import get_db
 from app.models import Song, Artist
-from app.schemas.song import SongCreate, SongUpdate, SongResponse
+from app.schemas.song import SongCreate, SongUpdate, SongResponse, SongBatchResponse
 from app.services import get_current_active_user
+from app.services.playlist_service import PlaylistStatsService
+from app.services.coalesce_service import shared_session, single_flight
+from app.services.catalog_snapshot import catalog
+from app.services.entity_cache import load_many, load_one, parse_ids
+from app.services.profiler_service import ProfiledRoute
 from app.schemas.user import UserResponse
 
-router = APIRouter(prefix="/songs", tags=["Songs"])
+router = APIRouter(prefix="/songs", tags=["Songs"], route_class=ProfiledRoute)
 
 
 @router.get("/", response_model=List[SongResponse])
@@ -20,6 +26,11 @@ async def get_songs(
     db: Session = Depends(get_db)
 ):
     """Get list of songs with optional filters"""
+    if not genre and not region:
+        songs = catalog.page(db, "songs", skip, limit, artist_id=artist_id or None)
+        if songs is not None:
+            return songs
+    
     query = db.query(Song)
     
     if genre:
@@ -35,12 +46,16 @@ async def get_songs(
 
 @router.get("/trending", response_model=List[SongResponse])
 async def get_trending_songs(
-    limit: int = Query(10, ge=1, le=100),
-    db: Session = Depends(get_db)
+    limit: int = Query(10, ge=1, le=100)
 ):
     """Get trending songs by stream count"""
-    songs = db.query(Song).order_by(Song.stream_count.desc()).limit(limit).all()
-    return songs
+    def build() -> List[SongResponse]:
+        with shared_session() as db:
+            songs = db.query(Song).order_by(Song.stream_count.desc()).limit(limit).all()
+            return [SongResponse.model_validate(song) for song in songs]
+    
+    # Concurrent requests for the same list share one query
+    return await single_flight.run("songs.trending", {"limit": limit}, build)
 
 
 @router.get("/new-releases", response_model=List[SongResponse])
@@ -53,10 +68,24 @@ async def get_new_releases(
     return songs
 
 
+@router.get("/batch", response_model=SongBatchResponse)
+async def get_songs_batch(
+    ids: List[str] = Query(..., description="Comma-separated song ids"),
+    db: Session = Depends(get_db)
+):
+    """Get several songs by ID, in the order given; unknown ids are listed in missing"""
+    song_ids = parse_ids(ids)
+    found = load_many(db, Song, SongResponse, song_ids)
+    return SongBatchResponse(
+        items=[found[song_id] for song_id in song_ids if song_id in found],
+        missing=[song_id for song_id in song_ids if song_id not in found]
+    )
+
+
 @router.get("/{song_id}", response_model=SongResponse)
 async def get_song(song_id: int, db: Session = Depends(get_db)):
     """Get song details by ID"""
-    song = db.query(Song).filter(Song.id == song_id).first()
+    song = catalog.get("songs", song_id) or load_one(db, Song, SongResponse, song_id)
     if not song:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -66,7 +95,7 @@ async def get_song(song_id: int, db: Session = Depends(get_db)):
 
 
 @router.post("/", response_model=SongResponse)
-async def create_song(
+def create_song(
     song_data: SongCreate,
     current_user: UserResponse = Depends(get_current_active_user),
     db: Session = Depends(get_db)
@@ -89,7 +118,7 @@ async def create_song(
 
 
 @router.put("/{song_id}", response_model=SongResponse)
-async def update_song(
+def update_song(
     song_id: int,
     song_data: SongUpdate,
     current_user: UserResponse = Depends(get_current_active_user),
@@ -103,10 +132,14 @@ async def update_song(
             detail="Song not found"
         )
     
+    old_duration = song.duration_seconds
     update_data = song_data.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(song, field, value)
     
+    if song.duration_seconds != old_duration:
+        PlaylistStatsService(db).song_duration_changed(song.id, old_duration, song.duration_seconds)
+    
     db.commit()
     db.refresh(song)
     
@@ -114,12 +147,12 @@ async def update_song(
 
 
 @router.delete("/{song_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_song(
+def delete_song(
     song_id: int,
     current_user: UserResponse = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """Delete a song"""
+    """Delete a song; its playlist tracks, chart entries and analytics are purged in the background"""
     song = db.query(Song).filter(Song.id == song_id).first()
     if not song:
         raise HTTPException(
@@ -127,6 +160,6 @@ async def delete_song(
             detail="Song not found"
         )
     
-    db.delete(song)
+    song.deleted_at = datetime.now(timezone.utc)
     db.commit()
 
@@ -0,0 +1,29 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+from app.config import settings
+from app.database.connection import get_db
+from app.schemas.sync import SyncResponse
+from app.schemas.user import UserResponse
+from app.services import get_current_active_user
+from app.services.sync_service import InvalidSyncToken, SyncService
+from app.services.profiler_service import ProfiledRoute
+
+router = APIRouter(prefix="/sync", tags=["Sync"], route_class=ProfiledRoute)
+
+
+@router.get("/", response_model=SyncResponse, response_model_exclude_none=True)
+async def sync(
+    token: Optional[str] = Query(None, description="Token from the previous sync; omit for a full sync"),
+    limit: int = Query(settings.SYNC_PAGE_SIZE, ge=1, le=settings.SYNC_MAX_PAGE_SIZE),
+    current_user: UserResponse = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Catalog and own-playlist changes since ``token``; call again with the new token while has_more"""
+    try:
+        return SyncService(db, current_user.id).page(token, limit)
+    except InvalidSyncToken:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid sync token"
+        )
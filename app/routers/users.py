@@ -4,9 +4,11 @@ from typing import List
 from app.database.connection import get_db
 from app.models import User, Playlist
 from app.schemas.user import UserResponse
+from app.schemas.playlist import PlaylistResponse
 from app.services import get_current_active_user
+from app.services.profiler_service import ProfiledRoute
 
-router = APIRouter(prefix="/users", tags=["Users"])
+router = APIRouter(prefix="/users", tags=["Users"], route_class=ProfiledRoute)
 
 
 @router.get("/{user_id}", response_model=UserResponse)
@@ -21,7 +23,7 @@ async def get_user(user_id: int, db: Session = Depends(get_db)):
     return user
 
 
-@router.get("/{user_id}/playlists", response_model=List[Playlist])
+@router.get("/{user_id}/playlists", response_model=List[PlaylistResponse])
 async def get_user_playlists(
     user_id: int,
     current_user: UserResponse = Depends(get_current_active_user),
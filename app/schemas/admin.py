@@ -0,0 +1,83 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Optional, List
+
+
+class ProfilingSettings(BaseModel):
+    sql_profiling_enabled: bool
+    slow_query_threshold_ms: float
+    slow_query_explain: bool
+    server_timing_enabled: bool
+
+
+class ProfilingUpdate(BaseModel):
+    sql_profiling_enabled: Optional[bool] = None
+    slow_query_threshold_ms: Optional[float] = None
+    slow_query_explain: Optional[bool] = None
+    server_timing_enabled: Optional[bool] = None
+
+
+class QueryProfile(BaseModel):
+    statement: str
+    parameters: object = None
+    duration_ms: float
+    rowcount: Optional[int] = None
+
+
+class RequestProfileResponse(BaseModel):
+    method: str
+    path: str
+    total_ms: float
+    db_ms: float
+    auth_ms: float
+    serialize_ms: float
+    query_count: int
+    queries: List[QueryProfile] = []
+
+
+class JobStatus(BaseModel):
+    name: str
+    trigger: str
+    next_run_at: Optional[datetime] = None
+    running: bool
+    last_started_at: Optional[datetime] = None
+    last_finished_at: Optional[datetime] = None
+    last_duration_ms: Optional[float] = None
+    last_status: Optional[str] = None
+    last_result: Optional[str] = None
+    last_error: Optional[str] = None
+    runs: int
+    failures: int
+    skipped: int
+    # From job_leases: the process currently or last holding the job, across all workers
+    lease_owner: Optional[str] = None
+    lease_expires_at: Optional[datetime] = None
+
+
+class SchedulerStatus(BaseModel):
+    enabled: bool
+    running: bool
+    owner: str
+    max_workers: int
+    jobs: List[JobStatus]
+
+
+class OutboxConsumerStatus(BaseModel):
+    name: str
+    entities: Optional[List[str]] = None
+    durable: bool
+    # Id of the last change record handled
+    position: Optional[int] = None
+    lag: Optional[int] = None
+    delivered: int
+    batches: int
+    failures: int
+    last_error: Optional[str] = None
+    last_delivered_at: Optional[datetime] = None
+
+
+class OutboxStatus(BaseModel):
+    enabled: bool
+    running: bool
+    head: int
+    consumers: List[OutboxConsumerStatus]
@@ -1,9 +1,7 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional, List, TYPE_CHECKING
-
-if TYPE_CHECKING:
-    from app.schemas.song import SongResponse
+from typing import Dict, Optional, List
+from app.schemas.song import SongWithArtistResponse
 
 
 class AnalyticsBase(BaseModel):
@@ -31,12 +29,29 @@ class AnalyticsResponse(AnalyticsBase):
         from_attributes = True
 
 
+class ListenCreate(BaseModel):
+    song_id: int
+    region: Optional[str] = None
+    # Defaults to when the batch is received
+    listened_at: Optional[datetime] = None
+
+
+class ListenBatch(BaseModel):
+    listens: List[ListenCreate] = Field(..., min_length=1, max_length=500)
+
+
+class ListenBatchResult(BaseModel):
+    recorded: int
+    # Listener sketch rows appended (app.services.sketch_service)
+    sketch_rows: int
+
+
 class AnalyticsOverview(BaseModel):
     total_streams: int
     total_unique_listeners: int
     total_likes: int
     total_shares: int
-    top_songs: List[SongResponse] = []
+    top_songs: List[SongWithArtistResponse] = []
     top_regions: List[dict] = []
 
 
@@ -46,3 +61,20 @@ class RegionAnalytics(BaseModel):
     unique_listeners: int
     share_percentage: float
 
+
+
+class TrendPoint(BaseModel):
+    timestamp: datetime
+    values: Dict[str, int]
+
+
+class TrendSeries(BaseModel):
+    entity: str
+    key: Optional[str] = None
+    metrics: List[str]
+    bucket: str
+    # Source buckets merged into each point when the series was downsampled
+    bucket_span: int = 1
+    start: datetime
+    end: datetime
+    points: List[TrendPoint] = []
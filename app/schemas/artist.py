@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional
+from typing import Optional, List
 
 
 class ArtistBase(BaseModel):
@@ -10,12 +10,14 @@ class ArtistBase(BaseModel):
 
 
 class ArtistCreate(ArtistBase):
+    external_id: Optional[str] = None
     bio: Optional[str] = None
     image_url: Optional[str] = None
 
 
 class ArtistUpdate(BaseModel):
     name: Optional[str] = None
+    external_id: Optional[str] = None
     bio: Optional[str] = None
     image_url: Optional[str] = None
     region: Optional[str] = None
@@ -25,6 +27,7 @@ class ArtistUpdate(BaseModel):
 
 class ArtistResponse(ArtistBase):
     id: int
+    external_id: Optional[str] = None
     bio: Optional[str] = None
     image_url: Optional[str] = None
     monthly_listeners: int
@@ -34,3 +37,7 @@ class ArtistResponse(ArtistBase):
     class Config:
         from_attributes = True
 
+
+class ArtistBatchResponse(BaseModel):
+    items: List[ArtistResponse]
+    missing: List[int] = []
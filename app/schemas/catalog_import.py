@@ -0,0 +1,62 @@
+from pydantic import BaseModel, field_validator, model_validator
+from datetime import datetime
+from typing import Any, List, Optional
+
+
+class ImportRow(BaseModel):
+    @field_validator("*", mode="before")
+    @classmethod
+    def blank_to_none(cls, value: Any) -> Any:
+        # CSV has no null: empty cells mean "not given"
+        if isinstance(value, str):
+            value = value.strip()
+            return value or None
+        return value
+
+
+class ArtistImportRow(ImportRow):
+    name: str
+    external_id: Optional[str] = None
+    bio: Optional[str] = None
+    image_url: Optional[str] = None
+    region: Optional[str] = None
+    genre: Optional[str] = None
+
+
+class SongImportRow(ImportRow):
+    title: str
+    # The artist, by id, by external id or by name (checked in that order)
+    artist_id: Optional[int] = None
+    artist_external_id: Optional[str] = None
+    artist_name: Optional[str] = None
+    album: Optional[str] = None
+    duration_seconds: Optional[int] = None
+    release_date: Optional[datetime] = None
+    genre: Optional[str] = None
+    region: Optional[str] = None
+    cover_url: Optional[str] = None
+    audio_url: Optional[str] = None
+    is_explicit: Optional[bool] = False
+
+    @model_validator(mode="after")
+    def has_artist(self) -> "SongImportRow":
+        if self.artist_id is None and self.artist_external_id is None and self.artist_name is None:
+            raise ValueError("one of artist_id, artist_external_id or artist_name is required")
+        return self
+
+
+class ImportRowError(BaseModel):
+    line: int
+    errors: List[str]
+
+
+class ImportReport(BaseModel):
+    kind: str
+    rows: int = 0
+    inserted: int = 0
+    skipped: int = 0
+    failed: int = 0
+    artists_created: int = 0
+    seconds: float = 0
+    # The first errors only; failed counts them all
+    errors: List[ImportRowError] = []
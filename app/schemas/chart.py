@@ -1,10 +1,7 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional, List, TYPE_CHECKING
-
-if TYPE_CHECKING:
-    from app.schemas.song import SongResponse
-    from app.schemas.playlist import PlaylistSongResponse
+from typing import Optional, List
+from app.schemas.song import SongWithArtistResponse
 
 
 class ChartBase(BaseModel):
@@ -41,7 +38,7 @@ class ChartEntryResponse(ChartEntryBase):
     id: int
     chart_id: int
     created_at: datetime
-    song: Optional["SongResponse"] = None
+    song: Optional[SongWithArtistResponse] = None
     
     class Config:
         from_attributes = True
@@ -1,9 +1,7 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional, List, TYPE_CHECKING
-
-if TYPE_CHECKING:
-    from app.schemas.song import SongResponse
+from typing import Optional, List
+from app.schemas.song import SongWithArtistResponse
 
 
 class PlaylistBase(BaseModel):
@@ -28,6 +26,8 @@ class PlaylistResponse(PlaylistBase):
     description: Optional[str] = None
     user_id: int
     cover_url: Optional[str] = None
+    track_count: int = 0
+    total_duration_seconds: int = 0
     created_at: datetime
     updated_at: datetime
     
@@ -46,7 +46,7 @@ class PlaylistSongResponse(BaseModel):
     song_id: int
     order: int
     added_at: datetime
-    song: Optional["SongResponse"] = None
+    song: Optional[SongWithArtistResponse] = None
     
     class Config:
         from_attributes = True
@@ -57,9 +57,16 @@ class PlaylistDetailResponse(PlaylistBase):
     description: Optional[str] = None
     user_id: int
     cover_url: Optional[str] = None
+    track_count: int = 0
+    total_duration_seconds: int = 0
     created_at: datetime
     updated_at: datetime
     songs: List[PlaylistSongResponse] = []
     
     class Config:
         from_attributes = True
+
+
+class PlaylistBatchResponse(BaseModel):
+    items: List[PlaylistResponse]
+    missing: List[int] = []
@@ -1,9 +1,7 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional, TYPE_CHECKING
-
-if TYPE_CHECKING:
-    from app.schemas.artist import ArtistResponse
+from typing import Optional, List
+from app.schemas.artist import ArtistResponse
 
 
 class SongBase(BaseModel):
@@ -52,3 +50,11 @@ class SongResponse(SongBase):
     class Config:
         from_attributes = True
 
+
+class SongWithArtistResponse(SongResponse):
+    artist: Optional[ArtistResponse] = None
+
+
+class SongBatchResponse(BaseModel):
+    items: List[SongResponse]
+    missing: List[int] = []
@@ -0,0 +1,38 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import List
+from app.schemas.artist import ArtistResponse
+from app.schemas.song import SongResponse
+from app.schemas.playlist import PlaylistResponse
+
+
+class SyncTrack(BaseModel):
+    id: int
+    playlist_id: int
+    song_id: int
+    order: int
+    added_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+
+class SyncDeleted(BaseModel):
+    artists: List[int] = []
+    songs: List[int] = []
+    playlists: List[int] = []
+    playlist_songs: List[int] = []
+
+
+class SyncResponse(BaseModel):
+    # Send back on the next sync
+    token: str
+    # Another page is ready: sync again right away
+    has_more: bool
+    # First page of a full sync: drop the local copy before applying this page
+    reset: bool = False
+    artists: List[ArtistResponse] = []
+    songs: List[SongResponse] = []
+    playlists: List[PlaylistResponse] = []
+    playlist_songs: List[SyncTrack] = []
+    deleted: SyncDeleted = SyncDeleted()
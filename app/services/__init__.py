@@ -1,7 +1,5 @@
 from datetime import datetime, timedelta
 from typing import Optional
-from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
@@ -9,37 +7,56 @@ from app.config import settings
 from app.database.connection import get_db
 from app.models import User
 from app.schemas.user import UserResponse
+from app.services.metrics_service import password_hash_seconds, jwt_seconds
+from app.services.profiler_service import auth_timer
 
-# Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing context, created on first use (passlib and bcrypt are slow to import)
+_pwd_context = None
+
+
+def get_pwd_context():
+    """Return the shared password hashing context"""
+    global _pwd_context
+    if _pwd_context is None:
+        from passlib.context import CryptContext
+        _pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    return _pwd_context
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against a hash"""
-    return pwd_context.verify(plain_password, hashed_password)
+    with auth_timer(), password_hash_seconds.time(("verify",)):
+        return get_pwd_context().verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
     """Hash a password"""
-    return pwd_context.hash(password)
+    with auth_timer(), password_hash_seconds.time(("hash",)):
+        return get_pwd_context().hash(password)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token"""
+    from jose import jwt
+
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+    with auth_timer(), jwt_seconds.time(("encode",)):
+        encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
 
 def decode_token(token: str) -> dict:
     """Decode and validate a JWT token"""
+    from jose import JWTError, jwt
+
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        with auth_timer(), jwt_seconds.time(("decode",)):
+            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         return payload
     except JWTError:
         raise HTTPException(
@@ -60,19 +77,31 @@ async def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
     
+    # decode_token raises its own 401 for invalid or expired tokens
+    payload = decode_token(token)
     try:
-        payload = decode_token(token)
-        user_id: int = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-    except JWTError:
+        user_id: int = int(payload.get("sub"))
+    except (TypeError, ValueError):
         raise credentials_exception
     
     user = db.query(User).filter(User.id == user_id).first()
     if user is None:
         raise credentials_exception
-    
-    return UserResponse.model_validate(user)
+    current_user = UserResponse.model_validate(user)
+    # Hand the connection back: the handler may await (e.g. a shared computation)
+    # long before it touches the session again
+    db.rollback()
+    return current_user
+
+
+async def get_optional_user(
+    token: Optional[str] = Depends(OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login", auto_error=False)),
+    db: Session = Depends(get_db)
+) -> Optional[UserResponse]:
+    """The authenticated user, or None without a token; an invalid token is still a 401"""
+    if token is None:
+        return None
+    return await get_current_user(token, db)
 
 
 async def get_current_active_user(
@@ -83,3 +112,12 @@ async def get_current_active_user(
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
+
+
+async def get_current_admin_user(
+    current_user: UserResponse = Depends(get_current_active_user)
+) -> UserResponse:
+    """Get current user and check admin rights"""
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin privileges required")
+    return current_user
@@ -1,39 +1,114 @@
+import argparse
+import math
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from app.models import Song, Analytics, Artist
-from app.schemas.analytics import AnalyticsOverview, RegionAnalytics
+from sqlalchemy import String, case, cast, func, insert, literal, select
+from app.database.functions import day_of
+from app.database.partitions import analytics_partitions
+from app.models import Song, Analytics, AnalyticsDirtyDay, AnalyticsRollup, Artist
+from app.schemas.analytics import AnalyticsOverview, ListenCreate, RegionAnalytics, TrendPoint, TrendSeries
+from app.services.loaders import Loaders
+from app.services.sketch_service import UNKNOWN_REGION, ListenerSketchService
+
+# Public metric name -> column on Analytics / AnalyticsRollup
+TREND_METRICS = {
+    "streams": "stream_count",
+    "listeners": "unique_listeners",
+    "likes": "likes_count",
+    "shares": "shares_count",
+}
+TREND_ENTITIES = ("all", "song", "artist", "region", "genre")
+TREND_BUCKETS = ("hour", "day", "week", "month")
+# Hourly series are computed from raw rows, so keep their ranges short
+MAX_HOURLY_RANGE = timedelta(days=31)
+
+
+def bucket_start(moment: datetime, bucket: str) -> datetime:
+    """Start of the hour/day/week (Monday)/month containing ``moment``"""
+    if bucket == "hour":
+        return moment.replace(minute=0, second=0, microsecond=0)
+    day = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())
+    if bucket == "month":
+        return day.replace(day=1)
+    return day
+
+
+def next_bucket(moment: datetime, bucket: str) -> datetime:
+    """Start of the bucket following the one starting at ``moment``"""
+    if bucket == "hour":
+        return moment + timedelta(hours=1)
+    if bucket == "week":
+        return moment + timedelta(weeks=1)
+    if bucket == "month":
+        return moment.replace(year=moment.year + moment.month // 12, month=moment.month % 12 + 1)
+    return moment + timedelta(days=1)
+
+
+def naive_utc(moment: datetime) -> datetime:
+    """Convert to naive UTC, the form analytics dates are stored in"""
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
 
 
 class AnalyticsService:
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, loaders: Optional[Loaders] = None):
         self.db = db
+        self.loaders = loaders or Loaders(db)
     
+    def record_listens(self, listener_id: int, listens: List[ListenCreate]) -> Tuple[int, int]:
+        """Write one listener's listens as analytics rows and listener sketches; the caller commits.
+
+        Listens are grouped into one row per song, region and hour, with the listens
+        as stream_count and a unique_listeners of 1. Returns (listens, sketch rows).
+        """
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        rows: Dict[tuple, dict] = {}
+        events = []
+        for listen in listens:
+            moment = naive_utc(listen.listened_at) if listen.listened_at else now
+            hour = bucket_start(moment, "hour")
+            row = rows.get((listen.song_id, listen.region, hour))
+            if row is None:
+                row = rows[(listen.song_id, listen.region, hour)] = {
+                    "song_id": listen.song_id, "region": listen.region, "date": hour,
+                    "stream_count": 0, "unique_listeners": 1,
+                }
+            row["stream_count"] += 1
+            events.append((listener_id, listen.song_id, listen.region, moment))
+
+        analytics_partitions.insert(self.db, rows.values())
+        sketch_rows = ListenerSketchService(self.db).record(events)
+        return len(listens), sketch_rows
+
     def get_overview(self) -> AnalyticsOverview:
         """Get analytics overview"""
-        total_streams = self.db.query(func.coalesce(func.sum(Analytics.stream_count), 0)).scalar() or 0
-        total_unique = self.db.query(func.coalesce(func.sum(Analytics.unique_listeners), 0)).scalar() or 0
-        total_likes = self.db.query(func.coalesce(func.sum(Analytics.likes_count), 0)).scalar() or 0
-        total_shares = self.db.query(func.coalesce(func.sum(Analytics.shares_count), 0)).scalar() or 0
+        analytics = analytics_partitions.source(self.db)
+        totals = self.db.query(
+            func.coalesce(func.sum(analytics.c.stream_count), 0),
+            func.coalesce(func.sum(analytics.c.unique_listeners), 0),
+            func.coalesce(func.sum(analytics.c.likes_count), 0),
+            func.coalesce(func.sum(analytics.c.shares_count), 0),
+        ).one()
+        total_streams, total_unique, total_likes, total_shares = totals
+        # Summed daily counts repeat listeners across days and regions; prefer the sketches
+        region_data, sketched_unique, region_listeners = self._region_totals(analytics)
+        if sketched_unique is not None:
+            total_unique = sketched_unique
         
         # Get top songs by streams
-        top_songs = self.db.query(Song).order_by(Song.stream_count.desc()).limit(10).all()
-        
-        # Get region breakdown
-        region_data = (
-            self.db.query(
-                Analytics.region,
-                func.sum(Analytics.stream_count).label('total_streams'),
-                func.sum(Analytics.unique_listeners).label('total_listeners')
-            )
-            .group_by(Analytics.region)
-            .all()
-        )
+        top_ids = [row[0] for row in self.db.query(Song.id).order_by(Song.stream_count.desc()).limit(10)]
+        songs = self.loaders.songs_with_artists(top_ids)
+        top_songs = [songs[song_id] for song_id in top_ids if song_id in songs]
         
         top_regions = [
             {
                 "region": r.region or "Unknown",
                 "total_streams": r.total_streams or 0,
-                "unique_listeners": r.total_listeners or 0
+                "unique_listeners": region_listeners.get(r.region or "Unknown", r.total_listeners or 0)
             }
             for r in region_data
         ]
@@ -49,15 +124,8 @@ class AnalyticsService:
     
     def get_region_analytics(self) -> list[RegionAnalytics]:
         """Get analytics grouped by region"""
-        region_data = (
-            self.db.query(
-                Analytics.region,
-                func.sum(Analytics.stream_count).label('total_streams'),
-                func.sum(Analytics.unique_listeners).label('total_listeners')
-            )
-            .group_by(Analytics.region)
-            .all()
-        )
+        analytics = analytics_partitions.source(self.db)
+        region_data, _, region_listeners = self._region_totals(analytics)
         
         total_streams = sum(r.total_streams or 0 for r in region_data)
         
@@ -65,7 +133,7 @@ class AnalyticsService:
             RegionAnalytics(
                 region=r.region or "Unknown",
                 total_streams=r.total_streams or 0,
-                unique_listeners=r.total_listeners or 0,
+                unique_listeners=region_listeners.get(r.region or "Unknown", r.total_listeners or 0),
                 share_percentage=(r.total_streams or 0) / total_streams * 100 if total_streams > 0 else 0
             )
             for r in region_data
@@ -77,34 +145,23 @@ class AnalyticsService:
         if not song:
             return None
         
-        total_streams = self.db.query(func.coalesce(func.sum(Analytics.stream_count), 0)).filter(
-            Analytics.song_id == song_id
-        ).scalar() or 0
-        
-        total_unique = self.db.query(func.coalesce(func.sum(Analytics.unique_listeners), 0)).filter(
-            Analytics.song_id == song_id
-        ).scalar() or 0
-        
-        region_data = (
-            self.db.query(
-                Analytics.region,
-                func.sum(Analytics.stream_count).label('total_streams'),
-                func.sum(Analytics.unique_listeners).label('total_listeners')
-            )
-            .filter(Analytics.song_id == song_id)
-            .group_by(Analytics.region)
-            .all()
-        )
+        analytics = analytics_partitions.source(self.db, filters=lambda t: [t.c.song_id == song_id])
+        region_data, sketched_unique, region_listeners = self._region_totals(analytics, [song_id])
+        total_streams = sum(r.total_streams or 0 for r in region_data)
+        total_unique = sum(r.total_listeners or 0 for r in region_data)
+        if sketched_unique is not None:
+            total_unique = sketched_unique
         
-        daily_stats = self.db.query(Analytics).filter(
-            Analytics.song_id == song_id
-        ).order_by(Analytics.date.desc()).limit(30).all()
+        daily_stats = [
+            dict(row) for row in
+            self.db.execute(select(analytics).order_by(analytics.c.date.desc()).limit(30)).mappings()
+        ]
         
         region_breakdown = [
             RegionAnalytics(
                 region=r.region or "Unknown",
                 total_streams=r.total_streams or 0,
-                unique_listeners=r.total_listeners or 0,
+                unique_listeners=region_listeners.get(r.region or "Unknown", r.total_listeners or 0),
                 share_percentage=0
             )
             for r in region_data
@@ -118,3 +175,248 @@ class AnalyticsService:
             "daily_stats": daily_stats
         }
 
+    def _region_totals(self, analytics, song_ids: Optional[List[int]] = None):
+        """Streams and listeners per region of ``analytics``, for all songs or ``song_ids``.
+
+        Returns (rows, distinct listeners or None, {region: distinct listeners}).
+        Listeners come from the sketches where a region has them; summed daily
+        counts from before a region's first sketch are added on, so history
+        recorded before sketches existed is not dropped.
+        """
+        sketches = ListenerSketchService(self.db)
+        coverage = sketches.coverage(song_ids)
+        columns = [
+            analytics.c.region,
+            func.sum(analytics.c.stream_count).label('total_streams'),
+            func.sum(analytics.c.unique_listeners).label('total_listeners'),
+        ]
+        if coverage:
+            first_sketch = case(
+                {region: datetime.combine(day, time.min) for region, day in coverage.items()},
+                value=func.coalesce(analytics.c.region, UNKNOWN_REGION)
+            )
+            columns.append(
+                func.sum(case((analytics.c.date < first_sketch, analytics.c.unique_listeners), else_=0))
+                .label('listeners_before_sketches')
+            )
+        region_data = self.db.query(*columns).group_by(analytics.c.region).all()
+
+        sketched = sketches.unique_listeners(song_ids=song_ids) if coverage else None
+        if sketched is None:
+            return region_data, None, {}
+        total, region_listeners = sketched
+        for r in region_data:
+            region = r.region or UNKNOWN_REGION
+            if region in region_listeners:
+                earlier = r.listeners_before_sketches or 0
+                region_listeners[region] += earlier
+            else:
+                earlier = r.total_listeners or 0
+            total += earlier
+        return region_data, total, region_listeners
+
+    def get_trends(
+        self,
+        entity: str,
+        key: Optional[str],
+        metrics: List[str],
+        start: datetime,
+        end: datetime,
+        bucket: str = "day",
+        max_points: int = 1000,
+        fill_gaps: bool = True,
+    ) -> TrendSeries:
+        """Time series of the given metrics for one entity over [start, end).
+
+        Day/week/month buckets are built from the daily rollups; hourly buckets read raw
+        analytics rows. Buckets with no data are filled with zeros when ``fill_gaps`` is
+        set, and when there are more than ``max_points`` buckets consecutive ones are
+        summed together (see ``bucket_span`` in the result).
+        """
+        start, end = naive_utc(start), naive_utc(end)
+        grid = []
+        moment = bucket_start(start, bucket)
+        while moment < end:
+            grid.append(moment)
+            moment = next_bucket(moment, bucket)
+
+        # Whole buckets only: the first and last may extend past start and end
+        if not grid:
+            totals = {}
+        elif bucket == "hour":
+            totals = self._hourly_totals(entity, key, metrics, grid[0], moment)
+        else:
+            totals = self._rollup_totals(entity, key, metrics, grid[0], moment, bucket)
+
+        span = max(1, math.ceil(len(grid) / max_points))
+        points = []
+        for i in range(0, len(grid), span):
+            group = [totals[b] for b in grid[i:i + span] if b in totals]
+            if not group and not fill_gaps:
+                continue
+            points.append(TrendPoint(
+                timestamp=grid[i],
+                values={metric: sum(values[metric] for values in group) for metric in metrics}
+            ))
+
+        if "listeners" in metrics and bucket != "hour" and points:
+            self._apply_sketched_listeners(entity, key, points, grid[::span] + [moment], bucket)
+
+        return TrendSeries(
+            entity=entity, key=key, metrics=metrics, bucket=bucket, bucket_span=span,
+            start=start, end=end, points=points
+        )
+
+    def _apply_sketched_listeners(self, entity, key, points, boundaries, bucket):
+        """Replace summed listener counts with distinct counts in buckets that have sketches"""
+        if entity == "genre":
+            return
+        song_ids, regions = None, None
+        if entity == "song":
+            song_ids = [int(key)]
+        elif entity == "artist":
+            song_ids = [row[0] for row in self.db.query(Song.id).filter(Song.artist_id == int(key)).all()]
+        elif entity == "region":
+            regions = [key]
+        sketched = ListenerSketchService(self.db).unique_listeners_by_bucket(
+            boundaries, song_ids, regions, monthly=bucket == "month"
+        )
+        if sketched is not None:
+            for point in points:
+                point.values["listeners"] = sketched.get(point.timestamp, point.values["listeners"])
+
+    def _rollup_totals(self, entity, key, metrics, start, end, bucket) -> Dict[datetime, Dict[str, int]]:
+        columns = [getattr(AnalyticsRollup, TREND_METRICS[m]) for m in metrics]
+        rows = (
+            self.db.query(AnalyticsRollup.day, *columns)
+            .filter(
+                AnalyticsRollup.entity_type == entity,
+                AnalyticsRollup.entity_key == (key or ""),
+                AnalyticsRollup.day >= start.date(),
+                AnalyticsRollup.day < end.date(),
+            )
+            .all()
+        )
+        return self._bucket_rows(
+            ((datetime.combine(row[0], time.min), row[1:]) for row in rows), metrics, bucket
+        )
+
+    def _hourly_totals(self, entity, key, metrics, start, end) -> Dict[datetime, Dict[str, int]]:
+        filters = None
+        if entity == "song":
+            filters = lambda t: [t.c.song_id == int(key)]
+        elif entity == "region":
+            filters = lambda t: [t.c.region == key]
+        analytics = analytics_partitions.source(self.db, start, end, filters)
+
+        columns = [analytics.c[TREND_METRICS[m]] for m in metrics]
+        query = self.db.query(analytics.c.date, *columns)
+        if entity == "artist":
+            query = query.join(Song, Song.id == analytics.c.song_id).filter(Song.artist_id == int(key))
+        elif entity == "genre":
+            query = query.join(Song, Song.id == analytics.c.song_id).filter(Song.genre == key)
+        return self._bucket_rows(((row[0], row[1:]) for row in query.all()), metrics, "hour")
+
+    @staticmethod
+    def _bucket_rows(rows, metrics, bucket) -> Dict[datetime, Dict[str, int]]:
+        totals: Dict[datetime, Dict[str, int]] = {}
+        for moment, values in rows:
+            entry = totals.setdefault(bucket_start(naive_utc(moment), bucket), dict.fromkeys(metrics, 0))
+            for metric, value in zip(metrics, values):
+                entry[metric] += value or 0
+        return totals
+
+
+class AnalyticsRollupService:
+    """Maintains analytics_rollups: daily totals per song, artist, region, genre and overall.
+
+    Runs incrementally. Analytics writes queue the days they touch in
+    analytics_dirty_days, and each run recomputes only those days. Pass ``full=True``
+    to rebuild every day, e.g. after editing analytics rows by hand. Days already
+    compacted to week/month granularity roll up onto the week/month start on a full
+    rebuild, so prefer incremental runs once compaction is enabled.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def refresh(self, full: bool = False, days_per_batch: int = 31) -> int:
+        """Bring rollups up to date and return the number of days recomputed"""
+        latest = self.db.query(func.max(AnalyticsDirtyDay.id)).scalar()
+        if full:
+            self.db.query(AnalyticsRollup).delete(synchronize_session=False)
+            analytics = analytics_partitions.source(self.db)
+            days = self.db.query(day_of(analytics.c.date)).filter(analytics.c.date.isnot(None)).distinct().all()
+        elif latest is None:
+            return 0
+        else:
+            days = (
+                self.db.query(AnalyticsDirtyDay.day)
+                .filter(AnalyticsDirtyDay.id <= latest)
+                .distinct()
+                .all()
+            )
+        days = sorted(row[0] for row in days)
+
+        for i in range(0, len(days), days_per_batch):
+            self._rebuild_days(days[i:i + days_per_batch])
+            # Commit per batch; an interrupted run redoes at most the remaining days
+            self.db.commit()
+
+        if latest is not None:
+            self.db.query(AnalyticsDirtyDay).filter(AnalyticsDirtyDay.id <= latest).delete(synchronize_session=False)
+        self.db.commit()
+        return len(days)
+
+    def _rebuild_days(self, days: List[date]):
+        self.db.query(AnalyticsRollup).filter(AnalyticsRollup.day.in_(days)).delete(synchronize_session=False)
+
+        # Only partitions covering these days are read
+        analytics = analytics_partitions.source(
+            self.db,
+            datetime.combine(days[0], time.min),
+            datetime.combine(days[-1] + timedelta(days=1), time.min),
+            filters=lambda t: [day_of(t.c.date).in_(days)],
+        )
+        day = day_of(analytics.c.date)
+        sums = [func.coalesce(func.sum(analytics.c[column]), 0) for column in TREND_METRICS.values()]
+        target = [
+            AnalyticsRollup.entity_type, AnalyticsRollup.entity_key, AnalyticsRollup.day,
+            *(getattr(AnalyticsRollup, column) for column in TREND_METRICS.values()),
+        ]
+
+        # entity type -> (key expression, needs the songs join, extra filters)
+        entities = {
+            "all": (literal(""), False, []),
+            "song": (cast(analytics.c.song_id, String), False, [analytics.c.song_id.isnot(None)]),
+            "region": (func.coalesce(analytics.c.region, "Unknown"), False, []),
+            "artist": (cast(Song.artist_id, String), True, []),
+            "genre": (func.coalesce(Song.genre, "Unknown"), True, []),
+        }
+        for entity_type, (key, join_songs, filters) in entities.items():
+            source = select(literal(entity_type), key, day, *sums).select_from(analytics)
+            if join_songs:
+                source = source.join(Song, Song.id == analytics.c.song_id)
+            source = source.where(*filters).group_by(key, day)
+            self.db.execute(insert(AnalyticsRollup).from_select(target, source))
+
+
+def main():
+    """Run the analytics rollup job from the command line"""
+    from app.database.connection import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Refresh daily analytics rollups")
+    parser.add_argument("--full", action="store_true", help="Rebuild every day instead of only new data")
+    parser.add_argument("--days-per-batch", type=int, default=31)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        days = AnalyticsRollupService(db).refresh(full=args.full, days_per_batch=args.days_per_batch)
+    finally:
+        db.close()
+    print(f"Analytics rollups refreshed: {days} day(s) recomputed")
+
+
+if __name__ == "__main__":
+    main()
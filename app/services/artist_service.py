@@ -0,0 +1,157 @@
+import argparse
+import json
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, List, Optional, Set
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+from app.database.partitions import analytics_partitions
+from app.models import Artist, ListenerSketch, Song
+from app.services.checkpoint_service import get_checkpoint, set_checkpoint
+from app.services.hll import HyperLogLog
+
+CHECKPOINT = "artist_monthly_listeners"
+
+
+class MonthlyListenersService:
+    """Maintains Artist.monthly_listeners: distinct listeners over the last 30 days.
+
+    Runs incrementally. The checkpoint records the newest analytics ``created_at``
+    and listener sketch id seen and the window start of the previous run; the next
+    run recomputes only artists whose songs received analytics or sketches since,
+    plus artists with analytics on the days that left the window. Counts come from
+    the listener sketches when an artist has any in the window, otherwise from the
+    summed daily ``unique_listeners``.
+    """
+
+    def __init__(self, db: Session, window_days: int = 30):
+        self.db = db
+        self.window_days = window_days
+
+    def refresh(self, full: bool = False, batch_size: int = 500, today: Optional[date] = None) -> int:
+        """Bring monthly_listeners up to date and return the number of artists recomputed"""
+        today = today or datetime.now(timezone.utc).date()
+        window_start = datetime.combine(today - timedelta(days=self.window_days - 1), time.min)
+        state = json.loads(get_checkpoint(self.db, CHECKPOINT, "{}"))
+        analytics = analytics_partitions.source(self.db, start=window_start)
+
+        # Read the new watermarks first: rows arriving during the run are picked up next time
+        newest_row = self.db.execute(select(func.max(analytics.c.created_at))).scalar()
+        newest_sketch = self.db.query(func.max(ListenerSketch.id)).scalar() or 0
+
+        if full or not state:
+            artist_ids = [row[0] for row in self.db.query(Artist.id).order_by(Artist.id).all()]
+        else:
+            artist_ids = sorted(self._changed_artists(state, window_start))
+
+        for i in range(0, len(artist_ids), batch_size):
+            self._recompute(artist_ids[i:i + batch_size], window_start)
+            # Commit per batch; an interrupted run starts again from the old checkpoint
+            self.db.commit()
+
+        if newest_row is None:
+            newest_row = state.get("created_at")
+        elif not isinstance(newest_row, str):
+            newest_row = newest_row.isoformat(sep=" ")
+        set_checkpoint(self.db, CHECKPOINT, json.dumps({
+            "created_at": newest_row,
+            "sketch_id": newest_sketch,
+            "window_start": window_start.isoformat(),
+        }))
+        self.db.commit()
+        return len(artist_ids)
+
+    def _changed_artists(self, state: dict, window_start: datetime) -> Set[int]:
+        song_ids = set()
+        if state.get("created_at"):
+            # Overlap by a second so rows written in the same clock tick as the
+            # watermark are not missed, whatever precision the column stores
+            since = datetime.fromisoformat(state["created_at"]) - timedelta(seconds=1)
+            analytics = analytics_partitions.source(
+                self.db, start=window_start, filters=lambda t: [t.c.created_at >= since]
+            )
+            song_ids.update(row[0] for row in self.db.execute(select(analytics.c.song_id).distinct()))
+
+        previous_start = datetime.fromisoformat(state["window_start"]) if state.get("window_start") else None
+        if previous_start is not None and previous_start < window_start:
+            # Days that slid out of the window lower these artists' counts
+            expired = analytics_partitions.source(self.db, previous_start, window_start)
+            song_ids.update(row[0] for row in self.db.execute(select(expired.c.song_id).distinct()))
+
+        song_ids.update(
+            row[0] for row in self.db.query(ListenerSketch.song_id)
+            .filter(
+                ListenerSketch.id > state.get("sketch_id", 0),
+                ListenerSketch.song_id.isnot(None),
+                ListenerSketch.period == "day",
+                ListenerSketch.day >= window_start.date(),
+            )
+            .distinct()
+        )
+        song_ids.discard(None)
+        if not song_ids:
+            return set()
+
+        ids = list(song_ids)
+        artists = set()
+        for i in range(0, len(ids), 500):
+            artists.update(
+                row[0] for row in self.db.query(Song.artist_id).filter(Song.id.in_(ids[i:i + 500])).distinct()
+            )
+        return artists
+
+    def _recompute(self, artist_ids: List[int], window_start: datetime):
+        analytics = analytics_partitions.source(self.db, start=window_start)
+        summed: Dict[int, int] = dict(
+            self.db.query(Song.artist_id, func.coalesce(func.sum(analytics.c.unique_listeners), 0))
+            .join(Song, Song.id == analytics.c.song_id)
+            .filter(Song.artist_id.in_(artist_ids))
+            .group_by(Song.artist_id)
+            .all()
+        )
+
+        sketches: Dict[int, HyperLogLog] = {}
+        rows = self.db.execute(
+            select(Song.artist_id, ListenerSketch.sketch)
+            .join(Song, Song.id == ListenerSketch.song_id)
+            .where(
+                Song.artist_id.in_(artist_ids),
+                ListenerSketch.period == "day",
+                ListenerSketch.day >= window_start.date(),
+            )
+        )
+        for artist_id, blob in rows:
+            sketch = sketches.get(artist_id)
+            if sketch is None:
+                sketch = sketches[artist_id] = HyperLogLog()
+            sketch.merge_bytes(blob)
+
+        values = [
+            {
+                "id": artist_id,
+                "monthly_listeners": sketches[artist_id].count() if artist_id in sketches else summed.get(artist_id, 0),
+            }
+            for artist_id in artist_ids
+        ]
+        # Bulk UPDATE by primary key, one statement per batch
+        self.db.execute(update(Artist), values)
+
+
+def main():
+    """Run the monthly listeners job from the command line"""
+    from app.database.connection import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Recompute Artist.monthly_listeners over a rolling 30-day window")
+    parser.add_argument("--full", action="store_true", help="Recompute every artist")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        count = MonthlyListenersService(db).refresh(full=args.full, batch_size=args.batch_size)
+    finally:
+        db.close()
+    print(f"Recomputed monthly listeners for {count} artist(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,444 @@
+"""Read-only song and artist catalog shared by every worker process on a host.
+
+The snapshot is a single file of fixed-width little-endian records, sorted by id,
+plus a string table. Every worker maps it read-only, so the pages live once in
+the OS page cache instead of once per process. Lookups by id are binary searches
+over the records, and songs by artist use a sorted index section. Values are
+decoded only for the records a request touches.
+
+    header    magic, version, flags, build time, counts and section offsets
+    songs     SONG_RECORD x n_songs, by id
+    artists   ARTIST_RECORD x n_artists, by id
+    by_artist u32 song record numbers, ordered by (artist_id, id)
+    strings   UTF-8 string table; records hold (offset, length), duplicates stored once
+
+Rebuilds write a new file next to the old one and ``os.replace`` it in. Workers
+check the path at most every ``CATALOG_SNAPSHOT_CHECK_SECONDS`` and map the new
+file. Readers that still hold the old mapping keep using it until they finish.
+
+The snapshot is as old as its last build (``CATALOG_SNAPSHOT_INTERVAL_SECONDS``).
+Songs and artists written by this process since then are served from the
+database instead; after a bulk update or delete, or once this process has added
+rows, every lookup of that kind goes to the database until the next build. Writes
+from other processes show up after the next build.
+
+    python -m app.services.catalog_snapshot build
+    python -m app.services.catalog_snapshot stats
+"""
+import argparse
+import logging
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models import Artist, Song
+from app.schemas.artist import ArtistResponse
+from app.schemas.song import SongResponse
+from app.services.entity_cache import entity_cache, load_many
+from app.services.metrics_service import metrics
+
+logger = logging.getLogger("app.catalog")
+
+MAGIC = b"PKECAT\x00\x01"
+VERSION = 2
+FLAG_AWARE = 1  # datetimes were timezone-aware (UTC) when the snapshot was built
+
+# magic, version, flags, built_at (unix us), n_songs, n_artists,
+# songs, artists, by_artist and strings offsets, strings length
+HEADER = struct.Struct("<8sIIqQQQQQQQ")
+# id, artist_id, duration_seconds, release_date, stream_count, rating, created_at,
+# updated_at; (offset, length) of title, album, genre, region, cover_url, audio_url;
+# is_explicit
+SONG_RECORD = struct.Struct("<qqqqqqqq12I?7x")
+# id, monthly_listeners, created_at, updated_at;
+# (offset, length) of name, bio, image_url, region, genre, external_id
+ARTIST_RECORD = struct.Struct("<qqqq12I")
+INDEX_ENTRY = struct.Struct("<I")
+ID = struct.Struct("<q")
+
+NULL = -(2 ** 63)
+NULL_STRING = 0xFFFFFFFF
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+SONG_STRINGS = ("title", "album", "genre", "region", "cover_url", "audio_url")
+ARTIST_STRINGS = ("name", "bio", "image_url", "region", "genre", "external_id")
+
+catalog_lookups_total = metrics.counter(
+    "catalog_snapshot_lookups_total", "Catalog snapshot reads by outcome (hit, miss, stale)", ("kind", "result")
+)
+
+
+class _StringTable:
+    def __init__(self):
+        self.data = bytearray()
+        self._refs: Dict[str, Tuple[int, int]] = {}
+
+    def ref(self, value: Optional[str]) -> Tuple[int, int]:
+        if value is None:
+            return NULL_STRING, 0
+        ref = self._refs.get(value)
+        if ref is None:
+            encoded = value.encode("utf-8")
+            if len(self.data) + len(encoded) >= NULL_STRING:
+                raise ValueError("catalog string table exceeds 4 GiB")
+            ref = self._refs[value] = (len(self.data), len(encoded))
+            self.data += encoded
+        return ref
+
+
+class _Encoder:
+    def __init__(self):
+        self.strings = _StringTable()
+        self.aware = False
+
+    def time(self, value: Optional[datetime]) -> int:
+        if value is None:
+            return NULL
+        if value.tzinfo is not None:
+            self.aware = True
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return (value - EPOCH) // MICROSECOND
+
+    def strings_of(self, values) -> List[int]:
+        refs = []
+        for value in values:
+            refs.extend(self.strings.ref(value))
+        return refs
+
+
+def build_snapshot(db: Session, path: str, batch_size: int = 5000) -> Dict[str, int]:
+    """Write the catalog to ``path`` atomically; returns record counts"""
+    built_at = time.time()
+    encoder = _Encoder()
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+
+    song_columns = [
+        Song.id, Song.artist_id, Song.duration_seconds, Song.release_date, Song.stream_count,
+        Song.rating, Song.created_at, Song.updated_at, *(getattr(Song, name) for name in SONG_STRINGS),
+        Song.is_explicit,
+    ]
+    artist_columns = [
+        Artist.id, Artist.monthly_listeners, Artist.created_at, Artist.updated_at,
+        *(getattr(Artist, name) for name in ARTIST_STRINGS),
+    ]
+    try:
+        with open(tmp_path, "wb") as out:
+            out.write(bytes(HEADER.size))
+            songs_offset = out.tell()
+            song_artists = array("q")
+            # ORM selects, so soft-deleted rows are left out
+            rows = db.execute(select(*song_columns).order_by(Song.id).execution_options(yield_per=batch_size))
+            for row in rows:
+                duration = row[2] if row[2] is not None else NULL
+                out.write(SONG_RECORD.pack(
+                    row[0], row[1], duration, encoder.time(row[3]), row[4] or 0, row[5] or 0,
+                    encoder.time(row[6]), encoder.time(row[7]), *encoder.strings_of(row[8:14]), bool(row[14]),
+                ))
+                song_artists.append(row[1])
+
+            artists_offset = out.tell()
+            artist_count = 0
+            rows = db.execute(select(*artist_columns).order_by(Artist.id).execution_options(yield_per=batch_size))
+            for row in rows:
+                out.write(ARTIST_RECORD.pack(
+                    row[0], row[1] or 0, encoder.time(row[2]), encoder.time(row[3]), *encoder.strings_of(row[4:10]),
+                ))
+                artist_count += 1
+
+            # Stable sort: songs of one artist stay in id order
+            by_artist_offset = out.tell()
+            order = sorted(range(len(song_artists)), key=song_artists.__getitem__)
+            index = array("I", order)
+            if sys.byteorder != "little":
+                index.byteswap()
+            out.write(index.tobytes())
+
+            strings_offset = out.tell()
+            out.write(encoder.strings.data)
+            out.seek(0)
+            out.write(HEADER.pack(
+                MAGIC, VERSION, FLAG_AWARE if encoder.aware else 0, int(built_at * 1_000_000),
+                len(song_artists), artist_count, songs_offset, artists_offset, by_artist_offset,
+                strings_offset, len(encoder.strings.data),
+            ))
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return {"songs": len(song_artists), "artists": artist_count, "strings_bytes": len(encoder.strings.data)}
+
+
+class CatalogSnapshot:
+    """One mapped snapshot file"""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        (magic, version, flags, built_at, self.song_count, self.artist_count, self.songs_offset,
+         self.artists_offset, self.by_artist_offset, self.strings_offset, strings_length) = HEADER.unpack_from(self.buffer)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} catalog snapshot")
+        if self.strings_offset + strings_length != len(self.buffer):
+            raise ValueError(f"{path} is truncated")
+        self.built_at = built_at / 1_000_000
+        self.epoch = EPOCH.replace(tzinfo=timezone.utc) if flags & FLAG_AWARE else EPOCH
+
+    def _string(self, offset: int, length: int) -> Optional[str]:
+        if offset == NULL_STRING:
+            return None
+        start = self.strings_offset + offset
+        return str(self.buffer[start:start + length], "utf-8")
+
+    def _strings(self, refs, names) -> dict:
+        return {name: self._string(refs[2 * i], refs[2 * i + 1]) for i, name in enumerate(names)}
+
+    def _time(self, value: int) -> Optional[datetime]:
+        return None if value == NULL else self.epoch + value * MICROSECOND
+
+    def _find(self, offset: int, size: int, count: int, entity_id: int) -> int:
+        """Record number holding ``entity_id``, or -1"""
+        low, high = 0, count
+        while low < high:
+            middle = (low + high) // 2
+            if ID.unpack_from(self.buffer, offset + middle * size)[0] < entity_id:
+                low = middle + 1
+            else:
+                high = middle
+        if low < count and ID.unpack_from(self.buffer, offset + low * size)[0] == entity_id:
+            return low
+        return -1
+
+    def song_at(self, index: int) -> SongResponse:
+        fields = SONG_RECORD.unpack_from(self.buffer, self.songs_offset + index * SONG_RECORD.size)
+        # model_validate on a dict is cheaper than model_construct with pydantic-core
+        values = self._strings(fields[8:20], SONG_STRINGS)
+        values.update(
+            id=fields[0],
+            artist_id=fields[1],
+            duration_seconds=None if fields[2] == NULL else fields[2],
+            release_date=self._time(fields[3]),
+            stream_count=fields[4],
+            rating=fields[5],
+            created_at=self._time(fields[6]),
+            updated_at=self._time(fields[7]),
+            is_explicit=fields[20],
+        )
+        return SongResponse.model_validate(values)
+
+    def artist_at(self, index: int) -> ArtistResponse:
+        fields = ARTIST_RECORD.unpack_from(self.buffer, self.artists_offset + index * ARTIST_RECORD.size)
+        values = self._strings(fields[4:16], ARTIST_STRINGS)
+        values.update(
+            id=fields[0],
+            monthly_listeners=fields[1],
+            created_at=self._time(fields[2]),
+            updated_at=self._time(fields[3]),
+        )
+        return ArtistResponse.model_validate(values)
+
+    def song(self, song_id: int) -> Optional[SongResponse]:
+        index = self._find(self.songs_offset, SONG_RECORD.size, self.song_count, song_id)
+        return self.song_at(index) if index >= 0 else None
+
+    def artist(self, artist_id: int) -> Optional[ArtistResponse]:
+        index = self._find(self.artists_offset, ARTIST_RECORD.size, self.artist_count, artist_id)
+        return self.artist_at(index) if index >= 0 else None
+
+    def has(self, kind: str, entity_id: int) -> bool:
+        if kind == "songs":
+            return self._find(self.songs_offset, SONG_RECORD.size, self.song_count, entity_id) >= 0
+        return self._find(self.artists_offset, ARTIST_RECORD.size, self.artist_count, entity_id) >= 0
+
+    def songs(self, skip: int, limit: int) -> List[SongResponse]:
+        return [self.song_at(i) for i in range(skip, min(skip + limit, self.song_count))]
+
+    def artists(self, skip: int, limit: int) -> List[ArtistResponse]:
+        return [self.artist_at(i) for i in range(skip, min(skip + limit, self.artist_count))]
+
+    def _song_artist(self, position: int) -> int:
+        index = INDEX_ENTRY.unpack_from(self.buffer, self.by_artist_offset + position * INDEX_ENTRY.size)[0]
+        return ID.unpack_from(self.buffer, self.songs_offset + index * SONG_RECORD.size + 8)[0]
+
+    def artist_songs(self, artist_id: int, skip: int, limit: int) -> List[SongResponse]:
+        # First position in the by_artist index whose song belongs to artist_id or later
+        low, high = 0, self.song_count
+        while low < high:
+            middle = (low + high) // 2
+            if self._song_artist(middle) < artist_id:
+                low = middle + 1
+            else:
+                high = middle
+        songs = []
+        position = low + skip
+        while position < self.song_count and len(songs) < limit and self._song_artist(position) == artist_id:
+            index = INDEX_ENTRY.unpack_from(self.buffer, self.by_artist_offset + position * INDEX_ENTRY.size)[0]
+            songs.append(self.song_at(index))
+            position += 1
+        return songs
+
+
+class Catalog:
+    """The current snapshot for this process, remapped when the file is replaced"""
+
+    MODELS = {"songs": (Song, SongResponse), "artists": (Artist, ArtistResponse)}
+
+    def __init__(self, path: str = "", check_seconds: float = 1.0):
+        self.path = path
+        self.check_seconds = check_seconds
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._checked = float("-inf")
+        self._lock = threading.Lock()
+        # Ids written by this process -> time of the write, until a newer snapshot has them
+        self._written: Dict[str, Dict[int, float]] = {"songs": {}, "artists": {}}
+        # Time of the last bulk write per kind, which changed rows without their ids
+        self._written_all: Dict[str, float] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def snapshot(self) -> Optional[CatalogSnapshot]:
+        if not self.path:
+            return None
+        if time.monotonic() - self._checked >= self.check_seconds:
+            with self._lock:
+                if time.monotonic() - self._checked >= self.check_seconds:
+                    self._remap()
+                    self._checked = time.monotonic()
+        return self._snapshot
+
+    def _remap(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            self._snapshot = None
+            return
+        current = self._snapshot
+        if current is not None and current.identity == (stat.st_ino, stat.st_mtime_ns, stat.st_size):
+            return
+        try:
+            snapshot = CatalogSnapshot(self.path)
+        except (OSError, ValueError):
+            logger.exception("could not map catalog snapshot %s", self.path)
+            return
+        # The old mapping is unmapped once the last reader drops it
+        self._snapshot = snapshot
+        for written in self._written.values():
+            for entity_id, moment in list(written.items()):
+                if moment < snapshot.built_at:
+                    written.pop(entity_id, None)
+
+    def mark_written(self, kind: str, ids: Optional[List[int]]):
+        """Serve ``ids`` (the whole kind when None) from the database until a snapshot built after now is mapped"""
+        written = self._written.get(kind)
+        if not self.enabled or written is None:
+            return
+        now = time.time()
+        if ids is None:
+            self._written_all[kind] = now
+            return
+        for entity_id in ids:
+            written[entity_id] = now
+
+    def _bypassed(self, kind: str, snapshot: CatalogSnapshot) -> bool:
+        """True while a bulk write to ``kind`` (or to artists, for songs) is newer than the snapshot"""
+        kinds = ("songs", "artists") if kind == "songs" else (kind,)
+        return any(self._written_all.get(name, float("-inf")) >= snapshot.built_at for name in kinds)
+
+    def get(self, kind: str, entity_id: int):
+        """Song or artist response from the snapshot; None when it must come from the database"""
+        snapshot = self.snapshot()
+        if snapshot is None:
+            return None
+        if entity_id in self._written[kind] or self._bypassed(kind, snapshot):
+            catalog_lookups_total.inc((kind, "stale"))
+            return None
+        found = snapshot.song(entity_id) if kind == "songs" else snapshot.artist(entity_id)
+        if found is not None and self._stale(kind, found):
+            catalog_lookups_total.inc((kind, "stale"))
+            return None
+        catalog_lookups_total.inc((kind, "hit" if found is not None else "miss"))
+        return found
+
+    def _stale(self, kind: str, item) -> bool:
+        # Deleting an artist deletes its songs in bulk, without their ids
+        return item.id in self._written[kind] or (kind == "songs" and item.artist_id in self._written["artists"])
+
+    def page(self, db: Session, kind: str, skip: int, limit: int, artist_id: Optional[int] = None):
+        """A page of songs or artists by id (or an artist's songs); None when it must come from the database"""
+        snapshot = self.snapshot()
+        if snapshot is None:
+            return None
+        # Rows added since the build (or bulk writes) would shift every later page
+        if self._bypassed(kind, snapshot) or any(not snapshot.has(kind, entity_id) for entity_id in list(self._written[kind])):
+            catalog_lookups_total.inc((kind, "stale"))
+            return None
+        if kind == "artists":
+            items = snapshot.artists(skip, limit)
+        elif artist_id is not None:
+            items = snapshot.artist_songs(artist_id, skip, limit)
+        else:
+            items = snapshot.songs(skip, limit)
+        catalog_lookups_total.inc((kind, "hit"), len(items))
+
+        stale = [item.id for item in items if self._stale(kind, item)]
+        if not stale:
+            return items
+        # Rows this process changed since the build; deleted ones drop out of the page
+        model, schema = self.MODELS[kind]
+        fresh = load_many(db, model, schema, stale)
+        stale = set(stale)
+        items = [fresh.get(item.id) if item.id in stale else item for item in items]
+        return [item for item in items if item is not None]
+
+
+catalog = Catalog(settings.CATALOG_SNAPSHOT_PATH, settings.CATALOG_SNAPSHOT_CHECK_SECONDS)
+entity_cache.subscribe(catalog.mark_written)
+
+
+def main():
+    """Build or inspect the catalog snapshot from the command line"""
+    from app.database.connection import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Shared-memory song and artist catalog snapshot")
+    parser.add_argument("command", choices=["build", "stats"])
+    parser.add_argument("--path", default=settings.CATALOG_SNAPSHOT_PATH)
+    args = parser.parse_args()
+    if not args.path:
+        raise SystemExit("Set CATALOG_SNAPSHOT_PATH or pass --path")
+
+    if args.command == "build":
+        db = SessionLocal()
+        db.info["read_only"] = True
+        try:
+            started = time.perf_counter()
+            counts = build_snapshot(db, args.path)
+        finally:
+            db.close()
+        print(f"Wrote {counts['songs']} songs and {counts['artists']} artists to {args.path} "
+              f"in {time.perf_counter() - started:.1f}s")
+    else:
+        snapshot = CatalogSnapshot(args.path)
+        built = datetime.fromtimestamp(snapshot.built_at, timezone.utc)
+        print(f"{args.path}: {snapshot.song_count} songs, {snapshot.artist_count} artists, "
+              f"{len(snapshot.buffer) / 1024 / 1024:.1f} MiB, built {built:%Y-%m-%d %H:%M:%S} UTC")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Change log of catalog, playlist and chart writes.
+
+Every flush that inserts, updates or deletes an Artist, Song, Playlist,
+PlaylistSong or ChartEntry appends one ``change_log`` row per object in the same
+transaction, so a change is logged exactly when it commits. The log is read by the
+sync API (app.services.sync_service) and, as a transactional outbox, fanned out
+to in-process consumers (app.services.outbox_service). Soft deletes are logged as
+deletes.
+Playlist and track rows carry their owner's user id, and a track change also logs
+its playlist, whose counters moved with it.
+
+Bulk UPDATE/DELETE/INSERT statements bypass the flush, so code that changes synced
+rows in bulk logs them itself with ``log_changes``. Counters refreshed by
+background jobs (monthly listeners) are deliberately not logged; clients get them
+with the row's next change or on a full sync.
+"""
+from typing import Dict, Tuple
+from sqlalchemy import event, literal, null, select
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+from app.database.routing import RoutingSession
+from app.models import ChangeLog, Playlist
+
+# Entities offline clients sync
+ENTITIES = ("artists", "songs", "playlists", "playlist_songs")
+LOGGED = ENTITIES + ("chart_entries",)
+UPSERT = "upsert"
+DELETE = "delete"
+
+
+def log_changes(db: Session, entity: str, op: str, rows: Select):
+    """Log ``op`` on ``entity`` for each row of ``rows`` (id, optionally owner user id) in one INSERT ... SELECT"""
+    selected = rows.subquery()
+    columns = list(selected.c)
+    owner = columns[1] if len(columns) > 1 else null()
+    table = ChangeLog.__table__
+    db.execute(table.insert().from_select(
+        ["entity", "entity_id", "op", "user_id"],
+        select(literal(entity), columns[0], literal(op), owner).select_from(selected)
+    ))
+    db.info["change_log_written"] = True
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _log_flushed(session, flush_context):
+    changes: Dict[Tuple[str, int], str] = {}
+    # Playlist id -> owner, and track id -> playlist id, for the rows in this flush
+    owners: Dict[int, int] = {}
+    tracks: Dict[int, int] = {}
+    for objects, deleted in ((session.new, False), (session.dirty, False), (session.deleted, True)):
+        for obj in objects:
+            entity = getattr(obj, "__tablename__", None)
+            if entity not in LOGGED or obj.id is None:
+                continue
+            op = DELETE if deleted or getattr(obj, "deleted_at", None) is not None else UPSERT
+            changes[(entity, obj.id)] = op
+            if entity == "playlists":
+                owners[obj.id] = obj.user_id
+            elif entity == "playlist_songs":
+                tracks[obj.id] = obj.playlist_id
+    if not changes:
+        return
+
+    # A track change moves its playlist's counters
+    for playlist_id in tracks.values():
+        changes.setdefault(("playlists", playlist_id), UPSERT)
+    connection = session.connection()
+    unknown = {entity_id for entity, entity_id in changes if entity == "playlists" and entity_id not in owners}
+    if unknown:
+        playlists = Playlist.__table__
+        owners.update(connection.execute(
+            select(playlists.c.id, playlists.c.user_id).where(playlists.c.id.in_(unknown))
+        ).all())
+
+    rows = []
+    for (entity, entity_id), op in changes.items():
+        user_id = None
+        if entity in ("playlists", "playlist_songs"):
+            user_id = owners.get(entity_id if entity == "playlists" else tracks[entity_id])
+            if user_id is None:
+                # Never log private rows without an owner: they would sync to everyone
+                continue
+        rows.append({"entity": entity, "entity_id": entity_id, "op": op, "user_id": user_id})
+    if rows:
+        connection.execute(ChangeLog.__table__.insert(), rows)
+        session.info["change_log_written"] = True
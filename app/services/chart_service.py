@@ -0,0 +1,57 @@
+"""Chart assembly shared by the REST endpoints and live push (app.services.live_service)."""
+from typing import List, Optional
+from sqlalchemy.orm import Session
+from app.models import Chart, ChartEntry
+from app.schemas.chart import ChartEntryResponse, WeeklyChartResponse
+from app.services.loaders import Loaders
+
+
+def entry_responses(entries: List[ChartEntry], loaders: Loaders) -> List[ChartEntryResponse]:
+    """Chart entries with their songs and artists, loaded in batches"""
+    songs = loaders.songs_with_artists(entry.song_id for entry in entries)
+    return [
+        ChartEntryResponse(
+            id=entry.id,
+            chart_id=entry.chart_id,
+            song_id=entry.song_id,
+            rank=entry.rank,
+            previous_rank=entry.previous_rank,
+            trend=entry.trend,
+            created_at=entry.created_at,
+            song=songs[entry.song_id]
+        )
+        # Entries of deleted songs stay hidden until the purge job removes them
+        for entry in entries if entry.song_id in songs
+    ]
+
+
+def weekly_chart(db: Session, loaders: Loaders, week: int, year: int, region: Optional[str] = None) -> WeeklyChartResponse:
+    """The chart of ``week`` in ``year`` (any region unless given), with no entries if there is none"""
+    query = db.query(Chart).filter(
+        Chart.week == week,
+        Chart.year == year
+    )
+    
+    if region:
+        query = query.filter(Chart.region == region)
+    
+    chart = query.first()
+    
+    if not chart:
+        return WeeklyChartResponse(
+            week=week,
+            year=year,
+            region=region,
+            entries=[]
+        )
+    
+    entries = db.query(ChartEntry).filter(
+        ChartEntry.chart_id == chart.id
+    ).order_by(ChartEntry.rank).all()
+    
+    return WeeklyChartResponse(
+        week=chart.week,
+        year=chart.year,
+        region=chart.region,
+        entries=entry_responses(entries, loaders)
+    )
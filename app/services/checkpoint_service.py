@@ -0,0 +1,18 @@
+from typing import Optional
+from sqlalchemy.orm import Session
+from app.models import JobCheckpoint
+
+
+def get_checkpoint(db: Session, name: str, default: Optional[str] = None) -> Optional[str]:
+    """Return a job's stored watermark, or ``default`` if it has never run"""
+    checkpoint = db.get(JobCheckpoint, name)
+    return checkpoint.value if checkpoint is not None else default
+
+
+def set_checkpoint(db: Session, name: str, value: str):
+    """Stage a new watermark for a job; it commits with the caller's transaction"""
+    checkpoint = db.get(JobCheckpoint, name)
+    if checkpoint is None:
+        db.add(JobCheckpoint(name=name, value=value))
+    else:
+        checkpoint.value = value
@@ -0,0 +1,105 @@
+"""Single-flight coalescing of identical concurrent reads.
+
+When many clients ask for the same thing at once (a new weekly chart, trending
+songs), only the first request computes it; requests with the same route and
+normalized parameters that arrive while it is running wait for that computation
+and receive the same result. The computation runs in the threadpool and is not
+tied to the request that started it, so a disconnecting client does not cancel it
+for the others. Nothing is cached: once it finishes, the next request computes
+afresh.
+
+Routes opt in through ``SINGLE_FLIGHT_ROUTES``. Shared results must not depend on
+the caller. Compute functions must not use the leading request's session either:
+that request may finish, and close its session, while followers are still
+waiting. They open their own with ``shared_session`` and return response models
+built while it is open.
+"""
+import asyncio
+import json
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional, TypeVar
+from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.services.metrics_service import metrics
+
+T = TypeVar("T")
+
+single_flight_requests_total = metrics.counter(
+    "single_flight_requests_total",
+    "Requests to coalesced routes: leader computed the result, follower shared it",
+    ("route", "role"),
+)
+single_flight_timeouts_total = metrics.counter(
+    "single_flight_timeouts_total", "Requests that gave up waiting for a shared computation", ("route",)
+)
+
+
+@contextmanager
+def shared_session(read_only: bool = True) -> Iterator[Session]:
+    """Session owned by a shared computation; reads from a replica unless ``read_only`` is False"""
+    from app.database.connection import SessionLocal
+
+    db = SessionLocal()
+    db.info["read_only"] = read_only
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def flight_key(route: str, params: dict) -> str:
+    """Route plus parameters in a canonical order; None values are dropped"""
+    return route + "?" + json.dumps(
+        {name: value for name, value in params.items() if value is not None}, sort_keys=True, default=str
+    )
+
+
+class SingleFlight:
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.leaders = 0
+        self.followers = 0
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def run(self, route: str, params: dict, compute: Callable[[], T], timeout: Optional[float] = None) -> T:
+        """Return ``compute()``, sharing one in-flight call among identical requests"""
+        if route not in settings.SINGLE_FLIGHT_ROUTES:
+            return await run_in_threadpool(compute)
+
+        key = flight_key(route, params)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(run_in_threadpool(compute))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finished(key, done))
+            self.leaders += 1
+            single_flight_requests_total.inc((route, "leader"))
+        else:
+            self.followers += 1
+            single_flight_requests_total.inc((route, "follower"))
+
+        timeout = settings.SINGLE_FLIGHT_TIMEOUT_SECONDS if timeout is None else timeout
+        try:
+            # shield: a waiter timing out or disconnecting must not cancel the shared call
+            return await asyncio.wait_for(asyncio.shield(task), timeout or None)
+        except asyncio.TimeoutError:
+            single_flight_timeouts_total.inc((route,))
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Timed out waiting for the result",
+                headers={"Retry-After": "1"},
+            )
+
+    def _finished(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception as retrieved when nobody was left waiting for it
+        if not task.cancelled():
+            task.exception()
+
+
+single_flight = SingleFlight()
@@ -0,0 +1,31 @@
+"""In-process consumers of the change outbox (app.services.outbox_service).
+
+Consumers are registered on every worker at startup, next to the scheduler jobs.
+Each gets batches of change records in log order and must tolerate seeing a
+record twice.
+"""
+from collections import defaultdict
+from typing import Dict, Set
+from app.config import settings
+from app.services.entity_cache import KINDS, entity_cache
+from app.services.live_service import live_hub
+from app.services.outbox_service import OutboxDispatcher
+
+
+def invalidate_entity_cache(records):
+    """Drop changed rows from this worker's entity cache, including writes made by other workers"""
+    changed: Dict[str, Set[int]] = defaultdict(set)
+    for record in records:
+        changed[record.entity].add(record.entity_id)
+    for kind, ids in changed.items():
+        entity_cache.invalidate(kind, ids)
+
+
+def register_consumers(dispatcher: OutboxDispatcher):
+    """Add the built-in consumers to ``dispatcher``"""
+    # Local: every worker has its own cache (and catalog snapshot overlay) to keep fresh
+    dispatcher.register("entity_cache", invalidate_entity_cache, entities=KINDS,
+                        batch_size=settings.OUTBOX_BATCH_SIZE)
+    # Wakes the live push producers of topics the changed rows can affect
+    dispatcher.register("live", live_hub.changed, entities=("songs", "artists", "chart_entries"),
+                        batch_size=settings.OUTBOX_BATCH_SIZE)
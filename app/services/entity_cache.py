@@ -0,0 +1,208 @@
+"""Per-process cache of songs, artists and playlists by id.
+
+Single gets (``GET /songs/{id}``) and multi-gets (``GET /songs/batch?ids=...``) read
+through the same cache, so a song fetched one way is served from memory the other
+way. Entries are response models, kept in an LRU of ``ENTITY_CACHE_MAX_ENTRIES``
+for at most ``ENTITY_CACHE_TTL_SECONDS``.
+
+Writes made through a session invalidate the affected ids when the transaction
+commits; bulk ``UPDATE``/``DELETE`` statements drop the whole kind, since their rows
+are not known. Each kind has a generation that every invalidation bumps, and a
+read only stores what it loaded if the generation has not moved meanwhile, so a
+slow read cannot put back a row that was changed while it ran. Writes made by
+other worker processes reach this cache through the change outbox
+(app.services.consumers), within ``OUTBOX_POLL_SECONDS``; the TTL bounds staleness
+if the outbox is disabled.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from fastapi import HTTPException, status
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database.routing import RoutingSession
+from app.services.metrics_service import metrics
+
+# Cached kinds, by table name
+KINDS = ("songs", "artists", "playlists")
+
+entity_cache_lookups_total = metrics.counter(
+    "entity_cache_lookups_total", "Entity cache lookups by id", ("kind", "result")
+)
+
+
+class EntityCache:
+    def __init__(self, max_entries: int = 50000, ttl_seconds: float = 30):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple[str, int], Tuple[object, float]]" = OrderedDict()
+        self._generations: Dict[str, int] = {kind: 0 for kind in KINDS}
+        self._lock = threading.Lock()
+        self._subscribers: List[Callable[[str, Optional[List[int]]], None]] = []
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_entries > 0
+
+    def generation(self, kind: str) -> int:
+        return self._generations[kind]
+
+    def get_many(self, kind: str, ids: Iterable[int]) -> Dict[int, object]:
+        """Cached, unexpired entries for ``ids``"""
+        if not self.enabled:
+            return {}
+        found = {}
+        now = time.monotonic()
+        with self._lock:
+            for entity_id in ids:
+                key = (kind, entity_id)
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                if entry[1] <= now:
+                    del self._entries[key]
+                    continue
+                self._entries.move_to_end(key)
+                found[entity_id] = entry[0]
+        return found
+
+    def put_many(self, kind: str, items: Dict[int, object], generation: int):
+        """Store entries loaded while ``generation`` was current; dropped if it has moved on"""
+        if not self.enabled or not items:
+            return
+        expires = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            if self._generations[kind] != generation:
+                return
+            for entity_id, value in items.items():
+                self._entries[(kind, entity_id)] = (value, expires)
+                self._entries.move_to_end((kind, entity_id))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def subscribe(self, callback: Callable[[str, Optional[List[int]]], None]):
+        """Call ``callback(kind, ids)`` on every invalidation (ids None: the whole kind)"""
+        self._subscribers.append(callback)
+
+    def invalidate(self, kind: str, ids: Optional[Iterable[int]] = None):
+        """Drop ``ids`` of ``kind``, or every entry of the kind when ids is None"""
+        ids = None if ids is None else list(ids)
+        for callback in self._subscribers:
+            callback(kind, ids)
+        with self._lock:
+            self._generations[kind] += 1
+            if ids is None:
+                for key in [key for key in self._entries if key[0] == kind]:
+                    del self._entries[key]
+            else:
+                for entity_id in ids:
+                    self._entries.pop((kind, entity_id), None)
+
+    def clear(self):
+        with self._lock:
+            for kind in self._generations:
+                self._generations[kind] += 1
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+entity_cache = EntityCache(settings.ENTITY_CACHE_MAX_ENTRIES, settings.ENTITY_CACHE_TTL_SECONDS)
+
+
+def load_many(db: Session, model, schema, ids: List[int]) -> Dict[int, object]:
+    """Response models for the ``ids`` that exist, from the cache or one ``IN`` query.
+
+    Sessions not marked read-only (writes, and clients inside their read-your-writes
+    window) skip the cache and read the database.
+    """
+    kind = model.__tablename__
+    if not db.info.get("read_only"):
+        rows = db.query(model).filter(model.id.in_(ids)).all()
+        return {row.id: schema.model_validate(row) for row in rows}
+    found = entity_cache.get_many(kind, ids)
+    misses = [entity_id for entity_id in ids if entity_id not in found]
+    if found:
+        entity_cache_lookups_total.inc((kind, "hit"), len(found))
+    if misses:
+        entity_cache_lookups_total.inc((kind, "miss"), len(misses))
+        generation = entity_cache.generation(kind)
+        rows = db.query(model).filter(model.id.in_(misses)).all()
+        loaded = {row.id: schema.model_validate(row) for row in rows}
+        entity_cache.put_many(kind, loaded, generation)
+        found.update(loaded)
+    return found
+
+
+def load_one(db: Session, model, schema, entity_id: int):
+    """Response model for one id, or None if it does not exist"""
+    return load_many(db, model, schema, [entity_id]).get(entity_id)
+
+
+def parse_ids(values: List[str], max_ids: Optional[int] = None) -> List[int]:
+    """Ids from ``?ids=1,2,3`` and/or ``?ids=1&ids=2``, in order and without duplicates"""
+    max_ids = settings.BATCH_MAX_IDS if max_ids is None else max_ids
+    ids: Dict[int, None] = {}
+    for value in values:
+        for part in value.split(","):
+            part = part.strip()
+            if not part:
+                continue
+            try:
+                ids[int(part)] = None
+            except ValueError:
+                raise HTTPException(
+                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    detail=f"Invalid id: {part!r}"
+                )
+    if not ids:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="No ids given")
+    if len(ids) > max_ids:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"At most {max_ids} ids per request"
+        )
+    return list(ids)
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _collect_flushed(session, flush_context):
+    stale = session.info.setdefault("entity_cache_stale", set())
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        kind = getattr(obj, "__tablename__", None)
+        if kind in KINDS and getattr(obj, "id", None) is not None:
+            stale.add((kind, obj.id))
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _collect_bulk(orm_execute_state):
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    kind = mapper.local_table.name if mapper is not None else None
+    if kind in KINDS:
+        orm_execute_state.session.info.setdefault("entity_cache_stale", set()).add((kind, None))
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _invalidate_committed(session):
+    stale = session.info.pop("entity_cache_stale", None)
+    if not stale:
+        return
+    whole = {kind for kind, entity_id in stale if entity_id is None}
+    for kind in whole:
+        entity_cache.invalidate(kind)
+    by_kind: Dict[str, List[int]] = {}
+    for kind, entity_id in stale:
+        if kind not in whole:
+            by_kind.setdefault(kind, []).append(entity_id)
+    for kind, ids in by_kind.items():
+        entity_cache.invalidate(kind, ids)
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def _discard_rolled_back(session):
+    session.info.pop("entity_cache_stale", None)
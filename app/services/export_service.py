@@ -0,0 +1,294 @@
+"""Columnar snapshot export for offline analysis.
+
+Writes Parquet datasets with Hive-style partition directories, readable by pyarrow,
+pandas, DuckDB and Spark:
+
+    <out>/analytics/month=2026-10/region=Nairobi/part-0.parquet
+    <out>/chart_entries/year=2026/week=42/region=Nairobi/part-0.parquet
+    <out>/songs/part-0.parquet
+    <out>/artists/part-0.parquet
+
+Exports are incremental. ``_export_state.json`` stores a fingerprint per exported
+analytics month and chart week; a later run rewrites only the partitions that are
+new or whose fingerprint changed (late rows, compaction). Analytics fingerprints
+are the partition's max id and rewrite marker (see app.database.partitions), so
+checking an unchanged month costs two indexed lookups, not a scan. Songs and artists are
+small and fully rewritten every run. Rows are streamed in batches, so memory use is
+bounded by the batch size, not the table size. Reads go to a read replica when one
+is configured.
+
+    python -m app.services.export_service --out ./exports
+
+Requires the optional ``pyarrow`` dependency.
+"""
+import argparse
+import json
+import os
+import shutil
+from datetime import datetime, time, timezone
+from typing import Dict, Iterable, List
+from urllib.parse import quote
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database.partitions import (
+    VALUE_COLUMNS, add_months, analytics_partitions, partition_month, partition_table
+)
+from app.models import Analytics, Artist, Chart, ChartEntry, Song
+
+STATE_FILE = "_export_state.json"
+# pyarrow reads this directory value back as null
+NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("Parquet export requires pyarrow: pip install pyarrow")
+    return pyarrow, pyarrow.parquet
+
+
+def _partition_dir(key: str, value) -> str:
+    return f"{key}={NULL_PARTITION if value is None else quote(str(value), safe='')}"
+
+
+class _PartitionedWriter:
+    """Streams rows into one Parquet file per partition value under a directory"""
+
+    def __init__(self, directory: str, schema, key: str):
+        self.pa, self.pq = _require_pyarrow()
+        self.directory = directory
+        self.schema = schema
+        self.key = key
+        self.writers = {}
+
+    def write(self, rows: List[dict]):
+        groups: Dict[object, List[dict]] = {}
+        for row in rows:
+            groups.setdefault(row.pop(self.key), []).append(row)
+        for value, group in groups.items():
+            writer = self.writers.get(value)
+            if writer is None:
+                path = os.path.join(self.directory, _partition_dir(self.key, value))
+                os.makedirs(path, exist_ok=True)
+                writer = self.writers[value] = self.pq.ParquetWriter(
+                    os.path.join(path, "part-0.parquet"), self.schema, compression="zstd"
+                )
+            writer.write_table(self.pa.Table.from_pylist(group, schema=self.schema))
+
+    def close(self):
+        for writer in self.writers.values():
+            writer.close()
+
+
+class SnapshotExporter:
+    """Exports analytics, chart entries, songs and artists to Parquet"""
+
+    def __init__(self, db: Session, out_dir: str, batch_size: int = 50000):
+        self.pa, self.pq = _require_pyarrow()
+        self.db = db
+        self.out_dir = out_dir
+        self.batch_size = batch_size
+        self.state = self._load_state()
+
+    # State
+
+    def _state_path(self) -> str:
+        return os.path.join(self.out_dir, STATE_FILE)
+
+    def _load_state(self) -> dict:
+        try:
+            with open(self._state_path()) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"analytics": {}, "chart_entries": {}}
+
+    def _save_state(self):
+        os.makedirs(self.out_dir, exist_ok=True)
+        self.state["last_run"] = datetime.now(timezone.utc).isoformat()
+        tmp = self._state_path() + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.state, f, indent=2, sort_keys=True)
+        os.replace(tmp, self._state_path())
+
+    # Files
+
+    def _stream(self, query) -> Iterable[List[dict]]:
+        result = self.db.execute(query.execution_options(yield_per=self.batch_size)).mappings()
+        for batch in result.partitions():
+            yield [dict(row) for row in batch]
+
+    def _replace_dir(self, relative: str, fill):
+        """Build a directory next to its final location, then swap it in"""
+        final = os.path.join(self.out_dir, relative)
+        tmp = f"{final}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        fill(tmp)
+        if os.path.exists(final):
+            shutil.rmtree(final)
+        os.makedirs(os.path.dirname(final), exist_ok=True)
+        os.replace(tmp, final)
+
+    def _write_single(self, tmp_dir: str, query, schema):
+        writer = None
+        try:
+            for rows in self._stream(query):
+                if writer is None:
+                    writer = self.pq.ParquetWriter(os.path.join(tmp_dir, "part-0.parquet"), schema, compression="zstd")
+                writer.write_table(self.pa.Table.from_pylist(rows, schema=schema))
+        finally:
+            if writer is not None:
+                writer.close()
+
+    def _write_partitioned(self, tmp_dir: str, query, schema, key: str):
+        writer = _PartitionedWriter(tmp_dir, schema, key)
+        try:
+            for rows in self._stream(query):
+                writer.write(rows)
+        finally:
+            writer.close()
+
+    # Datasets
+
+    def export_analytics(self) -> int:
+        """Export analytics months that are new or changed; returns months written"""
+        pa = self.pa
+        schema = pa.schema([
+            ("song_id", pa.int64()), ("date", pa.timestamp("us")), ("granularity", pa.string()),
+            *((column, pa.int64()) for column in VALUE_COLUMNS),
+        ])
+        exported = self.state.setdefault("analytics", {})
+        # Legacy rows are part of every month's source until they are migrated
+        legacy = analytics_partitions.version(self.db, Analytics.__table__)
+        written = 0
+
+        for name in analytics_partitions.names(self.db):
+            month = partition_month(name)
+            start = datetime.combine(month, time.min)
+            end = datetime.combine(add_months(month, 1), time.min)
+            source = analytics_partitions.source(self.db, start, end)
+
+            fingerprint = analytics_partitions.version(self.db, partition_table(name)) + legacy
+            label = month.strftime("%Y-%m")
+            if exported.get(label) == fingerprint:
+                continue
+
+            query = select(
+                source.c.region, source.c.song_id, source.c.date, source.c.granularity,
+                *(source.c[column] for column in VALUE_COLUMNS)
+            ).order_by(source.c.region, source.c.date)
+            self._replace_dir(
+                os.path.join("analytics", _partition_dir("month", label)),
+                lambda tmp: self._write_partitioned(tmp, query, schema, "region"),
+            )
+            exported[label] = fingerprint
+            self._save_state()
+            written += 1
+        return written
+
+    def export_chart_entries(self) -> int:
+        """Export chart weeks that are new or changed; returns weeks written"""
+        pa = self.pa
+        schema = pa.schema([
+            ("chart_id", pa.int64()), ("chart_name", pa.string()), ("song_id", pa.int64()),
+            ("rank", pa.int32()), ("previous_rank", pa.int32()), ("trend", pa.string()),
+            ("created_at", pa.timestamp("us")),
+        ])
+        exported = self.state.setdefault("chart_entries", {})
+        weeks = self.db.execute(
+            select(Chart.year, Chart.week, func.count(ChartEntry.id), func.max(ChartEntry.id))
+            .join(ChartEntry, ChartEntry.chart_id == Chart.id)
+            .group_by(Chart.year, Chart.week)
+        ).all()
+
+        written = 0
+        for year, week, count, max_id in weeks:
+            label = f"{year}-{week:02d}"
+            fingerprint = [count, max_id]
+            if exported.get(label) == fingerprint:
+                continue
+            query = (
+                select(
+                    Chart.region, ChartEntry.chart_id, Chart.name.label("chart_name"), ChartEntry.song_id,
+                    ChartEntry.rank, ChartEntry.previous_rank, ChartEntry.trend, ChartEntry.created_at,
+                )
+                .join(Chart, Chart.id == ChartEntry.chart_id)
+                .where(Chart.year == year, Chart.week == week)
+                .order_by(Chart.region, ChartEntry.chart_id, ChartEntry.rank)
+            )
+            self._replace_dir(
+                os.path.join("chart_entries", _partition_dir("year", year), _partition_dir("week", week)),
+                lambda tmp: self._write_partitioned(tmp, query, schema, "region"),
+            )
+            exported[label] = fingerprint
+            self._save_state()
+            written += 1
+        return written
+
+    def export_catalog(self):
+        """Rewrite the songs and artists snapshots"""
+        pa = self.pa
+        song_schema = pa.schema([
+            ("id", pa.int64()), ("title", pa.string()), ("artist_id", pa.int64()), ("album", pa.string()),
+            ("duration_seconds", pa.int32()), ("release_date", pa.timestamp("us")), ("genre", pa.string()),
+            ("region", pa.string()), ("stream_count", pa.int64()), ("rating", pa.int32()),
+            ("is_explicit", pa.bool_()), ("created_at", pa.timestamp("us")),
+        ])
+        artist_schema = pa.schema([
+            ("id", pa.int64()), ("name", pa.string()), ("region", pa.string()), ("genre", pa.string()),
+            ("monthly_listeners", pa.int64()), ("created_at", pa.timestamp("us")),
+        ])
+        songs = select(*(Song.__table__.c[field.name] for field in song_schema)).where(
+            Song.deleted_at.is_(None)
+        ).order_by(Song.id)
+        artists = select(*(Artist.__table__.c[field.name] for field in artist_schema)).where(
+            Artist.deleted_at.is_(None)
+        ).order_by(Artist.id)
+        self._replace_dir("songs", lambda tmp: self._write_single(tmp, songs, song_schema))
+        self._replace_dir("artists", lambda tmp: self._write_single(tmp, artists, artist_schema))
+
+    def run(self, full: bool = False) -> dict:
+        if full:
+            self.state = {"analytics": {}, "chart_entries": {}}
+        summary = {
+            "analytics_months": self.export_analytics(),
+            "chart_weeks": self.export_chart_entries(),
+        }
+        self.export_catalog()
+        self._save_state()
+        return summary
+
+
+def main():
+    """Run the Parquet snapshot export from the command line"""
+    from app.database.connection import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Export analytics and catalog snapshots to Parquet")
+    parser.add_argument("--out", default=settings.EXPORT_DIR)
+    parser.add_argument("--batch-size", type=int, default=settings.EXPORT_BATCH_SIZE)
+    parser.add_argument("--full", action="store_true", help="Re-export every partition")
+    args = parser.parse_args()
+
+    try:
+        _require_pyarrow()
+    except RuntimeError as exc:
+        raise SystemExit(str(exc))
+
+    db = SessionLocal()
+    # Long scans belong on a replica, away from API traffic
+    db.info["read_only"] = True
+    try:
+        summary = SnapshotExporter(db, args.out, batch_size=args.batch_size).run(full=args.full)
+    finally:
+        db.close()
+    print(
+        f"Exported {summary['analytics_months']} analytics month(s), "
+        f"{summary['chart_weeks']} chart week(s), songs and artists to {args.out}"
+    )
+
+
+if __name__ == "__main__":
+    main()
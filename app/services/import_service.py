@@ -0,0 +1,280 @@
+"""Bulk import of artists and songs from CSV or NDJSON.
+
+Rows are streamed, validated with the ``ArtistImportRow`` / ``SongImportRow``
+schemas, and inserted ``batch_size`` at a time with one executemany INSERT per
+batch, each batch in its own transaction. A row that fails validation or names an
+unknown artist is reported with its line number and skipped; the rest of its batch
+is still inserted. If a batch INSERT fails as a whole (e.g. a constraint), its rows
+are retried one by one so only the offending rows are rejected.
+
+Songs name their artist by ``artist_id``, ``artist_external_id`` or ``artist_name``
+(case-insensitive), resolved against an in-memory map of all artists loaded once
+per import. ``--create-artists`` adds artists that are named but not found.
+Artist rows that match an existing artist (by external id if given, otherwise by
+name) are skipped, so an artist file can be imported again safely; song imports
+are not deduplicated. Inserted rows are recorded in the sync change log.
+
+    python -m app.services.import_service artists artists.csv
+    python -m app.services.import_service songs songs.ndjson --create-artists
+"""
+import argparse
+import csv
+import io
+import json
+import sys
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, TextIO, Tuple
+from pydantic import ValidationError
+from sqlalchemy import func, insert, select
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+from app.models import Artist, Song
+from app.schemas.catalog_import import ArtistImportRow, ImportReport, ImportRowError, SongImportRow
+from app.services.change_log import UPSERT, log_changes
+
+FORMATS = ("csv", "ndjson")
+SONG_FIELDS = (
+    "title", "album", "duration_seconds", "release_date", "genre", "region", "cover_url", "audio_url",
+)
+
+
+def detect_format(filename: str) -> str:
+    """csv or ndjson from a file name; anything but .csv is read as NDJSON"""
+    return "csv" if filename.lower().endswith(".csv") else "ndjson"
+
+
+def read_rows(stream: TextIO, fmt: str) -> Iterator[Tuple[int, Optional[dict], Optional[str]]]:
+    """(line number, row, parse error) for each record of a CSV (with header) or NDJSON stream"""
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            if None in row:
+                yield reader.line_num, None, "more values than header columns"
+            else:
+                yield reader.line_num, row, None
+        return
+    if fmt != "ndjson":
+        raise ValueError(f"unknown import format {fmt!r}; expected one of {FORMATS}")
+    for line_number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            yield line_number, None, f"invalid JSON: {exc}"
+            continue
+        if isinstance(row, dict):
+            yield line_number, row, None
+        else:
+            yield line_number, None, "expected a JSON object"
+
+
+def _messages(exc: ValidationError) -> List[str]:
+    return [
+        f"{'.'.join(str(part) for part in error['loc']) or 'row'}: {error['msg']}"
+        for error in exc.errors()
+    ]
+
+
+class ArtistDirectory:
+    """Artist ids by id, external id and case-folded name, loaded once and kept current"""
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.ids: Set[int] = set()
+        self.by_external_id: Dict[str, int] = {}
+        self.by_name: Dict[str, int] = {}
+        self.max_id = 0
+        self.refresh()
+
+    def refresh(self):
+        """Pick up artists added since the last load"""
+        rows = self.db.execute(
+            select(Artist.id, Artist.name, Artist.external_id).where(Artist.id > self.max_id).order_by(Artist.id)
+        )
+        for artist_id, name, external_id in rows:
+            self.add(artist_id, name, external_id)
+
+    def add(self, artist_id: int, name: str, external_id: Optional[str]):
+        self.ids.add(artist_id)
+        self.max_id = max(self.max_id, artist_id)
+        if external_id is not None:
+            self.by_external_id.setdefault(external_id, artist_id)
+        # With duplicate names, the oldest artist wins
+        self.by_name.setdefault(name.casefold(), artist_id)
+
+    def resolve(self, row: SongImportRow) -> Optional[int]:
+        if row.artist_id is not None:
+            return row.artist_id if row.artist_id in self.ids else None
+        if row.artist_external_id is not None:
+            found = self.by_external_id.get(row.artist_external_id)
+            if found is not None or row.artist_name is None:
+                return found
+        return self.by_name.get(row.artist_name.casefold())
+
+
+class CatalogImporter:
+    def __init__(self, db: Session, batch_size: int = 5000, max_errors: int = 1000,
+                 create_artists: bool = False, on_batch: Optional[Callable[[ImportReport], None]] = None):
+        self.db = db
+        self.batch_size = batch_size
+        self.max_errors = max_errors
+        self.create_artists = create_artists
+        self.on_batch = on_batch
+        # Artist keys (external id, else name) seen earlier in the current artist import
+        self._claimed: Set[Tuple[str, str]] = set()
+
+    def run(self, kind: str, stream: TextIO, fmt: str) -> ImportReport:
+        """Import ``kind`` (artists or songs) rows from ``stream``"""
+        if kind not in ("artists", "songs"):
+            raise ValueError(f"unknown import kind {kind!r}; expected artists or songs")
+        started = time.perf_counter()
+        report = ImportReport(kind=kind)
+        self._claimed = set()
+        directory = ArtistDirectory(self.db)
+        schema = ArtistImportRow if kind == "artists" else SongImportRow
+        prepare = self._artist_values if kind == "artists" else self._song_values
+        table = Artist.__table__ if kind == "artists" else Song.__table__
+
+        for batch in self._batches(read_rows(stream, fmt), schema, report):
+            values = []
+            for line, row in batch:
+                prepared = prepare(row, directory, report)
+                if isinstance(prepared, str):
+                    self._fail(report, line, [prepared])
+                elif prepared is not None:
+                    values.append((line, prepared))
+            self._insert(table, values, report)
+            if kind == "artists":
+                directory.refresh()
+            if self.on_batch is not None:
+                self.on_batch(report)
+
+        # Parse and validation errors are found before artist errors of the same batch
+        report.errors.sort(key=lambda error: error.line)
+        report.seconds = round(time.perf_counter() - started, 3)
+        return report
+
+    def _batches(self, rows: Iterable[Tuple[int, Optional[dict], Optional[str]]], schema,
+                 report: ImportReport) -> Iterator[List[Tuple[int, object]]]:
+        batch = []
+        for line, raw, error in rows:
+            report.rows += 1
+            if error is not None:
+                self._fail(report, line, [error])
+                continue
+            try:
+                batch.append((line, schema.model_validate(raw)))
+            except ValidationError as exc:
+                self._fail(report, line, _messages(exc))
+                continue
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _artist_values(self, row: ArtistImportRow, directory: ArtistDirectory, report: ImportReport):
+        if row.external_id is not None:
+            key = ("external_id", row.external_id)
+            existing = row.external_id in directory.by_external_id
+        else:
+            key = ("name", row.name.casefold())
+            existing = key[1] in directory.by_name
+        # Rows repeating an artist earlier in the file are skipped like existing ones
+        if existing or key in self._claimed:
+            report.skipped += 1
+            return None
+        self._claimed.add(key)
+        return row.model_dump()
+
+    def _song_values(self, row: SongImportRow, directory: ArtistDirectory, report: ImportReport):
+        artist_id = directory.resolve(row)
+        if artist_id is None:
+            if not (self.create_artists and row.artist_name and row.artist_id is None):
+                return f"unknown artist {row.artist_id or row.artist_external_id or row.artist_name!r}"
+            artist_id = self.db.execute(
+                insert(Artist).values(name=row.artist_name, external_id=row.artist_external_id)
+            ).inserted_primary_key[0]
+            log_changes(self.db, "artists", UPSERT, select(Artist.id).where(Artist.id == artist_id))
+            # Committed on its own, so a failed song batch cannot roll it back
+            self.db.commit()
+            directory.add(artist_id, row.artist_name, row.artist_external_id)
+            report.artists_created += 1
+        values = {field: getattr(row, field) for field in SONG_FIELDS}
+        values["artist_id"] = artist_id
+        values["is_explicit"] = bool(row.is_explicit)
+        return values
+
+    def _insert(self, table, values: List[Tuple[int, dict]], report: ImportReport):
+        if not values:
+            return
+        last_id = self.db.execute(select(func.max(table.c.id))).scalar() or 0
+        try:
+            self.db.execute(insert(table), [row for _, row in values])
+            # For the sync change log; rows other writers add meanwhile are logged twice, harmlessly
+            log_changes(self.db, table.name, UPSERT, select(table.c.id).where(table.c.id > last_id))
+            self.db.commit()
+            report.inserted += len(values)
+            return
+        except DBAPIError:
+            self.db.rollback()
+        # Find the offending rows
+        for line, row in values:
+            try:
+                row_id = self.db.execute(insert(table).values(row)).inserted_primary_key[0]
+                log_changes(self.db, table.name, UPSERT, select(table.c.id).where(table.c.id == row_id))
+                self.db.commit()
+                report.inserted += 1
+            except DBAPIError as exc:
+                self.db.rollback()
+                self._fail(report, line, [str(exc.orig)])
+
+    def _fail(self, report: ImportReport, line: int, errors: List[str]):
+        report.failed += 1
+        if len(report.errors) < self.max_errors:
+            report.errors.append(ImportRowError(line=line, errors=errors))
+
+
+def main():
+    """Import artists or songs from the command line"""
+    from app.database.connection import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Bulk import artists or songs from CSV or NDJSON")
+    parser.add_argument("kind", choices=["artists", "songs"])
+    parser.add_argument("path", help="Input file, or - for stdin")
+    parser.add_argument("--format", choices=FORMATS, help="Defaults to the file extension (.csv, else NDJSON)")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--max-errors", type=int, default=100, help="Row errors to print")
+    parser.add_argument("--create-artists", action="store_true", help="Create artists named by songs but not found")
+    args = parser.parse_args()
+
+    fmt = args.format or detect_format(args.path)
+
+    def progress(report: ImportReport):
+        print(f"\r{report.rows} rows, {report.inserted} inserted, {report.failed} failed", end="", file=sys.stderr)
+
+    db = SessionLocal()
+    if args.path == "-":
+        stream = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8-sig", newline="")
+    else:
+        stream = open(args.path, encoding="utf-8-sig", newline="")
+    try:
+        importer = CatalogImporter(
+            db, batch_size=args.batch_size, max_errors=args.max_errors,
+            create_artists=args.create_artists, on_batch=progress
+        )
+        report = importer.run(args.kind, stream, fmt)
+    finally:
+        stream.close()
+        db.close()
+    print(file=sys.stderr)
+    for error in report.errors:
+        print(f"line {error.line}: {'; '.join(error.errors)}")
+    print(f"Imported {report.inserted} of {report.rows} {args.kind} rows in {report.seconds:.1f}s "
+          f"({report.skipped} skipped, {report.failed} failed, {report.artists_created} artists created)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Periodic jobs run by the in-process scheduler, each in its own database session.
+
+Schedules come from settings; an interval of 0 or an empty cron expression
+disables a job. Every job can also be run by hand through its service's CLI.
+"""
+import socket
+from typing import Callable
+from app.config import settings
+from app.services.scheduler_service import CronTrigger, IntervalTrigger, Scheduler
+
+
+def _in_session(work: Callable):
+    from app.database.connection import SessionLocal
+
+    db = SessionLocal()
+    try:
+        return work(db)
+    finally:
+        db.close()
+
+
+def refresh_monthly_listeners():
+    from app.services.artist_service import MonthlyListenersService
+    return _in_session(lambda db: MonthlyListenersService(db).refresh(batch_size=settings.MONTHLY_LISTENERS_BATCH_SIZE))
+
+
+def refresh_analytics_rollups():
+    from app.services.analytics_service import AnalyticsRollupService
+    return _in_session(lambda db: AnalyticsRollupService(db).refresh())
+
+
+def reconcile_playlists():
+    from app.services.playlist_service import PlaylistStatsService
+    return _in_session(lambda db: PlaylistStatsService(db).reconcile())
+
+
+def maintain_analytics():
+    """Partition compaction and retention, then listener sketch compaction and retention"""
+    from app.services.partition_service import AnalyticsPartitionService
+    from app.services.sketch_service import ListenerSketchService
+
+    def work(db):
+        partitions = AnalyticsPartitionService(db)
+        sketches = ListenerSketchService(db)
+        return {
+            "compacted_rows": partitions.compact(),
+            "dropped_partitions": partitions.apply_retention(),
+            "merged_sketches": sketches.compact(),
+            "expired_sketches": sketches.apply_retention(),
+        }
+    return _in_session(work)
+
+
+def export_snapshots():
+    from app.services.export_service import SnapshotExporter
+
+    def work(db):
+        # Long scans belong on a replica, away from API traffic
+        db.info["read_only"] = True
+        return SnapshotExporter(db, settings.EXPORT_DIR, batch_size=settings.EXPORT_BATCH_SIZE).run()
+    return _in_session(work)
+
+
+def build_catalog_snapshot():
+    from app.services.catalog_snapshot import build_snapshot
+
+    def work(db):
+        db.info["read_only"] = True
+        return build_snapshot(db, settings.CATALOG_SNAPSHOT_PATH)
+    return _in_session(work)
+
+
+def purge_deleted():
+    from app.services.purge_service import PurgeService
+    return _in_session(lambda db: PurgeService(
+        db, batch_size=settings.PURGE_BATCH_SIZE, pause_seconds=settings.PURGE_PAUSE_SECONDS,
+        max_seconds=settings.PURGE_MAX_SECONDS
+    ).run())
+
+
+def prune_change_log():
+    from app.services.sync_service import prune_change_log as prune
+    return _in_session(lambda db: prune(db, settings.CHANGE_LOG_RETENTION_DAYS))
+
+
+def prune_refresh_tokens():
+    from app.services.token_service import prune_refresh_tokens as prune
+    return _in_session(prune)
+
+
+def register_jobs(scheduler: Scheduler):
+    """Add the configured periodic jobs to ``scheduler``"""
+    intervals = (
+        ("monthly_listeners", refresh_monthly_listeners, settings.MONTHLY_LISTENERS_INTERVAL_SECONDS),
+        ("analytics_rollups", refresh_analytics_rollups, settings.ANALYTICS_ROLLUP_INTERVAL_SECONDS),
+        ("soft_delete_purge", purge_deleted, settings.PURGE_INTERVAL_SECONDS),
+    )
+    for name, func, seconds in intervals:
+        if seconds > 0:
+            scheduler.add_job(name, func, IntervalTrigger(seconds))
+
+    if settings.CATALOG_SNAPSHOT_PATH and settings.CATALOG_SNAPSHOT_INTERVAL_SECONDS > 0:
+        # The snapshot is a local file, so every host builds its own: one lease per host
+        scheduler.add_job(
+            f"catalog_snapshot@{socket.gethostname()}", build_catalog_snapshot,
+            IntervalTrigger(settings.CATALOG_SNAPSHOT_INTERVAL_SECONDS)
+        )
+
+    crons = (
+        ("playlist_reconcile", reconcile_playlists, settings.PLAYLIST_RECONCILE_CRON),
+        ("analytics_maintenance", maintain_analytics, settings.ANALYTICS_MAINTENANCE_CRON),
+        ("snapshot_export", export_snapshots, settings.EXPORT_CRON),
+        ("change_log_retention", prune_change_log, settings.CHANGE_LOG_RETENTION_CRON),
+        ("refresh_token_cleanup", prune_refresh_tokens, settings.REFRESH_TOKEN_CLEANUP_CRON),
+    )
+    for name, func, expression in crons:
+        if expression.strip():
+            scheduler.add_job(name, func, CronTrigger(expression))
@@ -0,0 +1,362 @@
+"""Live push of charts, song counters and trending songs over SSE and WebSockets.
+
+Clients subscribe to topics instead of polling:
+
+    chart:{year}:{week}[:{region}]  entries of a weekly chart, as GET /charts/weekly
+    song:{id}                       a song and its counters, as GET /songs/{id}
+    trending                        the top LIVE_TRENDING_LIMIT songs by streams
+
+Each topic that has subscribers in a worker has one producer there. It loads the
+topic's state in a small thread pool, compares it with the state it last
+published, and fans the difference out to every subscriber as a ``diff`` message
+encoded once. A new subscriber first gets the latest ``snapshot``. Producers
+reload when the change outbox reports a write that can affect them (songs,
+artists, chart entries; see app.services.consumers), and every
+``LIVE_REFRESH_SECONDS`` regardless, for changes made outside the change log. A
+producer stops when its last subscriber leaves.
+
+Connections cost no thread and no database session while idle: each is a small
+Subscription with a bounded buffer of pending messages. A client that falls
+``LIVE_BUFFER_SIZE`` messages behind loses its backlog and is sent fresh
+snapshots of its topics instead, so a slow reader cannot grow memory. Messages
+carry a per-topic ``seq``; a gap means the next message is a snapshot.
+"""
+import asyncio
+import json
+import logging
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Set
+from app.config import settings
+from app.services.metrics_service import metrics
+
+logger = logging.getLogger("app.live")
+
+live_messages_total = metrics.counter(
+    "live_messages_total", "Live push messages queued for subscribers", ("kind", "type")
+)
+live_overflows_total = metrics.counter(
+    "live_buffer_overflows_total", "Subscribers that fell too far behind and were resent snapshots"
+)
+
+
+class InvalidTopic(ValueError):
+    """The topic name is not one the server publishes"""
+
+
+def encode(message: dict) -> str:
+    return json.dumps(message, separators=(",", ":"))
+
+
+def _in_session(load):
+    from app.database.connection import SessionLocal
+
+    db = SessionLocal()
+    try:
+        return load(db)
+    finally:
+        db.close()
+
+
+def diff_ranked(old: List[dict], new: List[dict]) -> dict:
+    """Items (by ``id``) added or changed, ids removed, and the new order if it moved"""
+    before = {item["id"]: item for item in old}
+    changes: Dict[str, Any] = {
+        "upserted": [item for item in new if before.get(item["id"]) != item],
+        "removed": [item_id for item_id in before if item_id not in {item["id"] for item in new}],
+    }
+    order = [item["id"] for item in new]
+    if order != [item["id"] for item in old]:
+        changes["order"] = order
+    return changes
+
+
+class Topic(ABC):
+    kind = ""
+
+    def __init__(self, name: str):
+        self.name = name
+
+    @abstractmethod
+    def load(self, db) -> Any:
+        """The topic's current value, as sent to subscribers"""
+
+    def diff(self, old: Any, new: Any) -> Optional[dict]:
+        """The change from ``old`` to ``new``, or None to send a snapshot instead"""
+        return diff_ranked(old, new)
+
+    @abstractmethod
+    def affected_by(self, entity: str, entity_id: int) -> bool:
+        """Whether a change record for ``entity_id`` of ``entity`` can change the value"""
+
+
+class ChartTopic(Topic):
+    kind = "chart"
+
+    def __init__(self, name: str, year: int, week: int, region: Optional[str]):
+        super().__init__(name)
+        self.year = year
+        self.week = week
+        self.region = region
+
+    def load(self, db) -> List[dict]:
+        from app.services.chart_service import weekly_chart
+        from app.services.loaders import Loaders
+
+        chart = weekly_chart(db, Loaders(db), self.week, self.year, self.region)
+        return [entry.model_dump(mode="json") for entry in chart.entries]
+
+    def affected_by(self, entity: str, entity_id: int) -> bool:
+        # Entries nest their songs and artists
+        return entity in ("chart_entries", "songs", "artists")
+
+
+class SongTopic(Topic):
+    kind = "song"
+
+    def __init__(self, name: str, song_id: int):
+        super().__init__(name)
+        self.song_id = song_id
+
+    def load(self, db) -> Optional[dict]:
+        from app.models import Song
+        from app.schemas.song import SongResponse
+        from app.services.entity_cache import load_many
+
+        song = load_many(db, Song, SongResponse, [self.song_id]).get(self.song_id)
+        return song.model_dump(mode="json") if song is not None else None
+
+    def diff(self, old: Optional[dict], new: Optional[dict]) -> Optional[dict]:
+        if old is None or new is None:
+            return None
+        return {field: value for field, value in new.items() if old.get(field) != value}
+
+    def affected_by(self, entity: str, entity_id: int) -> bool:
+        return entity == "songs" and entity_id == self.song_id
+
+
+class TrendingTopic(Topic):
+    kind = "trending"
+
+    def load(self, db) -> List[dict]:
+        from app.models import Song
+        from app.schemas.song import SongResponse
+
+        songs = db.query(Song).order_by(Song.stream_count.desc()).limit(settings.LIVE_TRENDING_LIMIT).all()
+        return [SongResponse.model_validate(song).model_dump(mode="json") for song in songs]
+
+    def affected_by(self, entity: str, entity_id: int) -> bool:
+        return entity == "songs"
+
+
+def parse_topic(name: str) -> Topic:
+    """The topic for ``name``; raises InvalidTopic. Names are normalized, so equal topics share a producer"""
+    parts = name.strip().split(":")
+    try:
+        if parts == ["trending"]:
+            return TrendingTopic("trending")
+        if parts[0] == "song" and len(parts) == 2:
+            song_id = int(parts[1])
+            if song_id > 0:
+                return SongTopic(f"song:{song_id}", song_id)
+        if parts[0] == "chart" and len(parts) in (3, 4):
+            year, week = int(parts[1]), int(parts[2])
+            region = parts[3] if len(parts) == 4 and parts[3] else None
+            if 1 <= week <= 53 and 1900 <= year <= 9999:
+                return ChartTopic(f"chart:{year}:{week}" + (f":{region}" if region else ""), year, week, region)
+    except ValueError:
+        pass
+    raise InvalidTopic(name)
+
+
+class Subscription:
+    """One connection's topics and its bounded buffer of encoded messages"""
+    # Kept small: a worker holds tens of thousands of these
+    __slots__ = ("hub", "topics", "limit", "_buffer", "_waiter", "_lagged")
+
+    def __init__(self, hub: "LiveHub", limit: int):
+        self.hub = hub
+        self.topics: Set[str] = set()
+        self.limit = limit
+        self._buffer: List[str] = []
+        # Future a pending receive waits on, created only while it waits
+        self._waiter: Optional[asyncio.Future] = None
+        self._lagged = False
+
+    def wake(self):
+        """Make a pending ``receive`` return, with no messages if none are buffered"""
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    def push(self, message: str):
+        if self._lagged:
+            return
+        if len(self._buffer) >= self.limit:
+            # Too far behind: drop the backlog and resend snapshots once it reads again
+            self._buffer = []
+            self._lagged = True
+            live_overflows_total.inc()
+        else:
+            self._buffer.append(message)
+        self.wake()
+
+    async def receive(self, timeout: Optional[float] = None) -> List[str]:
+        """Pending messages, waiting up to ``timeout`` seconds for one; empty on timeout"""
+        if not self._buffer and not self._lagged:
+            self._waiter = asyncio.get_running_loop().create_future()
+            try:
+                await asyncio.wait_for(self._waiter, timeout)
+            except asyncio.TimeoutError:
+                return []
+            finally:
+                self._waiter = None
+        if self._lagged:
+            self._lagged = False
+            return self.hub.snapshots(self.topics)
+        messages, self._buffer = self._buffer, []
+        return messages
+
+
+class Producer:
+    """Loads one topic, publishes its changes to the topic's subscribers"""
+
+    def __init__(self, hub: "LiveHub", topic: Topic):
+        self.hub = hub
+        self.topic = topic
+        self.subscribers: Set[Subscription] = set()
+        self.state: Any = None
+        self.seq = 0
+        # Encoded snapshot of the current state, sent to new subscribers; None until the first load
+        self.snapshot: Optional[str] = None
+        self._wake = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def wake(self):
+        self._wake.set()
+
+    def stop(self):
+        self._task.cancel()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                state = await loop.run_in_executor(self.hub.executor, _in_session, self.topic.load)
+            except Exception:
+                logger.exception("live topic %s failed to load", self.topic.name)
+            else:
+                self._publish(state)
+            try:
+                await asyncio.wait_for(self._wake.wait(), settings.LIVE_REFRESH_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    def _publish(self, state: Any):
+        if self.snapshot is not None and state == self.state:
+            return
+        changes = self.topic.diff(self.state, state) if self.snapshot is not None else None
+        self.seq += 1
+        self.state = state
+        self.snapshot = encode({"topic": self.topic.name, "type": "snapshot", "seq": self.seq, "data": state})
+        if changes is None:
+            message, kind = self.snapshot, "snapshot"
+        else:
+            message, kind = encode({"topic": self.topic.name, "type": "diff", "seq": self.seq, "changes": changes}), "diff"
+        for subscription in self.subscribers:
+            subscription.push(message)
+        live_messages_total.inc((self.topic.kind, kind), len(self.subscribers))
+
+
+class LiveHub:
+    """Topics with subscribers in this worker, their producers, and the connections"""
+
+    def __init__(self):
+        self.producers: Dict[str, Producer] = {}
+        self.connections = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=settings.LIVE_LOAD_WORKERS, thread_name_prefix="live")
+        return self._executor
+
+    def connect(self) -> Optional[Subscription]:
+        """A new connection's subscription, or None when the worker is at LIVE_MAX_CONNECTIONS"""
+        if self.connections >= settings.LIVE_MAX_CONNECTIONS:
+            return None
+        self._loop = asyncio.get_running_loop()
+        self.connections += 1
+        return Subscription(self, settings.LIVE_BUFFER_SIZE)
+
+    def disconnect(self, subscription: Subscription):
+        self.unsubscribe(subscription, list(subscription.topics))
+        self.connections -= 1
+
+    def subscribe(self, subscription: Subscription, names: Iterable[str]) -> List[str]:
+        """Add topics (raises InvalidTopic, or ValueError past LIVE_MAX_TOPICS); returns their normalized names"""
+        topics = [parse_topic(name) for name in names]
+        added = {topic.name for topic in topics} - subscription.topics
+        if len(subscription.topics) + len(added) > settings.LIVE_MAX_TOPICS:
+            raise ValueError(f"At most {settings.LIVE_MAX_TOPICS} topics per connection")
+        for topic in topics:
+            if topic.name not in added:
+                continue
+            producer = self.producers.get(topic.name)
+            if producer is None:
+                producer = self.producers[topic.name] = Producer(self, topic)
+            producer.subscribers.add(subscription)
+            subscription.topics.add(topic.name)
+            if producer.snapshot is not None:
+                subscription.push(producer.snapshot)
+        return [topic.name for topic in topics]
+
+    def unsubscribe(self, subscription: Subscription, names: Iterable[str]):
+        for name in names:
+            try:
+                name = parse_topic(name).name
+            except InvalidTopic:
+                continue
+            subscription.topics.discard(name)
+            producer = self.producers.get(name)
+            if producer is None:
+                continue
+            producer.subscribers.discard(subscription)
+            if not producer.subscribers:
+                producer.stop()
+                del self.producers[name]
+
+    def snapshots(self, names: Iterable[str]) -> List[str]:
+        """Latest snapshot of each of ``names`` that has been loaded"""
+        producers = (self.producers.get(name) for name in names)
+        return [producer.snapshot for producer in producers if producer is not None and producer.snapshot]
+
+    def changed(self, records):
+        """Outbox consumer: wake the producers whose topics the changed rows can affect"""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        changes = {(record.entity, record.entity_id) for record in records}
+        loop.call_soon_threadsafe(self._wake_affected, changes)
+
+    def _wake_affected(self, changes):
+        for producer in self.producers.values():
+            if any(producer.topic.affected_by(entity, entity_id) for entity, entity_id in changes):
+                producer.wake()
+
+    async def stop(self):
+        for producer in self.producers.values():
+            producer.stop()
+        self.producers.clear()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+live_hub = LiveHub()
+metrics.gauge_callback(
+    "live_connections", "Open live push connections and topics with a producer in this worker", ("what",),
+    lambda: {("connections",): live_hub.connections, ("topics",): len(live_hub.producers)}
+)
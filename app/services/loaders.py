@@ -0,0 +1,89 @@
+"""Request-scoped batching loaders for songs and artists.
+
+Building a response that nests songs (chart entries, playlist tracks, top songs)
+by walking ORM relationships costs one query per object. Instead, the code that
+assembles the response first ``load``s every id it will need, and the first
+``get`` resolves everything queued so far with one ``IN`` query per entity type.
+Results, including ids that do not exist, are memoized for the rest of the request.
+Lookups go through the entity cache, so entities cached by other requests cost
+no query at all.
+
+Endpoints get a fresh ``Loaders`` per request from the ``get_loaders`` dependency.
+"""
+from typing import Callable, Dict, Generic, Iterable, List, Optional, TypeVar
+from fastapi import Depends
+from sqlalchemy.orm import Session
+from app.database.connection import get_db
+from app.models import Artist, Song
+from app.schemas.artist import ArtistResponse
+from app.schemas.song import SongResponse, SongWithArtistResponse
+from app.services.entity_cache import load_many
+
+T = TypeVar("T")
+
+# Ids per IN query
+BATCH_SIZE = 500
+
+
+class Loader(Generic[T]):
+    """Collects ids, then fetches all pending ones in a single batch"""
+
+    def __init__(self, fetch: Callable[[List[int]], Dict[int, T]]):
+        self.fetch = fetch
+        self._pending: Dict[int, None] = {}
+        self._results: Dict[int, Optional[T]] = {}
+        self.batches = 0
+
+    def load(self, key: int):
+        """Queue ``key`` for the next batch"""
+        if key is not None and key not in self._results:
+            self._pending[key] = None
+
+    def load_many(self, keys: Iterable[int]):
+        for key in keys:
+            self.load(key)
+
+    def dispatch(self):
+        """Fetch every queued id"""
+        keys = list(self._pending)
+        self._pending.clear()
+        for i in range(0, len(keys), BATCH_SIZE):
+            chunk = keys[i:i + BATCH_SIZE]
+            found = self.fetch(chunk)
+            self.batches += 1
+            for key in chunk:
+                self._results[key] = found.get(key)
+
+    def get(self, key: int) -> Optional[T]:
+        """The entity for ``key`` (None if it does not exist), fetching pending ids if needed"""
+        if key is None:
+            return None
+        if key not in self._results:
+            self.load(key)
+            self.dispatch()
+        return self._results[key]
+
+
+class Loaders:
+    def __init__(self, db: Session):
+        self.db = db
+        self.songs: Loader[SongResponse] = Loader(lambda ids: load_many(db, Song, SongResponse, ids))
+        self.artists: Loader[ArtistResponse] = Loader(lambda ids: load_many(db, Artist, ArtistResponse, ids))
+
+    def songs_with_artists(self, song_ids: Iterable[int]) -> Dict[int, SongWithArtistResponse]:
+        """Songs by id with their artists; at most one query for songs and one for artists"""
+        song_ids = list(song_ids)
+        self.songs.load_many(song_ids)
+        self.songs.dispatch()
+        songs = [song for song in (self.songs.get(song_id) for song_id in song_ids) if song is not None]
+        self.artists.load_many(song.artist_id for song in songs)
+        self.artists.dispatch()
+        return {
+            song.id: SongWithArtistResponse(**song.model_dump(), artist=self.artists.get(song.artist_id))
+            for song in songs
+        }
+
+
+def get_loaders(db: Session = Depends(get_db)) -> Loaders:
+    """Loaders for the current request"""
+    return Loaders(db)
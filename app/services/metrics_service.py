@@ -0,0 +1,265 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Tuple
+from app.database.instrumentation import RequestDBStats, request_db_stats, db_time_totals
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (128, 512, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+
+class _Shard:
+    """Per-thread metric values; only the owning thread writes to it"""
+
+    __slots__ = ("values", "histograms")
+
+    def __init__(self):
+        self.values = {}
+        self.histograms = {}
+
+
+class MetricsRegistry:
+    """Lock-free metrics aggregation for one worker process.
+
+    Every thread updates its own shard, so the hot path never takes a lock or
+    contends with other threads. Shards are summed only when /metrics is scraped.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards = []
+        self._shards_lock = threading.Lock()
+        self._families = {}
+        self._callbacks = []
+
+    def _shard(self) -> _Shard:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = _Shard()
+            with self._shards_lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+            return shard
+
+    def _register(self, metric):
+        if metric.name in self._families:
+            raise ValueError(f"Metric already registered: {metric.name}")
+        self._families[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, description: str, labelnames: Tuple[str, ...] = ()) -> "Counter":
+        return self._register(Counter(self, name, description, labelnames))
+
+    def gauge(self, name: str, description: str, labelnames: Tuple[str, ...] = ()) -> "Gauge":
+        return self._register(Gauge(self, name, description, labelnames))
+
+    def histogram(self, name: str, description: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> "Histogram":
+        return self._register(Histogram(self, name, description, labelnames, buckets))
+
+    def gauge_callback(self, name: str, description: str, labelnames: Tuple[str, ...],
+                       collect: Callable[[], Dict[tuple, float]]):
+        """Register a gauge whose samples are computed at scrape time"""
+        self._callbacks.append((name, description, labelnames, collect))
+
+    def _merged(self):
+        with self._shards_lock:
+            shards = list(self._shards)
+        values = {}
+        histograms = {}
+        for shard in shards:
+            for key, value in dict(shard.values).items():
+                values[key] = values.get(key, 0) + value
+            for key, (counts, total) in dict(shard.histograms).items():
+                merged = histograms.get(key)
+                if merged is None:
+                    histograms[key] = [list(counts), total]
+                else:
+                    merged[0] = [a + b for a, b in zip(merged[0], counts)]
+                    merged[1] += total
+        return values, histograms
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format"""
+        values, histograms = self._merged()
+        lines = []
+
+        for metric in self._families.values():
+            lines.append(f"# HELP {metric.name} {metric.description}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            if metric.type == "histogram":
+                for (name, labels), (counts, total) in sorted(histograms.items()):
+                    if name == metric.name:
+                        lines.extend(metric.render_samples(labels, counts, total))
+            else:
+                for (name, labels), value in sorted(values.items()):
+                    if name == metric.name:
+                        lines.append(f"{name}{_labels(metric.labelnames, labels)} {_number(value)}")
+
+        for name, description, labelnames, collect in self._callbacks:
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} gauge")
+            for labels, value in sorted(collect().items()):
+                lines.append(f"{name}{_labels(labelnames, labels)} {_number(value)}")
+
+        return "\n".join(lines) + "\n"
+
+
+class _Metric:
+    type = "untyped"
+
+    def __init__(self, registry: MetricsRegistry, name: str, description: str, labelnames: Tuple[str, ...]):
+        self.registry = registry
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, labels: tuple = (), amount: float = 1):
+        values = self.registry._shard().values
+        key = (self.name, labels)
+        values[key] = values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def inc(self, labels: tuple = (), amount: float = 1):
+        # Per-thread deltas: an inc in one thread and a dec in another still sum correctly
+        values = self.registry._shard().values
+        key = (self.name, labels)
+        values[key] = values.get(key, 0) + amount
+
+    def dec(self, labels: tuple = (), amount: float = 1):
+        self.inc(labels, -amount)
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, registry, name, description, labelnames, buckets):
+        super().__init__(registry, name, description, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, labels: tuple = ()):
+        histograms = self.registry._shard().histograms
+        key = (self.name, labels)
+        entry = histograms.get(key)
+        if entry is None:
+            entry = histograms[key] = [[0] * (len(self.buckets) + 1), 0.0]
+        entry[0][bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+
+    @contextmanager
+    def time(self, labels: tuple = ()):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, labels)
+
+    def render_samples(self, labels: tuple, counts: list, total: float) -> Iterable[str]:
+        cumulative = 0
+        for bound, count in zip(self.buckets, counts):
+            cumulative += count
+            yield f"{self.name}_bucket{_labels(self.labelnames + ('le',), labels + (_number(bound),))} {cumulative}"
+        cumulative += counts[-1]
+        yield f"{self.name}_bucket{_labels(self.labelnames + ('le',), labels + ('+Inf',))} {cumulative}"
+        yield f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}"
+        yield f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple, values: tuple) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+def _number(value) -> str:
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+# Process-wide registry and the metrics recorded by the app
+metrics = MetricsRegistry()
+
+http_requests_total = metrics.counter(
+    "http_requests_total", "HTTP requests handled", ("method", "route", "status")
+)
+http_request_duration_seconds = metrics.histogram(
+    "http_request_duration_seconds", "HTTP request latency", ("method", "route")
+)
+http_requests_in_flight = metrics.gauge(
+    "http_requests_in_flight", "HTTP requests currently being handled"
+)
+http_response_size_bytes = metrics.histogram(
+    "http_response_size_bytes", "HTTP response body size", ("method", "route"), buckets=SIZE_BUCKETS
+)
+db_queries_per_request = metrics.histogram(
+    "db_queries_per_request", "Database queries executed per HTTP request", ("route",), buckets=COUNT_BUCKETS
+)
+db_time_per_request_seconds = metrics.histogram(
+    "db_time_per_request_seconds", "Time spent in the database per HTTP request", ("route",)
+)
+password_hash_seconds = metrics.histogram(
+    "auth_password_hash_seconds", "Time spent hashing or verifying passwords", ("operation",)
+)
+jwt_seconds = metrics.histogram(
+    "auth_jwt_seconds", "Time spent encoding or decoding JWTs", ("operation",)
+)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request, response-size and per-request DB metrics"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        db_stats = RequestDBStats()
+        token = request_db_stats.set(db_stats)
+        http_requests_in_flight.inc()
+        status_code = 500
+        response_size = 0
+
+        async def send_wrapper(message):
+            nonlocal status_code, response_size
+            if message["type"] == "http.response.body":
+                response_size += len(message.get("body", b""))
+            elif message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_db_stats.reset(token)
+            http_requests_in_flight.dec()
+            elapsed = time.perf_counter() - start
+
+            route = scope.get("route")
+            path = route.path if route is not None else "unmatched"
+            method = scope["method"]
+
+            http_requests_total.inc((method, path, str(status_code)))
+            http_request_duration_seconds.observe(elapsed, (method, path))
+            http_response_size_bytes.observe(response_size, (method, path))
+            db_queries_per_request.observe(db_stats.query_count, (path,))
+            db_time_per_request_seconds.observe(db_stats.db_time, (path,))
+            db_time_totals.add(db_stats)
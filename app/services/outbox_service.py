@@ -0,0 +1,286 @@
+"""Change-data-capture outbox: fans change_log records out to in-process consumers.
+
+Writes to artists, songs, playlists, playlist tracks and chart entries append a
+``change_log`` record in the same transaction (app.services.change_log), so the log
+is a transactional outbox: a record exists exactly when its change committed. The
+dispatcher in each worker polls the log every ``OUTBOX_POLL_SECONDS``, and at once
+after a local commit that logged changes, and hands new records to every registered
+consumer in batches of up to ``batch_size``. Batches are in log order, so the
+changes to any one row always arrive in the order they were made. A consumer's
+checkpoint (the last record id it handled) only advances once its handler
+returns; a handler that raises gets the same batch again on the next poll, so
+delivery is at least once and handlers must be idempotent.
+
+Consumers are local by default: each process delivers to its own copy, starting
+at the head of the log when the dispatcher starts, with the checkpoint kept in
+memory. That suits per-process caches. A ``durable`` consumer keeps its checkpoint
+in ``job_checkpoints`` and is run by one process at a time, under a lease; it
+resumes where it stopped after a restart, which suits shared indexes. ``replay``
+moves a consumer's checkpoint to an earlier (or later) record id.
+
+    python -m app.services.outbox_service status
+    python -m app.services.outbox_service replay NAME --after-id 0
+"""
+import argparse
+import asyncio
+import logging
+import os
+import socket
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Callable, Dict, Iterable, List, Optional
+from sqlalchemy import event, func, select
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database.routing import RoutingSession
+from app.models import ChangeLog
+from app.services.checkpoint_service import get_checkpoint, set_checkpoint
+from app.services.metrics_service import metrics
+from app.services.scheduler_service import acquire_lease, utcnow
+
+logger = logging.getLogger("app.outbox")
+
+outbox_delivered_total = metrics.counter(
+    "outbox_records_delivered_total", "Change records handed to outbox consumers", ("consumer",)
+)
+outbox_failures_total = metrics.counter(
+    "outbox_handler_failures_total", "Outbox consumer batches that raised and will be retried", ("consumer",)
+)
+
+# Seconds a durable consumer's lease lasts without a poll renewing it
+LEASE_SECONDS = 30
+
+
+class Consumer:
+    def __init__(self, name: str, handler: Callable[[List[Row]], None], entities: Optional[Iterable[str]] = None,
+                 batch_size: int = 500, durable: bool = False):
+        self.name = name
+        self.handler = handler
+        self.entities = tuple(entities) if entities else None
+        self.batch_size = batch_size
+        self.durable = durable
+        # Id of the last record handled; None until the dispatcher positions it
+        self.position: Optional[int] = None
+        self.delivered = 0
+        self.batches = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+        self.last_delivered_at = None
+
+    @property
+    def checkpoint_name(self) -> str:
+        return f"outbox:{self.name}"
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "entities": list(self.entities) if self.entities else None,
+            "durable": self.durable,
+            "position": self.position,
+            "delivered": self.delivered,
+            "batches": self.batches,
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "last_delivered_at": self.last_delivered_at,
+        }
+
+
+class OutboxDispatcher:
+    def __init__(self, poll_seconds: float = 1.0, session_factory: Optional[Callable[[], Session]] = None):
+        self.poll_seconds = poll_seconds
+        self.session_factory = session_factory
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.consumers: Dict[str, Consumer] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+
+    def register(self, name: str, handler: Callable[[List[Row]], None], entities: Optional[Iterable[str]] = None,
+                 batch_size: int = 500, durable: bool = False) -> Consumer:
+        """Deliver change records (id, entity, entity_id, op, user_id, changed_at) to ``handler``"""
+        consumer = Consumer(name, handler, entities, batch_size, durable)
+        self.consumers[name] = consumer
+        return consumer
+
+    def start(self):
+        """Start polling; call from the running event loop"""
+        if self._task is not None:
+            return
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="outbox")
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._task = self._loop.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._loop = None
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def notify(self):
+        """Poll now instead of at the next interval; safe to call from any thread"""
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._wake.set)
+
+    async def _run(self):
+        while True:
+            try:
+                await self._loop.run_in_executor(self._executor, self.poll)
+            except Exception:
+                logger.exception("outbox poll failed")
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    def _session(self) -> Session:
+        if self.session_factory is not None:
+            return self.session_factory()
+        from app.database.connection import SessionLocal
+        return SessionLocal()
+
+    def poll(self) -> int:
+        """Deliver every consumer's backlog; returns the number of records delivered"""
+        with self._lock:
+            delivered = 0
+            db = self._session()
+            try:
+                for consumer in list(self.consumers.values()):
+                    delivered += self._drain(db, consumer)
+            finally:
+                db.close()
+            return delivered
+
+    def _drain(self, db: Session, consumer: Consumer) -> int:
+        if consumer.durable:
+            if not acquire_lease(db, consumer.checkpoint_name, self.owner, utcnow() + timedelta(seconds=LEASE_SECONDS)):
+                return 0
+            # Another process may have advanced it while it held the lease
+            consumer.position = int(get_checkpoint(db, consumer.checkpoint_name, "0"))
+        elif consumer.position is None:
+            consumer.position = head(db)
+
+        delivered = 0
+        while True:
+            query = select(
+                ChangeLog.id, ChangeLog.entity, ChangeLog.entity_id, ChangeLog.op, ChangeLog.user_id,
+                ChangeLog.changed_at
+            ).where(ChangeLog.id > consumer.position)
+            if consumer.entities:
+                query = query.where(ChangeLog.entity.in_(consumer.entities))
+            records = db.execute(query.order_by(ChangeLog.id).limit(consumer.batch_size)).all()
+            # Release the read transaction (and any snapshot) before calling out
+            db.commit()
+            if not records:
+                return delivered
+            try:
+                consumer.handler(records)
+            except Exception as exc:
+                logger.exception("outbox consumer %s failed at record %s", consumer.name, records[0].id)
+                consumer.failures += 1
+                consumer.last_error = f"{type(exc).__name__}: {exc}"
+                outbox_failures_total.inc((consumer.name,))
+                db.rollback()
+                return delivered
+            consumer.position = records[-1].id
+            if consumer.durable:
+                set_checkpoint(db, consumer.checkpoint_name, str(consumer.position))
+                db.commit()
+            consumer.delivered += len(records)
+            consumer.batches += 1
+            consumer.last_error = None
+            consumer.last_delivered_at = utcnow()
+            outbox_delivered_total.inc((consumer.name,), len(records))
+            delivered += len(records)
+            if len(records) < consumer.batch_size:
+                return delivered
+
+    def replay(self, name: str, after_id: int, db: Optional[Session] = None):
+        """Re-deliver records after ``after_id`` to a consumer; raises KeyError for unknown consumers"""
+        consumer = self.consumers[name]
+        with self._lock:
+            consumer.position = after_id
+            if consumer.durable:
+                own = db is None
+                db = db or self._session()
+                try:
+                    set_checkpoint(db, consumer.checkpoint_name, str(after_id))
+                    db.commit()
+                finally:
+                    if own:
+                        db.close()
+        self.notify()
+
+    def status(self) -> List[dict]:
+        return [consumer.to_dict() for consumer in self.consumers.values()]
+
+
+def head(db: Session) -> int:
+    """Id of the newest change record (0 for an empty log)"""
+    return db.execute(select(func.max(ChangeLog.id))).scalar() or 0
+
+
+outbox = OutboxDispatcher(poll_seconds=settings.OUTBOX_POLL_SECONDS)
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _wake_dispatcher(session):
+    if session.info.pop("change_log_written", False):
+        outbox.notify()
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def _discard_written(session):
+    session.info.pop("change_log_written", None)
+
+
+def main():
+    """Inspect or rewind durable outbox consumers from the command line"""
+    from app.database.connection import SessionLocal
+    from app.models import JobCheckpoint
+
+    parser = argparse.ArgumentParser(description="Durable outbox consumer checkpoints")
+    parser.add_argument("command", choices=["status", "replay"])
+    parser.add_argument("name", nargs="?", help="Consumer to replay")
+    parser.add_argument("--after-id", type=int, default=0, help="Re-deliver records after this id")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.command == "replay":
+            if not args.name:
+                parser.error("replay needs a consumer name")
+            set_checkpoint(db, f"outbox:{args.name}", str(args.after_id))
+            db.commit()
+            print(f"{args.name} will re-deliver records after {args.after_id}")
+            return
+        latest = head(db)
+        checkpoints = db.query(JobCheckpoint).filter(JobCheckpoint.name.like("outbox:%")).all()
+        print(f"head {latest}")
+        for checkpoint in checkpoints:
+            print(f"{checkpoint.name[len('outbox:'):]:<24} at {checkpoint.value:>10}  lag {latest - int(checkpoint.value)}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+import argparse
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Optional
+from sqlalchemy import Table, func, select
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database.functions import day_of
+from app.database.partitions import (
+    VALUE_COLUMNS, analytics_partitions, add_months, month_start, partition_month, partition_table
+)
+from app.models import Analytics
+
+
+class AnalyticsPartitionService:
+    """Maintenance for the monthly analytics partitions.
+
+    - migrate_legacy moves rows from the old single ``analytics`` table into partitions
+    - compact rolls daily rows in old months up to weekly, then monthly, rows
+    - apply_retention drops partitions older than ANALYTICS_RETENTION_MONTHS
+
+    Compaction keeps totals intact; only the time resolution of old raw data is lost.
+    Daily trends keep working because analytics_rollups is not compacted.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def migrate_legacy(self, batch_size: int = 10000) -> int:
+        """Move legacy analytics rows into partitions in batches; returns rows moved"""
+        legacy = Analytics.__table__
+        moved = 0
+        last_id = 0
+        while True:
+            rows = self.db.execute(
+                select(legacy)
+                .where(legacy.c.id > last_id, legacy.c.date.isnot(None))
+                .order_by(legacy.c.id)
+                .limit(batch_size)
+            ).mappings().all()
+            if not rows:
+                break
+            last_id = rows[-1]["id"]
+            analytics_partitions.insert(self.db, [
+                {column: row[column] for column in ("song_id", "region", "date", "created_at", *VALUE_COLUMNS)}
+                for row in rows
+            ])
+            self.db.execute(legacy.delete().where(legacy.c.id.in_([row["id"] for row in rows])))
+            analytics_partitions.mark_rewritten(self.db, legacy)
+            self.db.commit()
+            moved += len(rows)
+        return moved
+
+    def compact(self, today: Optional[date] = None) -> int:
+        """Compact old partitions per the settings; returns the number of rows replaced"""
+        current = month_start(today or datetime.now(timezone.utc).date())
+        weekly_before = add_months(current, -settings.ANALYTICS_WEEKLY_AFTER_MONTHS)
+        monthly_before = add_months(current, -settings.ANALYTICS_MONTHLY_AFTER_MONTHS)
+
+        replaced = 0
+        for name in analytics_partitions.names(self.db):
+            month = partition_month(name)
+            if month < monthly_before:
+                replaced += self._compact(partition_table(name), month, "month")
+            elif month < weekly_before:
+                replaced += self._compact(partition_table(name), month, "week")
+        return replaced
+
+    def _compact(self, table: Table, month: date, granularity: str) -> int:
+        finer = ("day",) if granularity == "week" else ("day", "week")
+        day = day_of(table.c.date)
+        rows = self.db.execute(
+            select(table.c.song_id, table.c.region, day, *(func.sum(table.c[c]) for c in VALUE_COLUMNS))
+            .where(table.c.granularity.in_(finer))
+            .group_by(table.c.song_id, table.c.region, day)
+        ).all()
+        if not rows:
+            return 0
+
+        merged = {}
+        for song_id, region, row_day, *values in rows:
+            if granularity == "week":
+                # Weeks are clipped to the month so rows stay in their partition
+                start = max(row_day - timedelta(days=row_day.weekday()), month)
+            else:
+                start = month
+            totals = merged.setdefault((song_id, region, start), [0] * len(VALUE_COLUMNS))
+            for i, value in enumerate(values):
+                totals[i] += value or 0
+
+        replaced = self.db.execute(table.delete().where(table.c.granularity.in_(finer))).rowcount
+        analytics_partitions.mark_rewritten(self.db, table)
+        self.db.execute(table.insert(), [
+            {
+                "song_id": song_id, "region": region, "date": datetime.combine(start, time.min),
+                "granularity": granularity, **dict(zip(VALUE_COLUMNS, totals)),
+            }
+            for (song_id, region, start), totals in merged.items()
+        ])
+        self.db.commit()
+        return replaced
+
+    def apply_retention(self, today: Optional[date] = None) -> int:
+        """Drop partitions past the retention window; returns the number dropped"""
+        if settings.ANALYTICS_RETENTION_MONTHS <= 0:
+            return 0
+        cutoff = add_months(month_start(today or datetime.now(timezone.utc).date()), -settings.ANALYTICS_RETENTION_MONTHS)
+
+        dropped = 0
+        for name in analytics_partitions.names(self.db):
+            if partition_month(name) < cutoff:
+                analytics_partitions.drop(self.db, name)
+                dropped += 1
+        legacy = Analytics.__table__
+        if self.db.execute(legacy.delete().where(legacy.c.date < datetime.combine(cutoff, time.min))).rowcount:
+            analytics_partitions.mark_rewritten(self.db, legacy)
+        self.db.commit()
+        return dropped
+
+
+def main():
+    """Run analytics partition maintenance from the command line"""
+    from app.database.connection import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Maintain monthly analytics partitions")
+    parser.add_argument("command", nargs="?", default="all", choices=["migrate", "compact", "retention", "all"])
+    parser.add_argument("--batch-size", type=int, default=10000)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        service = AnalyticsPartitionService(db)
+        if args.command in ("migrate", "all"):
+            print(f"Migrated {service.migrate_legacy(batch_size=args.batch_size)} legacy analytics row(s)")
+        if args.command in ("compact", "all"):
+            print(f"Compacted {service.compact()} analytics row(s)")
+        if args.command in ("retention", "all"):
+            print(f"Dropped {service.apply_retention()} expired partition(s)")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+import argparse
+from typing import Dict, Optional, Tuple
+from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from app.models import Playlist, PlaylistSong, Song
+from app.services.change_log import UPSERT, log_changes
+
+
+class PlaylistStatsService:
+    """Maintains the denormalized track_count / total_duration_seconds columns.
+
+    The track_* / song_* methods only stage UPDATE statements on the caller's session, so
+    the counters commit (or roll back) together with the playlist-song change.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def track_added(self, playlist_id: int, duration_seconds: Optional[int]):
+        """Account for one song added to a playlist"""
+        self.db.query(Playlist).filter(Playlist.id == playlist_id).update(
+            {
+                Playlist.track_count: Playlist.track_count + 1,
+                Playlist.total_duration_seconds: Playlist.total_duration_seconds + (duration_seconds or 0),
+            },
+            synchronize_session=False
+        )
+
+    def track_removed(self, playlist_id: int, duration_seconds: Optional[int]):
+        """Account for one song removed from a playlist"""
+        self.db.query(Playlist).filter(Playlist.id == playlist_id).update(
+            {
+                Playlist.track_count: Playlist.track_count - 1,
+                Playlist.total_duration_seconds: Playlist.total_duration_seconds - (duration_seconds or 0),
+            },
+            synchronize_session=False
+        )
+
+    def tracks_removed(self, removed: Dict[int, Tuple[int, int]]):
+        """Account for tracks removed in bulk: playlist id -> (tracks, their total duration)"""
+        for playlist_id, (tracks, duration_seconds) in removed.items():
+            self.db.query(Playlist).filter(Playlist.id == playlist_id).update(
+                {
+                    Playlist.track_count: Playlist.track_count - tracks,
+                    Playlist.total_duration_seconds: Playlist.total_duration_seconds - duration_seconds,
+                },
+                synchronize_session=False
+            )
+        self._log_playlists(list(removed))
+
+    def song_duration_changed(self, song_id: int, old_duration: Optional[int], new_duration: Optional[int]):
+        """Shift the total duration of every playlist containing the song"""
+        delta = (new_duration or 0) - (old_duration or 0)
+        if delta == 0:
+            return
+
+        occurrences = (
+            select(func.count(PlaylistSong.id))
+            .where(PlaylistSong.playlist_id == Playlist.id, PlaylistSong.song_id == song_id)
+            .scalar_subquery()
+        )
+        containing = select(PlaylistSong.playlist_id).where(PlaylistSong.song_id == song_id)
+
+        self.db.query(Playlist).filter(Playlist.id.in_(containing)).update(
+            {Playlist.total_duration_seconds: Playlist.total_duration_seconds + delta * occurrences},
+            synchronize_session=False
+        )
+        log_changes(
+            self.db, "playlists", UPSERT,
+            select(Playlist.id, Playlist.user_id).where(Playlist.id.in_(containing))
+        )
+
+    def _log_playlists(self, playlist_ids):
+        """Record counter changes made in bulk for the sync change log"""
+        if playlist_ids:
+            log_changes(
+                self.db, "playlists", UPSERT,
+                select(Playlist.id, Playlist.user_id).where(Playlist.id.in_(playlist_ids))
+            )
+
+    def reconcile(self, batch_size: int = 1000) -> int:
+        """Recompute counters from playlist_songs and repair any drift.
+
+        Walks playlists in id order in batches of ``batch_size`` and commits after
+        each batch. Returns the number of playlists that were corrected.
+        """
+        repaired = 0
+        last_id = 0
+
+        while True:
+            playlists = (
+                self.db.query(Playlist.id, Playlist.track_count, Playlist.total_duration_seconds)
+                .filter(Playlist.id > last_id)
+                .order_by(Playlist.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not playlists:
+                break
+            last_id = playlists[-1].id
+            ids = [p.id for p in playlists]
+
+            actual = {
+                row.playlist_id: (row.track_count, row.total_duration)
+                for row in (
+                    self.db.query(
+                        PlaylistSong.playlist_id,
+                        func.count(PlaylistSong.id).label("track_count"),
+                        func.coalesce(func.sum(Song.duration_seconds), 0).label("total_duration")
+                    )
+                    .outerjoin(Song, Song.id == PlaylistSong.song_id)
+                    .filter(PlaylistSong.playlist_id.in_(ids))
+                    .group_by(PlaylistSong.playlist_id)
+                    # Tracks of deleted songs count until the purge job removes them
+                    .execution_options(include_deleted=True)
+                    .all()
+                )
+            }
+
+            corrected = []
+            for p in playlists:
+                track_count, total_duration = actual.get(p.id, (0, 0))
+                if (p.track_count, p.total_duration_seconds) != (track_count, total_duration):
+                    self.db.query(Playlist).filter(Playlist.id == p.id).update(
+                        {
+                            Playlist.track_count: track_count,
+                            Playlist.total_duration_seconds: total_duration,
+                        },
+                        synchronize_session=False
+                    )
+                    corrected.append(p.id)
+
+            self._log_playlists(corrected)
+            repaired += len(corrected)
+            self.db.commit()
+
+        return repaired
+
+
+def main():
+    """Run the playlist counter reconciliation job from the command line"""
+    from app.database.connection import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Repair denormalized playlist counters")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        repaired = PlaylistStatsService(db).reconcile(batch_size=args.batch_size)
+    finally:
+        db.close()
+    print(f"Reconciled playlist counters: {repaired} playlist(s) repaired")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+import asyncio
+import functools
+import logging
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.config import settings
+from app.database.instrumentation import RequestDBStats, request_db_stats
+
+logger = logging.getLogger("app.slow_query")
+
+EXPLAIN_PREFIXES = {
+    "sqlite": "EXPLAIN QUERY PLAN ",
+    "postgresql": "EXPLAIN ",
+    "mysql": "EXPLAIN ",
+}
+MAX_QUERIES_PER_PROFILE = 200
+
+
+class QueryRecord:
+    __slots__ = ("statement", "parameters", "duration", "rowcount")
+
+    def __init__(self, statement: str, parameters, duration: float, rowcount: Optional[int]):
+        self.statement = statement
+        self.parameters = parameters
+        self.duration = duration
+        self.rowcount = rowcount
+
+    def to_dict(self) -> dict:
+        return {
+            "statement": self.statement,
+            "parameters": self.parameters,
+            "duration_ms": round(self.duration * 1000, 3),
+            "rowcount": self.rowcount,
+        }
+
+
+class RequestProfile:
+    """Where one request spent its time: database, auth and response serialization"""
+
+    def __init__(self, method: str, path: str, db_stats: Optional[RequestDBStats]):
+        self.method = method
+        self.path = path
+        self.start = time.perf_counter()
+        self.total = 0.0
+        self.auth_time = 0.0
+        self.serialize_time = 0.0
+        # Set by ProfiledRoute when the endpoint function returns
+        self.endpoint_done: Optional[float] = None
+        # Query count and DB time come from the always-on per-request accounting
+        self.db_stats = db_stats or RequestDBStats()
+        self.queries: List[QueryRecord] = []
+
+    def server_timing(self) -> str:
+        return ", ".join([
+            f'db;dur={self.db_stats.db_time * 1000:.2f};desc="{self.db_stats.query_count} queries"',
+            f"auth;dur={self.auth_time * 1000:.2f}",
+            f"serialize;dur={self.serialize_time * 1000:.2f}",
+            f"total;dur={self.total * 1000:.2f}",
+        ])
+
+    def to_dict(self) -> dict:
+        return {
+            "method": self.method,
+            "path": self.path,
+            "total_ms": round(self.total * 1000, 3),
+            "db_ms": round(self.db_stats.db_time * 1000, 3),
+            "auth_ms": round(self.auth_time * 1000, 3),
+            "serialize_ms": round(self.serialize_time * 1000, 3),
+            "query_count": self.db_stats.query_count,
+            "queries": [q.to_dict() for q in self.queries],
+        }
+
+
+request_profile: ContextVar[Optional[RequestProfile]] = ContextVar("request_profile", default=None)
+recent_profiles = deque(maxlen=50)
+
+
+def parameter_shape(parameters, executemany: bool):
+    """Describe bound parameters by type only, so values never reach the logs"""
+    if executemany and parameters:
+        return {"rows": len(parameters), "shape": parameter_shape(parameters[0], False)}
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+def explain(dbapi_cursor, dialect_name: str, statement: str, parameters) -> Optional[List[str]]:
+    """Run EXPLAIN for a statement on the same DBAPI connection, bypassing engine events"""
+    prefix = EXPLAIN_PREFIXES.get(dialect_name)
+    if prefix is None or not statement.lstrip().upper().startswith("SELECT"):
+        return None
+    cursor = dbapi_cursor.connection.cursor()
+    try:
+        cursor.execute(prefix + statement, parameters)
+        return [" ".join(str(col) for col in row) for row in cursor.fetchall()]
+    except Exception as exc:
+        return [f"EXPLAIN failed: {exc}"]
+    finally:
+        cursor.close()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_profile_timer(conn, cursor, statement, parameters, context, executemany):
+    if settings.SQL_PROFILING_ENABLED:
+        conn.info["profile_start"] = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _record_query(conn, cursor, statement, parameters, context, executemany):
+    start = conn.info.pop("profile_start", None)
+    if start is None:
+        return
+    duration = time.perf_counter() - start
+    rowcount = cursor.rowcount if cursor.rowcount >= 0 else None
+
+    profile = request_profile.get()
+    if profile is not None:
+        if len(profile.queries) < MAX_QUERIES_PER_PROFILE:
+            profile.queries.append(
+                QueryRecord(statement, parameter_shape(parameters, executemany), duration, rowcount)
+            )
+
+    if duration * 1000 >= settings.SLOW_QUERY_THRESHOLD_MS:
+        plan = None
+        if settings.SLOW_QUERY_EXPLAIN and not executemany:
+            plan = explain(cursor, conn.dialect.name, statement, parameters)
+        logger.warning(
+            "Slow query (%.1f ms, rows=%s) on %s: %s params=%s plan=%s",
+            duration * 1000,
+            rowcount,
+            profile.path if profile is not None else "<background>",
+            statement,
+            parameter_shape(parameters, executemany),
+            plan,
+        )
+
+
+@contextmanager
+def auth_timer():
+    """Attribute the enclosed block to the current request's auth time"""
+    profile = request_profile.get()
+    if profile is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.auth_time += time.perf_counter() - start
+
+
+def _note_return(call):
+    """Wrap an endpoint function to stamp the current profile when it returns"""
+
+    def done():
+        profile = request_profile.get()
+        if profile is not None:
+            profile.endpoint_done = time.perf_counter()
+
+    if asyncio.iscoroutinefunction(call):
+        @functools.wraps(call)
+        async def endpoint(*args, **kwargs):
+            result = await call(*args, **kwargs)
+            done()
+            return result
+    else:
+        @functools.wraps(call)
+        def endpoint(*args, **kwargs):
+            result = call(*args, **kwargs)
+            done()
+            return result
+    return endpoint
+
+
+class ProfiledRoute(APIRoute):
+    """APIRoute that lets ProfilingMiddleware time response serialization.
+
+    The time from the endpoint returning to the response starting is spent
+    validating and serializing the return value (plus closing dependencies).
+    """
+
+    def get_route_handler(self):
+        self.dependant.call = _note_return(self.dependant.call)
+        return super().get_route_handler()
+
+
+class ProfilingMiddleware:
+    """ASGI middleware building a RequestProfile when profiling or Server-Timing is on"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not (settings.SQL_PROFILING_ENABLED or settings.SERVER_TIMING_ENABLED):
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope["method"], scope["path"], request_db_stats.get())
+        token = request_profile.set(profile)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                now = time.perf_counter()
+                profile.total = now - profile.start
+                if profile.endpoint_done is not None:
+                    profile.serialize_time = now - profile.endpoint_done
+                if settings.SERVER_TIMING_ENABLED:
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"server-timing", profile.server_timing().encode())
+                    ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_profile.reset(token)
+            if settings.SQL_PROFILING_ENABLED:
+                recent_profiles.append(profile)
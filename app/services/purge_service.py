@@ -0,0 +1,161 @@
+"""Purge of soft-deleted artists and songs.
+
+Deleting an artist or song only stamps ``deleted_at`` (see app.database.soft_delete);
+this job removes the rows afterwards. For each batch of deleted songs it deletes
+their playlist tracks (adjusting the playlist counters), chart entries, analytics
+rows (legacy table and monthly partitions), listener sketches and rollups, then the
+songs themselves; a deleted artist goes once none of its songs are left. Removed
+playlist tracks are recorded in the sync change log.
+
+Every step is a set-based ``DELETE ... WHERE id IN (...)`` of at most ``batch_size``
+rows in its own short transaction, followed by a ``pause_seconds`` sleep, so API
+writes never queue behind a long purge. A run stops after ``max_seconds`` and the
+next run carries on where it left off.
+
+    python -m app.services.purge_service --batch-size 500 --pause 0.1
+"""
+import argparse
+import time
+from typing import Callable, Dict, List, Optional
+from sqlalchemy import and_, exists, select
+from sqlalchemy.orm import Session
+from app.database.partitions import analytics_partitions, partition_table
+from app.models import Analytics, AnalyticsRollup, Artist, ChartEntry, ListenerSketch, Playlist, PlaylistSong, Song
+from app.services.change_log import DELETE, log_changes
+from app.services.playlist_service import PlaylistStatsService
+
+
+class PurgeService:
+    def __init__(self, db: Session, batch_size: int = 500, pause_seconds: float = 0.1,
+                 max_seconds: Optional[float] = None):
+        self.db = db
+        self.batch_size = batch_size
+        self.pause_seconds = pause_seconds
+        self.max_seconds = max_seconds
+        self._deadline: Optional[float] = None
+        self.counts: Dict[str, int] = {}
+
+    def run(self) -> Dict[str, int]:
+        """Purge deleted songs, then deleted artists; returns rows deleted per table"""
+        self.counts = {}
+        self._deadline = time.monotonic() + self.max_seconds if self.max_seconds else None
+
+        while not self._out_of_time():
+            songs = self.db.execute(
+                select(Song.id, Song.duration_seconds)
+                .where(Song.deleted_at.isnot(None))
+                .order_by(Song.id)
+                .limit(self.batch_size)
+                .execution_options(include_deleted=True)
+            ).all()
+            if not songs or not self._purge_songs({song_id: duration for song_id, duration in songs}):
+                break
+
+        while not self._out_of_time():
+            artist_ids = self.db.execute(
+                select(Artist.id)
+                .where(Artist.deleted_at.isnot(None), ~exists().where(Song.artist_id == Artist.id))
+                .order_by(Artist.id)
+                .limit(self.batch_size)
+                .execution_options(include_deleted=True)
+            ).scalars().all()
+            if not artist_ids or not self._purge_artists(artist_ids):
+                break
+        return self.counts
+
+    def _purge_songs(self, durations: Dict[int, Optional[int]]) -> bool:
+        """Remove a batch of deleted songs and their dependent rows; False if out of time"""
+        song_ids = list(durations)
+
+        def remove_tracks(rows):
+            removed: Dict[int, tuple] = {}
+            for row in rows:
+                tracks, seconds = removed.get(row.playlist_id, (0, 0))
+                removed[row.playlist_id] = (tracks + 1, seconds + (durations[row.song_id] or 0))
+            PlaylistStatsService(self.db).tracks_removed(removed)
+            log_changes(
+                self.db, "playlist_songs", DELETE,
+                select(PlaylistSong.id, Playlist.user_id)
+                .join(Playlist, Playlist.id == PlaylistSong.playlist_id)
+                .where(PlaylistSong.id.in_([row.id for row in rows]))
+            )
+
+        steps = [
+            (PlaylistSong.__table__, PlaylistSong.song_id.in_(song_ids), remove_tracks),
+            (ChartEntry.__table__, ChartEntry.song_id.in_(song_ids), None),
+            (Analytics.__table__, Analytics.song_id.in_(song_ids), self._rewrites(Analytics.__table__)),
+        ]
+        for name in analytics_partitions.names(self.db):
+            table = partition_table(name)
+            steps.append((table, table.c.song_id.in_(song_ids), self._rewrites(table)))
+        steps += [
+            (ListenerSketch.__table__, ListenerSketch.song_id.in_(song_ids), None),
+            (AnalyticsRollup.__table__, _rollups_of("song", song_ids), None),
+            (Song.__table__, Song.id.in_(song_ids), None),
+        ]
+        return all(self._drain(table, where, on_rows) for table, where, on_rows in steps)
+
+    def _purge_artists(self, artist_ids: List[int]) -> bool:
+        return (
+            self._drain(AnalyticsRollup.__table__, _rollups_of("artist", artist_ids))
+            and self._drain(Artist.__table__, Artist.id.in_(artist_ids))
+        )
+
+    def _rewrites(self, table) -> Callable:
+        """on_rows hook marking an analytics table as rewritten for incremental exports"""
+        return lambda rows: analytics_partitions.mark_rewritten(self.db, table)
+
+    def _drain(self, table, where, on_rows: Optional[Callable] = None) -> bool:
+        """Delete the rows of ``table`` matching ``where``, batch by batch; False if out of time"""
+        columns = [table.c.id]
+        if on_rows is not None:
+            columns = list(table.c)
+        while True:
+            if self._out_of_time():
+                return False
+            rows = self.db.execute(select(*columns).where(where).limit(self.batch_size)).all()
+            if not rows:
+                return True
+            if on_rows is not None:
+                on_rows(rows)
+            self.db.execute(table.delete().where(table.c.id.in_([row.id for row in rows])))
+            self.db.commit()
+            self.counts[table.name] = self.counts.get(table.name, 0) + len(rows)
+            if len(rows) < self.batch_size:
+                return True
+            # Give foreground writers a turn at the database
+            time.sleep(self.pause_seconds)
+
+    def _out_of_time(self) -> bool:
+        return self._deadline is not None and time.monotonic() >= self._deadline
+
+
+def _rollups_of(entity_type: str, ids: List[int]):
+    return and_(
+        AnalyticsRollup.entity_type == entity_type,
+        AnalyticsRollup.entity_key.in_([str(entity_id) for entity_id in ids])
+    )
+
+
+def main():
+    """Run the soft-delete purge from the command line"""
+    from app.database.connection import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Remove soft-deleted artists and songs with their dependent rows")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--pause", type=float, default=0.1, help="Seconds to sleep between batches")
+    parser.add_argument("--max-seconds", type=float, help="Stop after this long (default: run to completion)")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        counts = PurgeService(db, batch_size=args.batch_size, pause_seconds=args.pause,
+                              max_seconds=args.max_seconds).run()
+    finally:
+        db.close()
+    summary = ", ".join(f"{count} {table}" for table, count in counts.items()) or "nothing"
+    print(f"Purged {summary}")
+
+
+if __name__ == "__main__":
+    main()
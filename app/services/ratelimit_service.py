@@ -0,0 +1,282 @@
+"""Token-bucket rate limiting.
+
+Each client gets one bucket per policy, keyed by the user id in its bearer token
+or, for anonymous requests and invalid tokens, by its IP address. A bucket holds
+up to ``limit`` tokens and refills continuously at ``limit / period``; a request
+takes one token or is rejected with 429 and ``Retry-After``. Every limited
+response carries the ``RateLimit-Limit``, ``RateLimit-Remaining``,
+``RateLimit-Reset`` and ``RateLimit-Policy`` headers (IETF draft).
+
+Policies are configured in settings as ``"<limit>/<second|minute|hour>"`` per route:
+``RATE_LIMIT_POLICIES`` maps ``"METHOD /path"`` (or ``"/path"`` for any method;
+a trailing ``*`` matches a prefix; an empty limit exempts the route) and
+``RATE_LIMIT_DEFAULT`` covers the rest.
+
+Buckets live in process memory by default: a bounded LRU with O(1) work and
+memory per active key. With several workers each process limits on its own,
+so ``RATE_LIMIT_STORAGE_URL`` can point every worker on a host at a shared SQLite
+file instead; any store with the same ``take`` method (e.g. Redis) can replace it.
+"""
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from anyio import to_thread
+from starlette.responses import JSONResponse
+from app.config import settings
+from app.services.metrics_service import metrics
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+rate_limited_total = metrics.counter(
+    "rate_limit_rejections_total", "Requests rejected by the rate limiter", ("policy",)
+)
+
+
+class RateLimitPolicy:
+    __slots__ = ("name", "limit", "period", "rate")
+
+    def __init__(self, name: str, limit: int, period: float):
+        if limit < 1 or period <= 0:
+            raise ValueError(f"invalid rate limit policy {name!r}")
+        self.name = name
+        self.limit = limit
+        self.period = period
+        self.rate = limit / period
+
+    @classmethod
+    def parse(cls, name: str, spec: str) -> "RateLimitPolicy":
+        """Build a policy from ``"<limit>/<period>"``, e.g. ``"10/minute"``"""
+        count, _, unit = spec.strip().partition("/")
+        if unit not in PERIODS:
+            raise ValueError(f"invalid rate limit {spec!r}; expected e.g. '10/minute'")
+        return cls(name, int(count), PERIODS[unit])
+
+    def header(self) -> str:
+        return f"{self.limit};w={self.period:g}"
+
+
+class BucketState:
+    __slots__ = ("allowed", "remaining", "reset", "retry_after")
+
+    def __init__(self, allowed: bool, remaining: int, reset: int, retry_after: int):
+        self.allowed = allowed
+        self.remaining = remaining
+        self.reset = reset
+        self.retry_after = retry_after
+
+
+def _refill(tokens: float, updated: float, now: float, policy: RateLimitPolicy) -> Tuple[bool, float, BucketState]:
+    """Apply one request to a bucket; returns (allowed, new tokens, state for headers)"""
+    tokens = min(policy.limit, tokens + (now - updated) * policy.rate)
+    allowed = tokens >= 1
+    if allowed:
+        tokens -= 1
+    retry_after = 0 if allowed else math.ceil((1 - tokens) / policy.rate)
+    reset = math.ceil((policy.limit - tokens) / policy.rate)
+    return allowed, tokens, BucketState(allowed, int(tokens), reset, retry_after)
+
+
+class MemoryBucketStore:
+    """Per-process buckets in an LRU; the least recently used key is evicted when full"""
+
+    shared = False
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, policy: RateLimitPolicy) -> BucketState:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (policy.limit, now))
+            allowed, tokens, state = _refill(tokens, updated, now, policy)
+            # Re-inserted at the end: most recently used
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                # An evicted bucket comes back full, which only ever favours the client
+                self._buckets.popitem(last=False)
+        return state
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class SQLiteBucketStore:
+    """Buckets in a SQLite file shared by every worker process on the host"""
+
+    shared = True
+
+    def __init__(self, path: str, timeout: float = 1.0, prune_every: int = 1000):
+        self.path = path
+        self.timeout = timeout
+        self.prune_every = prune_every
+        self._local = threading.local()
+        self._calls = 0
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limit_buckets "
+                "(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL, idle_after REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_rate_limit_idle ON rate_limit_buckets (idle_after)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn = conn
+        return conn
+
+    def take(self, key: str, policy: RateLimitPolicy) -> BucketState:
+        # Wall clock: monotonic clocks are not comparable across processes
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated FROM rate_limit_buckets WHERE key = ?", (key,)).fetchone()
+            tokens, updated = row if row is not None else (policy.limit, now)
+            allowed, tokens, state = _refill(tokens, min(updated, now), now, policy)
+            conn.execute(
+                "INSERT OR REPLACE INTO rate_limit_buckets (key, tokens, updated, idle_after) VALUES (?, ?, ?, ?)",
+                (key, tokens, now, now + (policy.limit - tokens) / policy.rate),
+            )
+            self._calls += 1
+            if self._calls % self.prune_every == 0:
+                # Buckets that have refilled completely carry no state
+                conn.execute("DELETE FROM rate_limit_buckets WHERE idle_after < ?", (now,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return state
+
+
+def create_store():
+    url = settings.RATE_LIMIT_STORAGE_URL
+    if not url:
+        return MemoryBucketStore(settings.RATE_LIMIT_MAX_KEYS)
+    if url.startswith("sqlite:///"):
+        return SQLiteBucketStore(url[len("sqlite:///"):])
+    raise ValueError(f"unsupported RATE_LIMIT_STORAGE_URL {url!r}; only sqlite:/// is built in")
+
+
+class _TokenUsers:
+    """Verified bearer token -> user id, so each token is decoded once"""
+
+    def __init__(self, max_tokens: int = 10000):
+        self.max_tokens = max_tokens
+        self._users: "OrderedDict[str, Tuple[Optional[str], float]]" = OrderedDict()
+
+    def user_id(self, token: str) -> Optional[str]:
+        cached = self._users.get(token)
+        if cached is not None and cached[1] > time.time():
+            self._users.move_to_end(token)
+            return cached[0]
+
+        from fastapi import HTTPException
+        from app.services import decode_token
+
+        try:
+            payload = decode_token(token)
+        except HTTPException:
+            payload = {}
+        user_id = payload.get("sub")
+        # Invalid tokens are remembered briefly too, so garbage tokens cost one decode
+        expires = payload.get("exp", time.time() + 60)
+        self._users[token] = (str(user_id) if user_id is not None else None, expires)
+        if len(self._users) > self.max_tokens:
+            self._users.popitem(last=False)
+        return self._users[token][0]
+
+
+class RateLimiter:
+    def __init__(self, store=None, default: Optional[str] = None, policies: Optional[Dict[str, str]] = None):
+        self.store = store if store is not None else create_store()
+        default = settings.RATE_LIMIT_DEFAULT if default is None else default
+        policies = settings.RATE_LIMIT_POLICIES if policies is None else policies
+        self.default = RateLimitPolicy.parse("default", default) if default else None
+        # A policy of None (an empty limit in settings) leaves the route unlimited
+        self.exact: Dict[Tuple[Optional[str], str], Optional[RateLimitPolicy]] = {}
+        self.prefixes: List[Tuple[Optional[str], str, Optional[RateLimitPolicy]]] = []
+        for route, spec in policies.items():
+            method, _, path = route.strip().rpartition(" ")
+            policy = RateLimitPolicy.parse(route, spec) if spec.strip() else None
+            method = method.upper() or None
+            if path.endswith("*"):
+                self.prefixes.append((method, path[:-1], policy))
+            else:
+                self.exact[(method, path.rstrip("/") or "/")] = policy
+        # Longest prefix first
+        self.prefixes.sort(key=lambda item: -len(item[1]))
+        self.tokens = _TokenUsers()
+
+    def policy_for(self, method: str, path: str) -> Optional[RateLimitPolicy]:
+        path = path.rstrip("/") or "/"
+        for key in ((method, path), (None, path)):
+            if key in self.exact:
+                return self.exact[key]
+        for prefix_method, prefix, policy in self.prefixes:
+            if prefix_method in (None, method) and path.startswith(prefix):
+                return policy
+        return self.default
+
+    def client(self, scope) -> str:
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                scheme, _, token = value.decode("latin-1").partition(" ")
+                if scheme.lower() == "bearer" and token:
+                    user_id = self.tokens.user_id(token.strip())
+                    if user_id is not None:
+                        return f"user:{user_id}"
+                break
+        client = scope.get("client")
+        return f"ip:{client[0] if client else 'unknown'}"
+
+
+class RateLimitMiddleware:
+    """ASGI middleware applying the configured rate limit policies"""
+
+    def __init__(self, app, limiter: Optional[RateLimiter] = None):
+        self.app = app
+        self.limiter = limiter if limiter is not None else RateLimiter()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.RATE_LIMIT_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        policy = self.limiter.policy_for(scope["method"], scope["path"])
+        if policy is None:
+            await self.app(scope, receive, send)
+            return
+
+        key = f"{policy.name}|{self.limiter.client(scope)}"
+        store = self.limiter.store
+        if store.shared:
+            state = await to_thread.run_sync(store.take, key, policy)
+        else:
+            state = store.take(key, policy)
+        headers = [
+            (b"ratelimit-limit", str(policy.limit).encode()),
+            (b"ratelimit-remaining", str(state.remaining).encode()),
+            (b"ratelimit-reset", str(state.reset).encode()),
+            (b"ratelimit-policy", policy.header().encode()),
+        ]
+
+        if not state.allowed:
+            rate_limited_total.inc((policy.name,))
+            response = JSONResponse({"detail": "Rate limit exceeded"}, status_code=429)
+            response.raw_headers.extend(headers + [(b"retry-after", str(state.retry_after).encode())])
+            await response(scope, receive, send)
+            return
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
@@ -0,0 +1,315 @@
+"""In-process scheduler for periodic maintenance jobs.
+
+Jobs run on a small dedicated thread pool (SCHEDULER_MAX_WORKERS), never on the
+event loop or the threadpool that serves requests, so a slow job cannot starve
+request handling. Every process running the app has its own scheduler; before a
+job runs, its scheduler takes the job's row in ``job_leases``, so only one process
+runs a job at a time. After a run the lease is kept until just before the job's
+next fire time, so the other processes skip that slot instead of repeating it.
+
+Triggers are ``IntervalTrigger(seconds)`` and ``CronTrigger("m h dom mon dow")``
+(standard five-field cron in UTC: ``*``, ``*/n``, ``a-b``, ``a-b/n`` and lists).
+"""
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional
+from sqlalchemy import or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models import JobLease
+from app.services.metrics_service import metrics
+
+logger = logging.getLogger("app.jobs")
+
+job_runs_total = metrics.counter(
+    "scheduler_job_runs_total", "Scheduled job runs by outcome (ok, error, skipped)", ("job", "status")
+)
+job_duration_seconds = metrics.histogram(
+    "scheduler_job_duration_seconds", "Scheduled job run time", ("job",),
+    buckets=(0.01, 0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0, 900.0, 3600.0)
+)
+jobs_running = metrics.gauge("scheduler_jobs_running", "Scheduled jobs currently running in this process", ("job",))
+
+
+def utcnow() -> datetime:
+    """Naive UTC, the form lease times are stored in"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class IntervalTrigger:
+    def __init__(self, seconds: float):
+        if seconds <= 0:
+            raise ValueError("interval must be positive")
+        self.seconds = seconds
+
+    def next_after(self, moment: datetime) -> datetime:
+        return moment + timedelta(seconds=self.seconds)
+
+    def __str__(self) -> str:
+        return f"every {self.seconds:g}s"
+
+
+class CronTrigger:
+    # (low, high) for minute, hour, day of month, month, day of week (0 = Sunday)
+    FIELDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+    def __init__(self, expression: str):
+        parts = expression.split()
+        if len(parts) != 5:
+            raise ValueError(f"cron expression needs 5 fields: {expression!r}")
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            self._parse(part, low, high) for part, (low, high) in zip(parts, self.FIELDS)
+        )
+        # 7 is another name for Sunday
+        self.weekdays = {day % 7 for day in weekdays}
+        self.any_day = parts[2] == "*"
+        self.any_weekday = parts[4] == "*"
+
+    @staticmethod
+    def _parse(field: str, low: int, high: int) -> set:
+        values = set()
+        for item in field.split(","):
+            span, _, step = item.partition("/")
+            step = int(step) if step else 1
+            if span == "*":
+                first, last = low, high
+            elif "-" in span:
+                first, last = (int(value) for value in span.split("-", 1))
+            else:
+                first = int(span)
+                last = high if step > 1 else first
+            if not low <= first <= last <= high or step < 1:
+                raise ValueError(f"invalid cron field {field!r}")
+            values.update(range(first, last + 1, step))
+        return values
+
+    def _day_matches(self, moment: datetime) -> bool:
+        day_ok = moment.day in self.days
+        weekday_ok = (moment.weekday() + 1) % 7 in self.weekdays
+        # Standard cron: when both are restricted, either one matching is enough
+        if not self.any_day and not self.any_weekday:
+            return day_ok or weekday_ok
+        return day_ok and weekday_ok
+
+    def next_after(self, moment: datetime) -> datetime:
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        # Skip whole months, days and hours at a time; five years covers every valid expression
+        limit = candidate + timedelta(days=5 * 366)
+        while candidate < limit:
+            if candidate.month not in self.months:
+                candidate = (candidate.replace(day=1) + timedelta(days=32)).replace(day=1, hour=0, minute=0)
+            elif not self._day_matches(candidate):
+                candidate = candidate.replace(hour=0, minute=0) + timedelta(days=1)
+            elif candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+        raise ValueError(f"cron expression never fires: {self.expression!r}")
+
+    def __str__(self) -> str:
+        return f"cron {self.expression}"
+
+
+def acquire_lease(db: Session, name: str, owner: str, until: datetime) -> bool:
+    """Take the lease on ``name`` until ``until`` if it is free (or already ours)"""
+    now = utcnow()
+    taken = db.execute(
+        update(JobLease)
+        .where(JobLease.name == name, or_(JobLease.expires_at <= now, JobLease.owner == owner))
+        .values(owner=owner, expires_at=until, acquired_at=now)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if taken:
+        db.commit()
+        return True
+    try:
+        db.add(JobLease(name=name, owner=owner, expires_at=until, acquired_at=now))
+        db.commit()
+        return True
+    except IntegrityError:
+        # Another process holds it
+        db.rollback()
+        return False
+
+
+def release_lease(db: Session, name: str, owner: str, until: datetime):
+    """Shorten our lease on ``name`` to end at ``until``"""
+    db.execute(
+        update(JobLease)
+        .where(JobLease.name == name, JobLease.owner == owner)
+        .values(expires_at=until)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+
+class Job:
+    def __init__(self, name: str, func: Callable[[], object], trigger, lease_seconds: float):
+        self.name = name
+        self.func = func
+        self.trigger = trigger
+        self.lease_seconds = lease_seconds
+        self.next_run_at: Optional[datetime] = None
+        self.running = False
+        self.last_started_at: Optional[datetime] = None
+        self.last_finished_at: Optional[datetime] = None
+        self.last_duration: Optional[float] = None
+        self.last_status: Optional[str] = None
+        self.last_result: Optional[str] = None
+        self.last_error: Optional[str] = None
+        self.runs = 0
+        self.failures = 0
+        self.skipped = 0
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "trigger": str(self.trigger),
+            "next_run_at": self.next_run_at,
+            "running": self.running,
+            "last_started_at": self.last_started_at,
+            "last_finished_at": self.last_finished_at,
+            "last_duration_ms": round(self.last_duration * 1000, 3) if self.last_duration is not None else None,
+            "last_status": self.last_status,
+            "last_result": self.last_result,
+            "last_error": self.last_error,
+            "runs": self.runs,
+            "failures": self.failures,
+            "skipped": self.skipped,
+        }
+
+
+class Scheduler:
+    def __init__(self, max_workers: int = 2, tick_seconds: float = 1.0, lease_seconds: float = 600,
+                 session_factory: Optional[Callable[[], Session]] = None):
+        self.max_workers = max_workers
+        self.tick_seconds = tick_seconds
+        self.lease_seconds = lease_seconds
+        self.session_factory = session_factory
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.jobs: Dict[str, Job] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def add_job(self, name: str, func: Callable[[], object], trigger, lease_seconds: Optional[float] = None) -> Job:
+        """Register (or replace) a job. Leases should outlast the job's longest run."""
+        job = Job(name, func, trigger, lease_seconds or self.lease_seconds)
+        if self._task is not None:
+            job.next_run_at = trigger.next_after(utcnow())
+        self.jobs[name] = job
+        return job
+
+    def start(self):
+        """Start firing jobs; call from the running event loop"""
+        if self._task is not None:
+            return
+        # Forked workers must not inherit the parent's owner id
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="job")
+        now = utcnow()
+        for job in self.jobs.values():
+            job.next_run_at = job.trigger.next_after(now)
+        self._task = asyncio.get_running_loop().create_task(self._loop())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        # Running jobs finish in the background; queued ones are dropped
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def run_now(self, name: str) -> Job:
+        """Make a job due on the next tick; raises KeyError for unknown jobs"""
+        job = self.jobs[name]
+        job.next_run_at = utcnow()
+        return job
+
+    def status(self) -> List[dict]:
+        return [job.to_dict() for job in self.jobs.values()]
+
+    async def _loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            now = utcnow()
+            for job in list(self.jobs.values()):
+                if job.running or job.next_run_at is None or job.next_run_at > now:
+                    continue
+                job.running = True
+                job.next_run_at = job.trigger.next_after(now)
+                loop.run_in_executor(self._executor, self._run, job)
+            await asyncio.sleep(self.tick_seconds)
+
+    def _session(self) -> Session:
+        if self.session_factory is not None:
+            return self.session_factory()
+        from app.database.connection import SessionLocal
+        return SessionLocal()
+
+    def _run(self, job: Job):
+        try:
+            db = self._session()
+            try:
+                acquired = acquire_lease(db, job.name, self.owner, utcnow() + timedelta(seconds=job.lease_seconds))
+            finally:
+                db.close()
+            if not acquired:
+                job.skipped += 1
+                job_runs_total.inc((job.name, "skipped"))
+                return
+
+            job.last_started_at = utcnow()
+            jobs_running.inc((job.name,))
+            start = time.perf_counter()
+            try:
+                result = job.func()
+                job.last_status = "ok"
+                job.last_result = None if result is None else str(result)
+                job.last_error = None
+            except Exception as exc:
+                logger.exception("scheduled job %s failed", job.name)
+                job.last_status = "error"
+                job.last_error = f"{type(exc).__name__}: {exc}"
+                job.failures += 1
+            finally:
+                job.last_duration = time.perf_counter() - start
+                job.last_finished_at = utcnow()
+                job.runs += 1
+                jobs_running.dec((job.name,))
+                job_runs_total.inc((job.name, job.last_status))
+                job_duration_seconds.observe(job.last_duration, (job.name,))
+
+            # Hold the lease until just before the next fire time so that other
+            # processes do not run this slot again
+            db = self._session()
+            try:
+                until = max(utcnow(), job.next_run_at - timedelta(seconds=self.tick_seconds * 2))
+                release_lease(db, job.name, self.owner, until)
+            finally:
+                db.close()
+        except Exception:
+            logger.exception("scheduler could not run job %s", job.name)
+        finally:
+            job.running = False
+
+
+scheduler = Scheduler(max_workers=settings.SCHEDULER_MAX_WORKERS, lease_seconds=settings.SCHEDULER_LEASE_SECONDS)
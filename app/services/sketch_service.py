@@ -0,0 +1,238 @@
+"""Unique-listener counts from mergeable HyperLogLog sketches.
+
+Summing the per-day ``unique_listeners`` column counts a listener once for every
+day, song and region they streamed in. Listens recorded here also update a
+HyperLogLog sketch (app.services.hll) per song, region and day, and per song,
+region and month, plus the same keys for all songs together. A count over any
+date range, set of songs or set of regions is the size of the union of the
+matching sketches, within about 1%.
+
+Ranges read month sketches for whole calendar months and day sketches only for
+the partial months at either end, so a year-long count merges about a dozen
+sketches per region.
+
+    python -m app.services.sketch_service [compact|retention|all]
+"""
+import argparse
+from bisect import bisect_right
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database.partitions import add_months, month_start
+from app.models import ListenerSketch
+from app.services.hll import HyperLogLog, hash64
+
+UNKNOWN_REGION = "Unknown"
+
+# (listener id, song id, region, listened at)
+ListenEvent = Tuple[object, Optional[int], Optional[str], datetime]
+
+
+def _day_bound(moment: Optional[datetime], upper: bool = False) -> Optional[date]:
+    """Day containing ``moment``; an exclusive upper bound rounds partial days up"""
+    if moment is None:
+        return None
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    if upper and moment.time() != time.min:
+        return moment.date() + timedelta(days=1)
+    return moment.date()
+
+
+def _same_song(song_id: Optional[int]):
+    return ListenerSketch.song_id.is_(None) if song_id is None else ListenerSketch.song_id == song_id
+
+
+class ListenerSketchService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def record(self, events: Iterable[ListenEvent]) -> int:
+        """Fold listen events into new sketch rows.
+
+        Rows are appended rather than merged into existing ones, so concurrent
+        writers never contend; compact() merges them later. Runs in the caller's
+        transaction and returns the number of rows written.
+        """
+        sketches: Dict[tuple, HyperLogLog] = {}
+        for listener_id, song_id, region, listened_at in events:
+            day = _day_bound(listened_at)
+            month = month_start(day)
+            region = region or UNKNOWN_REGION
+            h = hash64(listener_id)
+            for key in (
+                (song_id, region, "day", day), (None, region, "day", day),
+                (song_id, region, "month", month), (None, region, "month", month),
+            ):
+                sketch = sketches.get(key)
+                if sketch is None:
+                    sketch = sketches[key] = HyperLogLog()
+                sketch.add_hash(h)
+
+        rows = [
+            {"song_id": song_id, "region": region, "period": period, "day": day, "sketch": sketch.to_bytes()}
+            for (song_id, region, period, day), sketch in sketches.items()
+        ]
+        if rows:
+            self.db.execute(ListenerSketch.__table__.insert(), rows)
+        return len(rows)
+
+    # Queries
+
+    def _query(self, song_ids: Optional[Sequence[int]], regions: Optional[Sequence[str]]):
+        query = select(ListenerSketch.region, ListenerSketch.period, ListenerSketch.day, ListenerSketch.sketch)
+        if song_ids is None:
+            query = query.where(ListenerSketch.song_id.is_(None))
+        else:
+            query = query.where(ListenerSketch.song_id.in_(list(song_ids)))
+        if regions is not None:
+            query = query.where(ListenerSketch.region.in_(list(regions)))
+        return query
+
+    @staticmethod
+    def _period_filter(period: str, first: Optional[date], end: Optional[date]):
+        clauses = [ListenerSketch.period == period]
+        if first is not None:
+            clauses.append(ListenerSketch.day >= first)
+        if end is not None:
+            clauses.append(ListenerSketch.day < end)
+        return and_(*clauses)
+
+    def _range_filter(self, start: Optional[date], end: Optional[date]):
+        """Month sketches for whole months in [start, end), day sketches for the rest"""
+        first_month = start if start is None or start.day == 1 else add_months(month_start(start), 1)
+        last_month = end if end is None else month_start(end)
+        if first_month is not None and last_month is not None and first_month >= last_month:
+            return self._period_filter("day", start, end)
+
+        clauses = [self._period_filter("month", first_month, last_month)]
+        if start is not None and start < first_month:
+            clauses.append(self._period_filter("day", start, first_month))
+        if end is not None and last_month < end:
+            clauses.append(self._period_filter("day", last_month, end))
+        return or_(*clauses)
+
+    def coverage(self, song_ids: Optional[Sequence[int]] = None) -> Dict[str, date]:
+        """First day with a sketch per region; listens before it only have summed daily counts"""
+        query = select(ListenerSketch.region, func.min(ListenerSketch.day)).where(ListenerSketch.period == "day")
+        if song_ids is None:
+            query = query.where(ListenerSketch.song_id.is_(None))
+        else:
+            query = query.where(ListenerSketch.song_id.in_(list(song_ids)))
+        return dict(self.db.execute(query.group_by(ListenerSketch.region)).all())
+
+    def unique_listeners(
+        self,
+        song_ids: Optional[Sequence[int]] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        regions: Optional[Sequence[str]] = None,
+    ) -> Optional[Tuple[int, Dict[str, int]]]:
+        """Distinct listeners in [start, end) as (total, {region: count}).
+
+        ``song_ids`` restricts the count to listeners of those songs; by default all
+        songs count. Returns None when no sketches match, so callers can fall back
+        to summed per-day counts for data recorded before sketches existed.
+        """
+        query = self._query(song_ids, regions).where(self._range_filter(_day_bound(start), _day_bound(end, upper=True)))
+        by_region: Dict[str, HyperLogLog] = {}
+        for region, _, _, blob in self.db.execute(query):
+            sketch = by_region.get(region)
+            if sketch is None:
+                sketch = by_region[region] = HyperLogLog()
+            sketch.merge_bytes(blob)
+        if not by_region:
+            return None
+
+        total = HyperLogLog()
+        for sketch in by_region.values():
+            total.merge(sketch)
+        return total.count(), {region: sketch.count() for region, sketch in by_region.items()}
+
+    def unique_listeners_by_bucket(
+        self,
+        boundaries: List[datetime],
+        song_ids: Optional[Sequence[int]] = None,
+        regions: Optional[Sequence[str]] = None,
+        monthly: bool = False,
+    ) -> Optional[Dict[datetime, int]]:
+        """Distinct listeners per bucket, where bucket i is [boundaries[i], boundaries[i + 1]).
+
+        Buckets must start on day boundaries, and on month boundaries when ``monthly``
+        is set (month sketches are then read instead of day sketches). Returns None
+        when no sketches match.
+        """
+        starts = [_day_bound(moment) for moment in boundaries]
+        query = self._query(song_ids, regions).where(
+            self._period_filter("month" if monthly else "day", starts[0], starts[-1])
+        )
+        sketches: Dict[int, HyperLogLog] = {}
+        for _, _, day, blob in self.db.execute(query):
+            index = bisect_right(starts, day) - 1
+            sketch = sketches.get(index)
+            if sketch is None:
+                sketch = sketches[index] = HyperLogLog()
+            sketch.merge_bytes(blob)
+        if not sketches:
+            return None
+        return {boundaries[index]: sketch.count() for index, sketch in sketches.items()}
+
+    # Maintenance
+
+    def compact(self, batch_size: int = 500) -> int:
+        """Merge rows sharing a key into one; returns the number of rows removed"""
+        key = (ListenerSketch.song_id, ListenerSketch.region, ListenerSketch.period, ListenerSketch.day)
+        duplicated = self.db.execute(
+            select(*key).group_by(*key).having(func.count() > 1)
+        ).all()
+
+        removed = 0
+        for i in range(0, len(duplicated), batch_size):
+            for song_id, region, period, day in duplicated[i:i + batch_size]:
+                rows = self.db.execute(
+                    select(ListenerSketch.id, ListenerSketch.sketch).where(
+                        _same_song(song_id), ListenerSketch.region == region,
+                        ListenerSketch.period == period, ListenerSketch.day == day,
+                    )
+                ).all()
+                merged = HyperLogLog.merged(blob for _, blob in rows)
+                self.db.execute(ListenerSketch.__table__.delete().where(ListenerSketch.id.in_([row.id for row in rows])))
+                self.db.add(ListenerSketch(song_id=song_id, region=region, period=period, day=day, sketch=merged.to_bytes()))
+                removed += len(rows) - 1
+            # Each key is replaced within one transaction, so readers never see it half-merged
+            self.db.commit()
+        return removed
+
+    def apply_retention(self, today: Optional[date] = None) -> int:
+        """Delete sketches past ANALYTICS_RETENTION_MONTHS; returns rows deleted"""
+        if settings.ANALYTICS_RETENTION_MONTHS <= 0:
+            return 0
+        cutoff = add_months(month_start(today or datetime.now(timezone.utc).date()), -settings.ANALYTICS_RETENTION_MONTHS)
+        deleted = self.db.execute(ListenerSketch.__table__.delete().where(ListenerSketch.day < cutoff)).rowcount
+        self.db.commit()
+        return deleted
+
+
+def main():
+    """Run listener sketch maintenance from the command line"""
+    from app.database.connection import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Maintain unique-listener HyperLogLog sketches")
+    parser.add_argument("command", nargs="?", default="all", choices=["compact", "retention", "all"])
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        service = ListenerSketchService(db)
+        if args.command in ("compact", "all"):
+            print(f"Merged away {service.compact()} duplicate sketch row(s)")
+        if args.command in ("retention", "all"):
+            print(f"Deleted {service.apply_retention()} expired sketch row(s)")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""Delta sync for offline clients.
+
+A client calls ``GET /sync`` with the token from its previous call and applies
+what comes back: the current rows of everything that changed since (artists,
+songs, its own playlists and their tracks) and the ids of rows deleted since.
+Changes are read from ``change_log`` (app.services.change_log) in log order and
+collapsed per row, so a page carries each row at most once, as it is now.
+
+Without a token, or with one older than the log's retention, the client gets a
+full sync: ``reset`` is set on its first page, and the pages walk the current
+rows by id. The full sync remembers the log position it started at and then
+carries on with the changes made while it ran. Tracks of deleted songs are left
+out, as in playlist details; clients drop them when the song is deleted.
+
+    python -m app.services.sync_service prune --days 30
+"""
+import argparse
+import base64
+import json
+from datetime import timedelta
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import exists, func, or_, select
+from sqlalchemy.orm import Session
+from app.models import Artist, ChangeLog, Playlist, PlaylistSong, Song
+from app.schemas.artist import ArtistResponse
+from app.schemas.playlist import PlaylistResponse
+from app.schemas.song import SongResponse
+from app.schemas.sync import SyncDeleted, SyncResponse, SyncTrack
+from app.services.change_log import DELETE, ENTITIES
+from app.services.checkpoint_service import get_checkpoint, set_checkpoint
+from app.services.entity_cache import load_many
+from app.services.scheduler_service import utcnow
+
+TOKEN_VERSION = 1
+# Highest change_log id removed by pruning; older tokens need a full sync
+PRUNED_CHECKPOINT = "change_log_pruned"
+
+
+class InvalidSyncToken(ValueError):
+    """The token is not one this server issued"""
+
+
+def encode_token(state: dict) -> str:
+    raw = json.dumps({"v": TOKEN_VERSION, **state}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_token(token: str) -> dict:
+    """Delta state {"m": "d", "c": cursor} or full-sync state {"m": "f", "h": head, "e": entity, "k": last id}"""
+    try:
+        state = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    except ValueError:
+        raise InvalidSyncToken(token)
+    fields = {"d": ("c",), "f": ("h", "e", "k")}.get(state.get("m")) if isinstance(state, dict) else None
+    if (
+        fields is None or state.get("v") != TOKEN_VERSION
+        or not all(isinstance(state.get(name), int) and state[name] >= 0 for name in fields)
+        or (state["m"] == "f" and state["e"] >= len(ENTITIES))
+    ):
+        raise InvalidSyncToken(token)
+    return state
+
+
+class SyncService:
+    def __init__(self, db: Session, user_id: int):
+        self.db = db
+        self.user_id = user_id
+
+    def page(self, token: Optional[str], limit: int) -> SyncResponse:
+        """The next page of changes after ``token``; a full sync without one"""
+        state = decode_token(token) if token else None
+        if state is not None and state["m"] == "d" and state["c"] < self._pruned_through():
+            state = None
+        if state is None:
+            # Changes logged from here on are picked up once the full sync is done
+            head = self.db.execute(select(func.max(ChangeLog.id))).scalar() or 0
+            return self._full_page({"m": "f", "h": head, "e": 0, "k": 0}, limit, reset=True)
+        if state["m"] == "f":
+            return self._full_page(state, limit)
+        return self._delta_page(state["c"], limit)
+
+    def _full_page(self, state: dict, limit: int, reset: bool = False) -> SyncResponse:
+        found: Dict[str, list] = {entity: [] for entity in ENTITIES}
+        entity_index, last_id = state["e"], state["k"]
+        remaining = limit
+        while remaining > 0 and entity_index < len(ENTITIES):
+            entity = ENTITIES[entity_index]
+            rows, ids = self._rows(entity, self._after(entity, last_id).limit(remaining))
+            found[entity].extend(rows)
+            # Rows deleted between the id query and the load still advance the position
+            if len(ids) < remaining:
+                entity_index, last_id = entity_index + 1, 0
+            else:
+                last_id = ids[-1]
+            remaining -= len(ids)
+
+        if entity_index < len(ENTITIES):
+            token, has_more = {"m": "f", "h": state["h"], "e": entity_index, "k": last_id}, True
+        else:
+            token, has_more = {"m": "d", "c": state["h"]}, self._changed_since(state["h"])
+        return SyncResponse(token=encode_token(token), has_more=has_more, reset=reset, **found)
+
+    def _delta_page(self, cursor: int, limit: int) -> SyncResponse:
+        entries = self.db.execute(
+            select(ChangeLog.id, ChangeLog.entity, ChangeLog.entity_id, ChangeLog.op)
+            .where(ChangeLog.id > cursor, ChangeLog.entity.in_(ENTITIES),
+                   or_(ChangeLog.user_id.is_(None), ChangeLog.user_id == self.user_id))
+            .order_by(ChangeLog.id)
+            .limit(limit)
+        ).all()
+        # The last change of each row wins
+        latest = {(entry.entity, entry.entity_id): entry.op for entry in entries}
+
+        found: Dict[str, list] = {}
+        deleted = SyncDeleted()
+        for entity in ENTITIES:
+            upserted = [entity_id for (kind, entity_id), op in latest.items() if kind == entity and op != DELETE]
+            rows = self._rows(entity, self._by_ids(entity, upserted))[0] if upserted else []
+            present = {row.id for row in rows}
+            found[entity] = rows
+            # Rows gone (or hidden) since they were logged count as deleted too
+            getattr(deleted, entity).extend(
+                entity_id for (kind, entity_id), op in latest.items()
+                if kind == entity and (op == DELETE or entity_id not in present)
+            )
+
+        token = {"m": "d", "c": entries[-1].id if entries else cursor}
+        return SyncResponse(token=encode_token(token), has_more=len(entries) == limit, deleted=deleted, **found)
+
+    def _after(self, entity: str, last_id: int):
+        """Query for the current rows of ``entity`` after ``last_id``, in id order"""
+        query = self._query(entity)
+        model = query.column_descriptions[0]["entity"]
+        return query.filter(model.id > last_id).order_by(model.id)
+
+    def _by_ids(self, entity: str, ids: List[int]):
+        query = self._query(entity)
+        return query.filter(query.column_descriptions[0]["entity"].id.in_(ids))
+
+    def _query(self, entity: str):
+        if entity == "artists":
+            return self.db.query(Artist)
+        if entity == "songs":
+            return self.db.query(Song)
+        if entity == "playlists":
+            return self.db.query(Playlist).filter(Playlist.user_id == self.user_id)
+        # Joining the song hides tracks of deleted songs
+        return (
+            self.db.query(PlaylistSong)
+            .join(Playlist, Playlist.id == PlaylistSong.playlist_id)
+            .join(Song, Song.id == PlaylistSong.song_id)
+            .filter(Playlist.user_id == self.user_id)
+        )
+
+    def _rows(self, entity: str, query) -> Tuple[list, List[int]]:
+        """Responses for the rows of ``query`` and the ids it selected"""
+        if entity in ("artists", "songs"):
+            model, schema = (Artist, ArtistResponse) if entity == "artists" else (Song, SongResponse)
+            ids = [row[0] for row in query.with_entities(model.id)]
+            # Through the entity cache, which other endpoints keep warm
+            cached = load_many(self.db, model, schema, ids)
+            return [cached[entity_id] for entity_id in ids if entity_id in cached], ids
+        schema = PlaylistResponse if entity == "playlists" else SyncTrack
+        rows = [schema.model_validate(row) for row in query]
+        return rows, [row.id for row in rows]
+
+    def _changed_since(self, cursor: int) -> bool:
+        return self.db.execute(select(exists().where(
+            ChangeLog.id > cursor, ChangeLog.entity.in_(ENTITIES),
+            or_(ChangeLog.user_id.is_(None), ChangeLog.user_id == self.user_id)
+        ))).scalar()
+
+    def _pruned_through(self) -> int:
+        return int(get_checkpoint(self.db, PRUNED_CHECKPOINT, "0"))
+
+
+def prune_change_log(db: Session, retention_days: int, batch_size: int = 5000) -> int:
+    """Delete change_log rows older than ``retention_days``; returns rows deleted"""
+    cutoff = utcnow() - timedelta(days=retention_days)
+    pruned_through = int(get_checkpoint(db, PRUNED_CHECKPOINT, "0"))
+    deleted = 0
+    while True:
+        ids = db.execute(
+            select(ChangeLog.id).where(ChangeLog.changed_at < cutoff).order_by(ChangeLog.id).limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            return deleted
+        db.execute(ChangeLog.__table__.delete().where(ChangeLog.id.in_(ids)))
+        pruned_through = max(pruned_through, ids[-1])
+        set_checkpoint(db, PRUNED_CHECKPOINT, str(pruned_through))
+        db.commit()
+        deleted += len(ids)
+
+
+def main():
+    """Prune the sync change log from the command line"""
+    from app.config import settings
+    from app.database.connection import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Maintain the change log behind the sync API")
+    parser.add_argument("command", choices=["prune"])
+    parser.add_argument("--days", type=int, default=settings.CHANGE_LOG_RETENTION_DAYS)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        deleted = prune_change_log(db, args.days)
+    finally:
+        db.close()
+    print(f"Pruned {deleted} change log row(s) older than {args.days} days")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""Rotating refresh tokens.
+
+Login returns a short-lived access token (JWT) and a long-lived refresh token.
+``POST /auth/refresh`` trades the refresh token for a new access token and a new
+refresh token without checking the password, so bcrypt runs once per login
+instead of once per access token lifetime. Refresh tokens are 256-bit random
+strings and are stored as a plain SHA-256. A slow hash protects guessable
+passwords and adds nothing for random tokens, and it would cost a bcrypt on every
+refresh.
+
+Each exchange marks the token as used. If a used token is presented again, it
+has been copied, so the whole family (every token rotated from the same login) is
+revoked and the user and the thief both have to log in again. Logout
+revokes the family, and a password change revokes all of the user's tokens.
+Expired tokens are deleted by a daily job:
+
+    python -m app.services.token_service prune
+"""
+import argparse
+import hashlib
+import secrets
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models import RefreshToken, User
+from app.services.metrics_service import metrics
+
+refresh_tokens_total = metrics.counter(
+    "auth_refresh_tokens_total", "Refresh token exchanges by outcome", ("result",)
+)
+
+
+class InvalidRefreshToken(Exception):
+    """The refresh token is unknown, expired, revoked or already used"""
+
+
+def hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def issue_refresh_token(db: Session, user_id: int, family_id: Optional[str] = None) -> str:
+    """Stage a new refresh token for ``user_id`` (a new family unless given); the caller commits"""
+    token = secrets.token_urlsafe(32)
+    db.add(RefreshToken(
+        user_id=user_id,
+        token_hash=hash_token(token),
+        family_id=family_id or secrets.token_hex(16),
+        expires_at=datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+    ))
+    return token
+
+
+def rotate_refresh_token(db: Session, token: str) -> Tuple[User, str]:
+    """Use up ``token`` and return its user with the family's next token; raises InvalidRefreshToken"""
+    now = datetime.utcnow()
+    row = db.query(RefreshToken).filter(RefreshToken.token_hash == hash_token(token)).first()
+    if row is None or row.expires_at <= now or row.revoked_at is not None:
+        refresh_tokens_total.inc(("invalid",))
+        raise InvalidRefreshToken()
+
+    table = RefreshToken.__table__
+    # Conditional on still being unused, so of two concurrent exchanges only one wins;
+    # the loser is treated as a replay
+    claimed = db.execute(
+        table.update()
+        .where(table.c.id == row.id, table.c.used_at.is_(None), table.c.revoked_at.is_(None))
+        .values(used_at=now)
+    ).rowcount
+    if not claimed:
+        revoke_family(db, row.family_id)
+        db.commit()
+        refresh_tokens_total.inc(("reused",))
+        raise InvalidRefreshToken()
+
+    user = db.query(User).filter(User.id == row.user_id).first()
+    if user is None or not user.is_active:
+        db.rollback()
+        refresh_tokens_total.inc(("invalid",))
+        raise InvalidRefreshToken()
+    new_token = issue_refresh_token(db, user.id, row.family_id)
+    db.commit()
+    refresh_tokens_total.inc(("rotated",))
+    return user, new_token
+
+
+def revoke_family(db: Session, family_id: str):
+    """Stage revocation of every token rotated from the same login"""
+    table = RefreshToken.__table__
+    db.execute(
+        table.update()
+        .where(table.c.family_id == family_id, table.c.revoked_at.is_(None))
+        .values(revoked_at=datetime.utcnow())
+    )
+
+
+def revoke_refresh_token(db: Session, token: str) -> bool:
+    """Revoke ``token``'s family (logout); False if the token is unknown"""
+    family_id = db.execute(
+        select(RefreshToken.family_id).where(RefreshToken.token_hash == hash_token(token))
+    ).scalar()
+    if family_id is None:
+        return False
+    revoke_family(db, family_id)
+    db.commit()
+    return True
+
+
+def revoke_user_tokens(db: Session, user_id: int):
+    """Stage revocation of all of a user's refresh tokens (password change)"""
+    table = RefreshToken.__table__
+    db.execute(
+        table.update()
+        .where(table.c.user_id == user_id, table.c.revoked_at.is_(None))
+        .values(revoked_at=datetime.utcnow())
+    )
+
+
+def prune_refresh_tokens(db: Session, batch_size: int = 5000) -> int:
+    """Delete expired refresh tokens; returns rows deleted"""
+    table = RefreshToken.__table__
+    deleted = 0
+    while True:
+        ids = db.execute(
+            select(table.c.id).where(table.c.expires_at < datetime.utcnow()).limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            return deleted
+        db.execute(table.delete().where(table.c.id.in_(ids)))
+        db.commit()
+        deleted += len(ids)
+
+
+def main():
+    """Delete expired refresh tokens from the command line"""
+    from app.database.connection import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Maintain refresh tokens")
+    parser.add_argument("command", choices=["prune"])
+    parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        deleted = prune_refresh_tokens(db)
+    finally:
+        db.close()
+    print(f"Pruned {deleted} expired refresh token(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+# Benchmarks - run individual scripts with `python -m benchmarks.<name>`
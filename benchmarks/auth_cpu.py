@@ -0,0 +1,91 @@
+"""Auth CPU per active user per day: password logins vs. refresh tokens.
+
+Measures the CPU time (process time) of the operations behind each flow on a
+fresh SQLite database, with the production bcrypt cost:
+
+- password login: user lookup, bcrypt verify, access token (JWT), refresh token
+- refresh: SHA-256 lookup, rotation to a new refresh token, access token
+
+and multiplies them out for a user active ``--active-hours`` a day with access
+tokens lasting ``ACCESS_TOKEN_EXPIRE_MINUTES``. Without refresh tokens every
+expiry is a password login; with them the user logs in ``--logins-per-day``
+times and refreshes otherwise.
+
+Usage: python -m benchmarks.auth_cpu --users 20 --rounds 5 --active-hours 8 --active-users 100000
+"""
+import argparse
+import math
+import os
+import tempfile
+import time
+
+
+def _cpu_per_call(work, calls: int) -> float:
+    start = time.process_time()
+    for _ in range(calls):
+        work()
+    return (time.process_time() - start) / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Auth CPU per active user per day, with and without refresh tokens")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=5, help="Logins and refreshes measured per user")
+    parser.add_argument("--active-hours", type=float, default=8)
+    parser.add_argument("--logins-per-day", type=float, default=1, help="Password logins that remain per user")
+    parser.add_argument("--active-users", type=int, default=100000, help="Daily active users, for the totals")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(directory, 'auth.db')}"
+        os.environ.setdefault("SCHEDULER_ENABLED", "false")
+        from app.config import settings
+        from app.database.connection import SessionLocal, engine
+        from app.database.schema import upgrade
+        from app.models import User
+        from app.services import create_access_token, get_password_hash, verify_password
+        from app.services.token_service import issue_refresh_token, rotate_refresh_token
+
+        upgrade(engine)
+        db = SessionLocal()
+        password = "correct horse battery staple"
+        hashed = get_password_hash(password)
+        db.add_all(User(email=f"user{i}@example.com", name=f"User {i}", hashed_password=hashed)
+                   for i in range(args.users))
+        db.commit()
+        emails = [f"user{i}@example.com" for i in range(args.users)]
+        tokens = {}
+
+        def login():
+            for email in emails:
+                user = db.query(User).filter(User.email == email).first()
+                verify_password(password, user.hashed_password)
+                create_access_token({"sub": str(user.id), "email": user.email})
+                tokens[email] = issue_refresh_token(db, user.id)
+                db.commit()
+
+        def refresh():
+            for email in emails:
+                user, tokens[email] = rotate_refresh_token(db, tokens[email])
+                create_access_token({"sub": str(user.id), "email": user.email})
+
+        login_cpu = _cpu_per_call(login, args.rounds) / args.users
+        refresh_cpu = _cpu_per_call(refresh, args.rounds) / args.users
+        db.close()
+        engine.dispose()
+
+    expiries = math.ceil(args.active_hours * 60 / settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    logins = min(args.logins_per_day, expiries)
+    before = expiries * login_cpu
+    after = logins * login_cpu + (expiries - logins) * refresh_cpu
+    print(f"password login: {login_cpu * 1000:.2f} ms CPU   refresh: {refresh_cpu * 1000:.3f} ms CPU")
+    print(f"{expiries} access tokens per user per day ({args.active_hours:g} h active, "
+          f"{settings.ACCESS_TOKEN_EXPIRE_MINUTES} min tokens)")
+    print(f"{'flow':<16} {'ms CPU/user/day':>16} {'CPU s/day':>12}")
+    for name, cpu in (("password only", before), ("refresh tokens", after)):
+        print(f"{name:<16} {cpu * 1000:>16.1f} {cpu * args.active_users:>12.0f}")
+    print(f"{before / after:.1f}x less auth CPU for {args.active_users} daily active users")
+
+
+if __name__ == "__main__":
+    main()
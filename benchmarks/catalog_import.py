@@ -0,0 +1,99 @@
+"""Throughput of the bulk catalog import.
+
+Writes a synthetic label catalog (an artists CSV and a songs file in CSV or
+NDJSON, with a small share of invalid rows) to a temporary directory, imports it
+into a fresh SQLite database through CatalogImporter, and reports rows per second
+per stage. Exits non-zero if the songs take longer than --budget seconds.
+
+Usage: python -m benchmarks.catalog_import --songs 1000000 --format csv --budget 120
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import sys
+import tempfile
+
+GENRES = ("afrobeats", "bongo", "gengetone", "benga", "gospel", "hiphop", "rnb")
+REGIONS = ("Nairobi", "Mombasa", "Kisumu", "Nakuru", "Eldoret")
+
+
+def write_catalog(directory: str, songs: int, artists: int, fmt: str, error_rate: float, seed: int):
+    rng = random.Random(seed)
+    artists_path = os.path.join(directory, "artists.csv")
+    with open(artists_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["name", "external_id", "genre", "region"])
+        for i in range(artists):
+            writer.writerow([f"Artist {i}", f"ISNI-{i:08d}", rng.choice(GENRES), rng.choice(REGIONS)])
+
+    songs_path = os.path.join(directory, f"songs.{'csv' if fmt == 'csv' else 'ndjson'}")
+    columns = ["title", "artist_external_id", "album", "duration_seconds", "release_date", "genre", "region",
+               "is_explicit"]
+    with open(songs_path, "w", newline="") as f:
+        writer = csv.writer(f) if fmt == "csv" else None
+        if writer:
+            writer.writerow(columns)
+        for i in range(songs):
+            artist = rng.randrange(artists)
+            duration = str(rng.randint(90, 420))
+            if rng.random() < error_rate:
+                # Unknown artist or unparseable duration
+                if rng.random() < 0.5:
+                    artist = artists + 1
+                else:
+                    duration = "3:30"
+            row = [f"Track {i}", f"ISNI-{artist:08d}", f"Album {i // 12}", duration,
+                   f"20{rng.randint(10, 25)}-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}",
+                   rng.choice(GENRES), rng.choice(REGIONS), "true" if rng.random() < 0.1 else "false"]
+            if writer:
+                writer.writerow(row)
+            else:
+                f.write(json.dumps(dict(zip(columns, row))) + "\n")
+    return artists_path, songs_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the bulk catalog import")
+    parser.add_argument("--songs", type=int, default=1000000)
+    parser.add_argument("--artists", type=int, default=20000)
+    parser.add_argument("--format", choices=["csv", "ndjson"], default="csv")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--error-rate", type=float, default=0.001)
+    parser.add_argument("--budget", type=float, default=120, help="Seconds allowed for the songs import")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(directory, 'import.db')}"
+        os.environ.setdefault("SCHEDULER_ENABLED", "false")
+        from app.database.connection import SessionLocal, engine
+        from app.database.schema import upgrade
+        from app.services.import_service import CatalogImporter
+
+        upgrade(engine)
+        artists_path, songs_path = write_catalog(
+            directory, args.songs, args.artists, args.format, args.error_rate, args.seed
+        )
+        print(f"{'stage':<8} {'rows':>9} {'inserted':>9} {'failed':>7} {'seconds':>8} {'rows/s':>9}")
+        seconds = 0.0
+        for kind, path, fmt in (("artists", artists_path, "csv"), ("songs", songs_path, args.format)):
+            db = SessionLocal()
+            try:
+                with open(path, encoding="utf-8", newline="") as stream:
+                    report = CatalogImporter(db, batch_size=args.batch_size).run(kind, stream, fmt)
+            finally:
+                db.close()
+            print(f"{kind:<8} {report.rows:>9} {report.inserted:>9} {report.failed:>7} {report.seconds:>8.1f} "
+                  f"{report.rows / max(report.seconds, 1e-9):>9.0f}")
+            seconds = report.seconds
+        engine.dispose()
+
+    if seconds > args.budget:
+        print(f"songs import took {seconds:.1f}s, over the {args.budget:g}s budget")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Per-worker memory of an in-process catalog cache vs. the shared snapshot.
+
+Starts --workers processes side by side, the way uvicorn runs workers, for each of
+two modes:
+
+    dict      every worker holds the whole catalog as response models in a dict,
+              as a fully warmed per-process cache would
+    snapshot  every worker maps the catalog snapshot and reads every record
+
+and reports, per worker, how much RSS and PSS (proportional set size: shared pages
+divided among the processes mapping them) grew from loading the catalog, plus the
+host total. Snapshot pages are shared, so the PSS per worker falls as workers are
+added while the dict copies stay private. Also times lookups by id in each mode.
+
+Linux only (reads /proc/self/smaps_rollup). Uses a database from benchmarks.run:
+
+    python -m benchmarks.run generate --db bench.db --scale 0.01
+    python -m benchmarks.catalog_memory --db bench.db --workers 16
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+
+def _memory() -> dict:
+    """Rss, Pss and Private_* of this process in KiB"""
+    values = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            name, _, rest = line.partition(":")
+            if rest.strip().endswith("kB"):
+                values[name] = int(rest.split()[0])
+    return {
+        "rss": values["Rss"],
+        "pss": values["Pss"],
+        "private": values.get("Private_Clean", 0) + values.get("Private_Dirty", 0),
+    }
+
+
+def _worker(mode: str, db_path: str, snapshot_path: str, ready, results):
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    from app.database.connection import SessionLocal
+    from app.models import Artist, Song
+    from app.schemas.artist import ArtistResponse
+    from app.schemas.song import SongResponse
+    from app.services.catalog_snapshot import CatalogSnapshot
+
+    db = SessionLocal()
+    song_ids = [row[0] for row in db.query(Song.id)]
+    before = _memory()
+
+    if mode == "dict":
+        songs = {song.id: SongResponse.model_validate(song) for song in db.query(Song).yield_per(5000)}
+        artists = {artist.id: ArtistResponse.model_validate(artist) for artist in db.query(Artist)}
+        db.expunge_all()
+        get = songs.get
+    else:
+        snapshot = CatalogSnapshot(snapshot_path)
+        for i in range(snapshot.song_count):
+            snapshot.song_at(i)
+        for i in range(snapshot.artist_count):
+            snapshot.artist_at(i)
+        get = snapshot.song
+    db.close()
+
+    sample = random.Random(os.getpid()).choices(song_ids, k=20000)
+    started = time.perf_counter()
+    for song_id in sample:
+        get(song_id)
+    lookup_us = (time.perf_counter() - started) / len(sample) * 1e6
+
+    # Measure while every worker has the catalog loaded, so shared pages are split
+    ready.wait()
+    after = _memory()
+    results.put({name: after[name] - before[name] for name in after} | {"lookup_us": lookup_us})
+    ready.wait()
+
+
+def run(mode: str, workers: int, db_path: str, snapshot_path: str) -> list:
+    context = multiprocessing.get_context("spawn")
+    ready = context.Barrier(workers)
+    results = context.Queue()
+    processes = [
+        context.Process(target=_worker, args=(mode, db_path, snapshot_path, ready, results))
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    collected = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    return collected
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Catalog memory per worker: per-process dict vs. shared snapshot")
+    parser.add_argument("--db", required=True, help="Database created by benchmarks.run generate")
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+    if not os.path.exists(args.db):
+        raise SystemExit(f"{args.db} not found; create it with python -m benchmarks.run generate")
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.abspath(args.db)}"
+    os.environ.setdefault("SCHEDULER_ENABLED", "false")
+    from app.database.connection import SessionLocal
+    from app.services.catalog_snapshot import build_snapshot
+
+    with tempfile.TemporaryDirectory() as directory:
+        snapshot_path = os.path.join(directory, "catalog.bin")
+        db = SessionLocal()
+        try:
+            started = time.perf_counter()
+            counts = build_snapshot(db, snapshot_path)
+        finally:
+            db.close()
+        print(f"snapshot: {counts['songs']} songs, {counts['artists']} artists, "
+              f"{os.path.getsize(snapshot_path) / 1024 / 1024:.1f} MiB, built in {time.perf_counter() - started:.2f}s")
+        print(f"{'mode':<9} {'workers':>7} {'RSS MiB/worker':>15} {'PSS MiB/worker':>15} "
+              f"{'private MiB/worker':>19} {'PSS MiB total':>14} {'lookup us':>10}")
+        for mode in ("dict", "snapshot"):
+            results = run(mode, args.workers, os.path.abspath(args.db), snapshot_path)
+
+            def mean(name):
+                return sum(result[name] for result in results) / len(results)
+            print(f"{mode:<9} {args.workers:>7} {mean('rss') / 1024:>15.1f} {mean('pss') / 1024:>15.1f} "
+                  f"{mean('private') / 1024:>19.1f} {mean('pss') * len(results) / 1024:>14.1f} "
+                  f"{mean('lookup_us'):>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""Synthetic, reproducible dataset generator for benchmarks.
+
+Sizes at ``scale=1.0`` mirror production targets (1M songs, 100k playlists, 10M
+analytics rows, three years of weekly charts); use a smaller scale for quick runs.
+Rows are written with Core executemany inserts in fixed-size chunks.
+"""
+import random
+from array import array
+from itertools import islice
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from app.database.connection import Base
+from app.database.partitions import analytics_partitions
+from app.models import User, Artist, Song, Playlist, PlaylistSong, Chart, ChartEntry
+from app.services.analytics_service import AnalyticsRollupService
+
+FULL_SIZES = {
+    "users": 50_000,
+    "artists": 20_000,
+    "songs": 1_000_000,
+    "playlists": 100_000,
+    "tracks_per_playlist": 20,
+    "analytics": 10_000_000,
+    "chart_years": 3,
+    "chart_entries": 100,
+}
+
+REGIONS = ["Nairobi", "Mombasa", "Kisumu", "Nakuru", "Eldoret", "Coast", "Central", "Western"]
+GENRES = ["Gengetone", "Bongo", "Afrobeats", "Benga", "Gospel", "Hip Hop", "R&B", "Reggae"]
+CHUNK_SIZE = 10_000
+
+BENCH_EMAIL_DOMAIN = "bench.playlist.ke"
+BENCH_PASSWORD = "bench-password"
+
+
+def sizes_for(scale: float) -> dict:
+    sizes = {key: max(1, int(value * scale)) for key, value in FULL_SIZES.items()}
+    # Per-row shape parameters do not scale
+    sizes["tracks_per_playlist"] = FULL_SIZES["tracks_per_playlist"]
+    sizes["chart_years"] = FULL_SIZES["chart_years"]
+    sizes["chart_entries"] = min(FULL_SIZES["chart_entries"], sizes["songs"])
+    return sizes
+
+
+def bench_email(index: int) -> str:
+    return f"user{index}@{BENCH_EMAIL_DOMAIN}"
+
+
+def _insert_chunked(engine: Engine, table, rows):
+    chunk = []
+    with engine.begin() as conn:
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= CHUNK_SIZE:
+                conn.execute(insert(table), chunk)
+                chunk = []
+        if chunk:
+            conn.execute(insert(table), chunk)
+
+
+def generate(engine: Engine, scale: float = 0.01, seed: int = 42, log=print) -> dict:
+    """Create the schema and fill it with a deterministic synthetic catalog"""
+    from app.services import get_password_hash
+
+    rng = random.Random(seed)
+    sizes = sizes_for(scale)
+    now = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    Base.metadata.create_all(bind=engine)
+
+    # One bcrypt hash shared by every user keeps generation fast
+    password_hash = get_password_hash(BENCH_PASSWORD)
+    log(f"users: {sizes['users']}")
+    _insert_chunked(engine, User.__table__, (
+        {"id": i, "email": bench_email(i), "name": f"User {i}", "hashed_password": password_hash,
+         "is_active": True, "is_admin": i == 1, "created_at": now, "updated_at": now}
+        for i in range(1, sizes["users"] + 1)
+    ))
+
+    log(f"artists: {sizes['artists']}")
+    _insert_chunked(engine, Artist.__table__, (
+        {"id": i, "name": f"Artist {i}", "region": rng.choice(REGIONS), "genre": rng.choice(GENRES),
+         "monthly_listeners": rng.randint(0, 500_000), "created_at": now, "updated_at": now}
+        for i in range(1, sizes["artists"] + 1)
+    ))
+
+    log(f"songs: {sizes['songs']}")
+    durations = array("H", [0]) * (sizes["songs"] + 1)
+
+    def songs():
+        for i in range(1, sizes["songs"] + 1):
+            duration = rng.randint(90, 420)
+            durations[i] = duration
+            created = now - timedelta(days=rng.randint(0, 1095))
+            yield {
+                "id": i, "title": f"Song {i}", "artist_id": rng.randint(1, sizes["artists"]),
+                "album": f"Album {i // 12}", "duration_seconds": duration, "release_date": created,
+                "genre": rng.choice(GENRES), "region": rng.choice(REGIONS),
+                # Long-tailed popularity, like real catalogs
+                "stream_count": int(rng.paretovariate(1.2) * 1000), "rating": rng.randint(0, 5),
+                "is_explicit": rng.random() < 0.1, "created_at": created, "updated_at": created,
+            }
+
+    _insert_chunked(engine, Song.__table__, songs())
+
+    log(f"playlists: {sizes['playlists']} x {sizes['tracks_per_playlist']} tracks")
+
+    def playlist_tracks(playlist_id: int):
+        # Seeded per playlist so both passes below see the same tracks
+        track_rng = random.Random(seed * 1_000_003 + playlist_id)
+        return [track_rng.randint(1, sizes["songs"]) for _ in range(sizes["tracks_per_playlist"])]
+
+    def playlists():
+        for i in range(1, sizes["playlists"] + 1):
+            track_ids = playlist_tracks(i)
+            yield {
+                "id": i, "name": f"Playlist {i}", "user_id": rng.randint(1, sizes["users"]),
+                "is_public": rng.random() < 0.8, "track_count": len(track_ids),
+                "total_duration_seconds": sum(durations[s] for s in track_ids),
+                "created_at": now, "updated_at": now,
+            }
+
+    def tracks():
+        for i in range(1, sizes["playlists"] + 1):
+            for order, song_id in enumerate(playlist_tracks(i), start=1):
+                yield {"playlist_id": i, "song_id": song_id, "order": order, "added_at": now}
+
+    _insert_chunked(engine, Playlist.__table__, playlists())
+    _insert_chunked(engine, PlaylistSong.__table__, tracks())
+    del durations
+
+    weeks = sizes["chart_years"] * 52
+    log(f"charts: {weeks} weeks x {len(REGIONS) + 1} regions x {sizes['chart_entries']} entries")
+    chart_rows, entry_rows = [], []
+    chart_id = 0
+    for week_offset in range(weeks):
+        week_start = now - timedelta(weeks=week_offset)
+        year, week, _ = week_start.isocalendar()
+        for region in [None] + REGIONS:
+            chart_id += 1
+            chart_rows.append({"id": chart_id, "name": f"Top {region or 'Kenya'}", "week": week,
+                               "year": year, "region": region, "created_at": week_start})
+            ranked = rng.sample(range(1, sizes["songs"] + 1), sizes["chart_entries"])
+            entry_rows.extend(
+                {"chart_id": chart_id, "song_id": song_id, "rank": rank,
+                 "previous_rank": rank + rng.randint(-5, 5) if rng.random() < 0.8 else None,
+                 "trend": rng.choice(["up", "down", "stable", "new"]), "created_at": week_start}
+                for rank, song_id in enumerate(ranked, start=1)
+            )
+    _insert_chunked(engine, Chart.__table__, chart_rows)
+    _insert_chunked(engine, ChartEntry.__table__, entry_rows)
+    del chart_rows, entry_rows
+
+    log(f"analytics: {sizes['analytics']}")
+    days = 365 * sizes["chart_years"]
+    rows = (
+        {"song_id": rng.randint(1, sizes["songs"]), "region": rng.choice(REGIONS),
+         "date": now - timedelta(days=rng.randint(0, days)),
+         "stream_count": rng.randint(0, 10_000), "unique_listeners": rng.randint(0, 2_000),
+         "likes_count": rng.randint(0, 500), "shares_count": rng.randint(0, 100), "created_at": now}
+        for _ in range(sizes["analytics"])
+    )
+    # Routed to the monthly analytics partitions
+    with Session(engine) as db:
+        for chunk in iter(lambda: list(islice(rows, CHUNK_SIZE)), []):
+            analytics_partitions.insert(db, chunk)
+        db.commit()
+
+    log("analytics rollups")
+    with Session(engine) as db:
+        AnalyticsRollupService(db).refresh()
+
+    return sizes
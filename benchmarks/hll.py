@@ -0,0 +1,137 @@
+"""Accuracy and query cost of the HyperLogLog unique-listener sketches.
+
+Part one adds n distinct values to a sketch and reports the estimate error and the
+serialized size. Part two records synthetic listens (several songs and
+regions, with listeners coming back on many days) for --days days through
+ListenerSketchService into an in-memory SQLite database, then times weekly, monthly,
+whole-range and cross-region unique-listener queries against the exact answer and
+against the summed per-day counts the analytics table used to report.
+
+Exits non-zero when any estimate is off by more than --max-error percent.
+
+Usage: python -m benchmarks.hll --listeners 50000 --days 365
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import date, datetime, time as time_of_day, timedelta
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.database.connection import Base
+from app.database.partitions import add_months
+from app.models import ListenerSketch
+from app.services.hll import HyperLogLog
+from app.services.sketch_service import ListenerSketchService
+
+REGIONS = ("Nairobi", "Mombasa", "Kisumu", "Nakuru", "Eldoret")
+
+
+def accuracy(sizes):
+    print(f"{'distinct':>10} {'estimate':>10} {'error %':>8} {'bytes':>7}")
+    worst = 0.0
+    for n in sizes:
+        sketch = HyperLogLog()
+        sketch.update(range(n))
+        estimate = sketch.count()
+        error = (estimate - n) / n * 100
+        worst = max(worst, abs(error))
+        print(f"{n:>10} {estimate:>10} {error:>8.2f} {len(sketch.to_bytes()):>7}")
+    return worst
+
+
+def generate(listeners: int, songs: int, days: int, per_day: int, seed: int):
+    """Listens as (listener, song, region, moment); each listener has a home region"""
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1)
+    home = [REGIONS[rng.randrange(len(REGIONS))] for _ in range(listeners)]
+    # A loyal core listens most days, so summed daily counts repeat them heavily
+    core = max(1, listeners // 10)
+    for day in range(days):
+        moment = start + timedelta(days=day)
+        for _ in range(per_day):
+            listener = rng.randrange(core) if rng.random() < 0.5 else rng.randrange(listeners)
+            region = home[listener] if rng.random() < 0.9 else REGIONS[rng.randrange(len(REGIONS))]
+            yield listener, rng.randrange(1, songs + 1), region, moment + timedelta(seconds=rng.randrange(86400))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark HyperLogLog unique-listener sketches")
+    parser.add_argument("--listeners", type=int, default=50000)
+    parser.add_argument("--songs", type=int, default=20)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--listens-per-day", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-error", type=float, default=2.5, help="Fail above this error (percent)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print("Sketch accuracy")
+    worst = accuracy([100, 1000, 10_000, 50_000, 200_000])
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine, autoflush=False)()
+    service = ListenerSketchService(db)
+
+    events = list(generate(args.listeners, args.songs, args.days, args.listens_per_day, args.seed))
+    started = time.perf_counter()
+    # Daily batches, as an ingest job would write them
+    for i in range(0, len(events), args.listens_per_day):
+        service.record(events[i:i + args.listens_per_day])
+    db.commit()
+    written = time.perf_counter() - started
+    rows, stored = db.query(func.count(), func.sum(func.length(ListenerSketch.sketch))).one()
+    print(f"\nRecorded {len(events)} listens in {written:.1f}s: {rows} sketch rows, {stored / 1024:.0f} KiB")
+
+    # Windows scale with --days and are clipped to the recorded range
+    first = events[0][3].replace(hour=0, minute=0, second=0)
+    last = first + timedelta(days=args.days)
+    middle = first + timedelta(days=args.days // 2)
+    month = max(datetime(middle.year, middle.month, 1), first)
+    queries = [
+        ("week, all regions", middle, min(middle + timedelta(days=7), last), None, None),
+        ("month, all regions", month, min(datetime.combine(add_months(month.date(), 1), time_of_day.min), last), None, None),
+        ("quarter, Nairobi", month, min(datetime.combine(add_months(month.date(), 3), time_of_day.min), last), None, ["Nairobi"]),
+        ("all days, all regions", first, last, None, None),
+        ("all days, song 1", first, last, [1], None),
+        ("mid-month range", first + timedelta(days=args.days // 9), first + timedelta(days=max(1, args.days * 4 // 9)),
+         None, None),
+    ]
+
+    print(f"\n{'query':<22} {'exact':>8} {'sketch':>8} {'error %':>8} {'summed':>9} {'ms':>7}")
+    for label, start, end, song_ids, regions in queries:
+        selected = [
+            event for event in events
+            if start <= event[3] < end
+            and (song_ids is None or event[1] in song_ids)
+            and (regions is None or event[2] in regions)
+        ]
+        exact = len({event[0] for event in selected})
+        # What summing per song/region/day distinct counts reports
+        summed = len({(event[0], event[1], event[2], event[3].date()) for event in selected})
+
+        timings = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            result = service.unique_listeners(song_ids, start, end, regions)
+            timings.append(time.perf_counter() - started)
+        # None: no sketch covers the window
+        estimate = result[0] if result is not None else 0
+        if exact:
+            error = (estimate - exact) / exact * 100
+            worst = max(worst, abs(error))
+        else:
+            error = 0.0 if not estimate else float("inf")
+            worst = max(worst, abs(error))
+        print(f"{label:<22} {exact:>8} {estimate:>8} {error:>8.2f} {summed:>9} {min(timings) * 1000:>7.1f}")
+
+    db.close()
+    if worst > args.max_error:
+        print(f"\nFAIL: worst error {worst:.2f}% exceeds {args.max_error}%")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
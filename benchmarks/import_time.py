@@ -0,0 +1,67 @@
+"""Cold-start import budget for the application.
+
+Runs ``python -X importtime -c "import app.main"`` in fresh interpreters, reports
+the slowest modules and exits non-zero when the best run exceeds the budget or
+when a module that must stay lazy (jose, passlib, bcrypt) was imported.
+
+    python -m benchmarks.import_time --budget-ms 1500
+"""
+import argparse
+import subprocess
+import sys
+
+LAZY_MODULES = ("jose", "passlib", "bcrypt")
+
+
+def profile_import(module: str):
+    """Return (total_us, {module: (self_us, cumulative_us)}) for one cold import"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True,
+    )
+    timings = {}
+    total = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        indent = len(name) - len(name.lstrip())
+        name = name.strip()
+        timings[name] = (int(self_us), int(cumulative_us))
+        if indent == 1:
+            total += int(cumulative_us)
+    return total, timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Guard the application's cold-start import time")
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--budget-ms", type=float, default=1500.0)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    runs = [profile_import(args.module) for _ in range(args.runs)]
+    total, timings = min(runs, key=lambda run: run[0])
+
+    print(f"Import of {args.module}: best {total / 1000:.1f} ms over {args.runs} runs "
+          f"(budget {args.budget_ms:.0f} ms)")
+    print(f"\nSlowest modules by self time:")
+    for name, (self_us, cumulative_us) in sorted(timings.items(), key=lambda item: -item[1][0])[:args.top]:
+        print(f"  {self_us / 1000:8.1f} ms  {cumulative_us / 1000:8.1f} ms cumulative  {name}")
+
+    failures = []
+    eager = sorted(name for name in timings if name.split(".")[0] in LAZY_MODULES)
+    if eager:
+        failures.append(f"modules that must be imported lazily were loaded at startup: {', '.join(eager)}")
+    if total / 1000 > args.budget_ms:
+        failures.append(f"import took {total / 1000:.1f} ms, over the {args.budget_ms:.0f} ms budget")
+
+    for failure in failures:
+        print(f"\nFAIL: {failure}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Memory and fan-out cost of live push subscriptions.
+
+Opens ``--connections`` idle subscriptions on a LiveHub, spread over ``--topics``
+topics shaped like a 100-entry chart, and reports the hub's memory per idle
+connection. It then publishes ``--rounds`` changes (a few ranks moving) per topic
+and reports the time to diff, encode and queue each change for every subscriber,
+and to drain the queues as connections would. Half the subscribers never read,
+so the last line shows their buffers staying at ``LIVE_BUFFER_SIZE``. The ASGI
+server's own per-socket cost comes on top of these figures.
+
+Usage: python -m benchmarks.live_fanout --connections 50000 --topics 10 --rounds 50
+"""
+import argparse
+import asyncio
+import random
+import time
+import tracemalloc
+
+
+def _chart(rng: random.Random, entries: int = 100) -> list:
+    return [{"id": i, "song_id": i, "rank": i, "song": {"title": f"Track {i}", "stream_count": rng.randint(0, 10 ** 6)}}
+            for i in range(1, entries + 1)]
+
+
+async def _run(args):
+    from app.config import settings
+    from app.services.live_service import LiveHub, Producer, Topic
+
+    class BenchTopic(Topic):
+        kind = "bench"
+
+        def __init__(self, name: str, state: list):
+            super().__init__(name)
+            self.state = state
+
+        def load(self, db):
+            return [dict(item) for item in self.state]
+
+    settings.LIVE_MAX_CONNECTIONS = args.connections
+    settings.LIVE_REFRESH_SECONDS = 3600
+    rng = random.Random(args.seed)
+    hub = LiveHub()
+    topics = [BenchTopic(f"chart:2026:{week}", _chart(rng)) for week in range(1, args.topics + 1)]
+    producers = [Producer(hub, topic) for topic in topics]
+    for producer in producers:
+        hub.producers[producer.topic.name] = producer
+    while any(producer.snapshot is None for producer in producers):
+        await asyncio.sleep(0.01)
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    subscriptions = [hub.connect() for _ in range(args.connections)]
+    for i, subscription in enumerate(subscriptions):
+        hub.subscribe(subscription, [topics[i % len(topics)].name])
+    for subscription in subscriptions:
+        subscription._buffer = []
+    idle = (tracemalloc.get_traced_memory()[0] - before) / args.connections
+    tracemalloc.stop()
+    print(f"{args.connections} idle connections over {args.topics} topics: {idle:.0f} bytes each in the hub")
+
+    readers = subscriptions[::2]
+    publish = drain = 0.0
+    most_buffered = 0
+    for _ in range(args.rounds):
+        for producer in producers:
+            state = producer.topic.state
+            for item in rng.sample(state, 5):
+                item["song"] = {**item["song"], "stream_count": item["song"]["stream_count"] + rng.randint(1, 500)}
+            start = time.perf_counter()
+            producer._publish(producer.topic.load(None))
+            publish += time.perf_counter() - start
+        most_buffered = max(most_buffered, max(len(subscription._buffer) for subscription in subscriptions[1::2]))
+        start = time.perf_counter()
+        for subscription in readers:
+            await subscription.receive(0)
+        drain += time.perf_counter() - start
+
+    deliveries = args.rounds * args.connections
+    print(f"publish: {publish / (args.rounds * args.topics) * 1000:.2f} ms per change "
+          f"({publish / deliveries * 1e6:.2f} us per subscriber)")
+    print(f"drain: {drain / (args.rounds * len(readers)) * 1e6:.2f} us per connection per round")
+    lagged = sum(subscription._lagged for subscription in subscriptions[1::2])
+    print(f"non-reading connections held at most {most_buffered} messages (LIVE_BUFFER_SIZE="
+          f"{settings.LIVE_BUFFER_SIZE}); {lagged} of them will be resent snapshots")
+    await hub.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Live push memory per connection and fan-out cost")
+    parser.add_argument("--connections", type=int, default=50000)
+    parser.add_argument("--topics", type=int, default=10)
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    asyncio.run(_run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Request overhead of MetricsMiddleware on a representative catalog endpoint.
+
+The application from ``app.main``, with its full middleware stack, serves a song
+listing from a scratch SQLite database. The stack is built twice, once as
+configured and once without MetricsMiddleware, and both copies are driven
+directly through ASGI on the same route. Short blocks of requests run in pairs,
+one block per stack in random order, so drift in machine load hits both alike;
+the budget is checked against the median of the paired differences, which is far
+steadier than comparing the fastest or median blocks.
+
+Usage: python -m benchmarks.metrics_overhead --requests 40 --pairs 150
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+MAX_OVERHEAD_PERCENT = 2.0
+PATH = "/api/v1/songs/"
+QUERY = b"limit=20"
+
+
+def build_stacks():
+    """The real app's middleware stack with and without MetricsMiddleware"""
+    from app.database.connection import SessionLocal, init_db
+    from app.main import app
+    from app.models import Artist, Song
+    from app.services.metrics_service import MetricsMiddleware
+
+    init_db()
+    db = SessionLocal()
+    db.add(Artist(id=1, name="Bench Artist"))
+    db.add_all(Song(title=f"Song {i}", artist_id=1, duration_seconds=200) for i in range(200))
+    db.commit()
+    db.close()
+
+    configured = list(app.user_middleware)
+    instrumented = app.build_middleware_stack()
+    app.user_middleware = [m for m in configured if m.cls is not MetricsMiddleware]
+    try:
+        plain = app.build_middleware_stack()
+    finally:
+        app.user_middleware = configured
+    return plain, instrumented
+
+
+async def drive(app, requests: int) -> float:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": PATH, "raw_path": PATH.encode(), "query_string": QUERY,
+        "root_path": "", "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 1),
+        "server": ("bench", 80),
+    }
+    status = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), receive, send)
+    elapsed = (time.perf_counter() - start) / requests
+    if set(status) != {200}:
+        raise SystemExit(f"{PATH}: unexpected status codes {sorted(set(status))}")
+    return elapsed
+
+
+async def measure(plain, instrumented, requests: int, pairs: int):
+    # Warm up both stacks (route compilation, statement caches)
+    await drive(plain, 200)
+    await drive(instrumented, 200)
+
+    baseline, measured = [], []
+    for _ in range(pairs):
+        blocks = [(plain, baseline), (instrumented, measured)]
+        random.shuffle(blocks)
+        for app, results in blocks:
+            results.append(await drive(app, requests))
+    return baseline, measured
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MetricsMiddleware overhead benchmark")
+    parser.add_argument("--requests", type=int, default=40, help="Requests per block")
+    parser.add_argument("--pairs", type=int, default=150)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="metrics-overhead-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ["SCHEDULER_ENABLED"] = "false"
+    # One client address for every request; measure the middleware, not the limiter
+    os.environ["RATE_LIMIT_ENABLED"] = "false"
+
+    plain, instrumented = build_stacks()
+    baseline, measured = asyncio.run(measure(plain, instrumented, args.requests, args.pairs))
+
+    base_us = statistics.median(baseline) * 1e6
+    delta_us = statistics.median(m - b for b, m in zip(baseline, measured)) * 1e6
+    overhead = delta_us / base_us * 100
+    print(json.dumps({
+        "route": PATH,
+        "baseline_us_per_request": round(base_us, 1),
+        "instrumented_us_per_request": round(statistics.median(measured) * 1e6, 1),
+        "paired_delta_us": round(delta_us, 1),
+        "overhead_percent": round(overhead, 2),
+        "budget_percent": MAX_OVERHEAD_PERCENT,
+    }, indent=2))
+    if overhead > MAX_OVERHEAD_PERCENT:
+        raise SystemExit(f"Metrics overhead {overhead:.2f}% exceeds {MAX_OVERHEAD_PERCENT}% budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""Benchmark harness: generate a dataset, run the request mix, compare runs.
+
+    python -m benchmarks.run generate --db bench.db --scale 0.01
+    python -m benchmarks.run run --db bench.db --requests 5000 --concurrency 16 --out run.json
+    python -m benchmarks.run compare baseline.json run.json --threshold 10
+
+Requests go through the FastAPI app in-process via httpx's ASGI transport, so
+results measure the application and database, not the network stack.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from contextvars import ContextVar
+
+
+def _meta_path(db_path: str) -> str:
+    return db_path + ".meta.json"
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _percentile(sorted_values, fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def cmd_generate(args):
+    if os.path.exists(args.db):
+        raise SystemExit(f"{args.db} already exists; remove it or pick another path")
+    os.environ["DATABASE_URL"] = f"sqlite:///{args.db}"
+    from sqlalchemy import create_engine
+    from benchmarks.datagen import generate
+
+    engine = create_engine(f"sqlite:///{args.db}")
+    start = time.perf_counter()
+    sizes = generate(engine, scale=args.scale, seed=args.seed)
+    engine.dispose()
+    with open(_meta_path(args.db), "w") as f:
+        json.dump({"scale": args.scale, "seed": args.seed, "sizes": sizes}, f, indent=2)
+    print(f"Generated {args.db} in {time.perf_counter() - start:.1f}s")
+
+
+class QueryCounter:
+    """Wraps the ASGI app and counts SQL statements per request"""
+
+    def __init__(self, app):
+        from sqlalchemy import event
+        from sqlalchemy.engine import Engine
+
+        self.app = app
+        self.current: ContextVar = ContextVar("bench_query_count", default=None)
+
+        @event.listens_for(Engine, "after_cursor_execute")
+        def _count(conn, cursor, statement, parameters, context, executemany):
+            counter = self.current.get()
+            if counter is not None:
+                counter[0] += 1
+
+    async def __call__(self, scope, receive, send):
+        counter = [0]
+        token = self.current.set(counter)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-bench-queries", str(counter[0]).encode())
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.current.reset(token)
+
+
+async def _run_workloads(args, sizes):
+    import httpx
+    from app.config import settings
+    from app.main import app
+    from benchmarks.workloads import WORKLOADS, WorkloadContext, selection, _login
+
+    # Every virtual user shares one client address; measure the handlers, not the limiter
+    settings.RATE_LIMIT_ENABLED = False
+
+    transport = httpx.ASGITransport(app=QueryCounter(app), raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # Log in the virtual users before timing starts
+        tokens = {}
+        for user_id in range(1, min(args.users, sizes["users"]) + 1):
+            method, path, options = _login(None, None, user_id)
+            response = await client.post(path, data=options["data"])
+            if response.status_code == 200:
+                tokens[user_id] = response.json()["access_token"]
+        if not tokens:
+            raise SystemExit("Could not log in any benchmark user")
+
+        ctx = WorkloadContext(sizes, tokens)
+        names, cumulative = selection(args.workload)
+        samples = {name: [] for name in names}
+        remaining = [args.requests]
+
+        async def worker(worker_id: int):
+            rng = random.Random(args.seed * 7919 + worker_id)
+            user_ids = list(tokens)
+            while remaining[0] > 0:
+                remaining[0] -= 1
+                name = rng.choices(names, cum_weights=cumulative)[0]
+                user_id = rng.choice(user_ids)
+                method, path, options = WORKLOADS[name][1](rng, ctx, user_id)
+                headers = {"Authorization": f"Bearer {tokens[user_id]}"} if options.get("auth") else {}
+                start = time.perf_counter()
+                response = await client.request(
+                    method, path, params=options.get("params"), json=options.get("json"),
+                    data=options.get("data"), headers=headers
+                )
+                elapsed = time.perf_counter() - start
+                if name == "playlists.create" and response.status_code == 200:
+                    ctx.own_playlists[user_id].append(response.json()["id"])
+                samples[name].append(
+                    (elapsed, response.status_code, int(response.headers.get("x-bench-queries", 0)))
+                )
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(args.concurrency)))
+        wall = time.perf_counter() - start
+
+    return samples, wall
+
+
+def _summarize(samples: list, wall: float) -> dict:
+    latencies = sorted(s[0] for s in samples)
+    errors = sum(1 for s in samples if s[1] >= 400)
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "throughput_rps": round(len(samples) / wall, 2) if wall else 0.0,
+        "p50_ms": round(_percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(_percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(_percentile(latencies, 0.99) * 1000, 3),
+        "mean_queries": round(sum(s[2] for s in samples) / len(samples), 2) if samples else 0.0,
+    }
+
+
+def cmd_run(args):
+    if not os.path.exists(args.db):
+        raise SystemExit(f"{args.db} not found; run `generate` first")
+    with open(_meta_path(args.db)) as f:
+        meta = json.load(f)
+    # Settings are read at import time, so point the app at the dataset first
+    os.environ["DATABASE_URL"] = f"sqlite:///{args.db}"
+
+    samples, wall = asyncio.run(_run_workloads(args, meta["sizes"]))
+    all_samples = [s for values in samples.values() for s in values]
+    report = {
+        "meta": {
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "dataset": meta,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+            "wall_seconds": round(wall, 3),
+        },
+        "overall": _summarize(all_samples, wall),
+        "workloads": {name: _summarize(values, wall) for name, values in sorted(samples.items()) if values},
+    }
+    output = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output)
+    print(output)
+
+
+# metric -> True when a larger value is better
+COMPARED_METRICS = {"throughput_rps": True, "p50_ms": False, "p95_ms": False, "p99_ms": False, "mean_queries": False}
+
+
+def cmd_compare(args):
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    regressions = []
+    rows = []
+    sections = [("overall", baseline["overall"], candidate["overall"])] + [
+        (name, baseline["workloads"][name], candidate["workloads"][name])
+        for name in sorted(set(baseline["workloads"]) & set(candidate["workloads"]))
+    ]
+    for name, old, new in sections:
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            before, after = old.get(metric, 0), new.get(metric, 0)
+            if before == 0:
+                continue
+            change = (after - before) / before * 100
+            worse = -change if higher_is_better else change
+            rows.append({"workload": name, "metric": metric, "baseline": before,
+                         "candidate": after, "change_percent": round(change, 2)})
+            if worse > args.threshold:
+                regressions.append(rows[-1])
+
+    print(json.dumps({"threshold_percent": args.threshold, "regressions": regressions, "diff": rows}, indent=2))
+    if regressions:
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Playlist-KE benchmark harness")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    gen = sub.add_parser("generate", help="Create a synthetic SQLite dataset")
+    gen.add_argument("--db", required=True)
+    gen.add_argument("--scale", type=float, default=0.01, help="1.0 = 1M songs, 10M analytics rows")
+    gen.add_argument("--seed", type=int, default=42)
+    gen.set_defaults(func=cmd_generate)
+
+    run = sub.add_parser("run", help="Run the scripted workload mix")
+    run.add_argument("--db", required=True)
+    run.add_argument("--requests", type=int, default=5000)
+    run.add_argument("--concurrency", type=int, default=16)
+    run.add_argument("--users", type=int, default=20, help="Virtual users to log in")
+    run.add_argument("--workload", action="append", help="Only run these workloads (repeatable)")
+    run.add_argument("--seed", type=int, default=42)
+    run.add_argument("--out")
+    run.set_defaults(func=cmd_run)
+
+    compare = sub.add_parser("compare", help="Diff two run reports")
+    compare.add_argument("baseline")
+    compare.add_argument("candidate")
+    compare.add_argument("--threshold", type=float, default=10.0, help="Allowed regression in percent")
+    compare.set_defaults(func=cmd_compare)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
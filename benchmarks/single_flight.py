@@ -0,0 +1,98 @@
+"""Load test for single-flight coalescing of hot identical reads.
+
+Fires bursts of identical concurrent requests at the coalesced routes
+(``/charts/weekly``, ``/songs/trending``, ``/analytics/overview``) with coalescing
+on and off, and reports SQL statements per burst. With coalescing, the statements
+spent on the shared computation stay constant as concurrency grows; what remains
+per request is authentication (one user lookup on ``/analytics/overview``).
+
+Uses a database from ``benchmarks.run generate``:
+
+    python -m benchmarks.run generate --db bench.db --scale 0.01
+    python -m benchmarks.single_flight --db bench.db --concurrency 1 10 100 500
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import time
+
+API = "/api/v1"
+
+
+async def _burst(client, path: str, headers: dict, concurrency: int):
+    responses = await asyncio.gather(*(client.get(path, headers=headers) for _ in range(concurrency)))
+    failed = [r.status_code for r in responses if r.status_code != 200]
+    if failed:
+        raise SystemExit(f"{path}: unexpected status codes {sorted(set(failed))}")
+
+
+async def _run(args):
+    import httpx
+    from sqlalchemy import event
+    from app.config import settings
+    from app.database.connection import engine
+    from app.main import app
+    from app.services import create_access_token
+    from app.services.coalesce_service import single_flight
+
+    # One client address for every request; measure coalescing, not the limiter
+    settings.RATE_LIMIT_ENABLED = False
+    statements = [0]
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        statements[0] += 1
+
+    with sqlite3.connect(args.db) as conn:
+        week, year = conn.execute(
+            "SELECT c.week, c.year FROM charts c JOIN chart_entries e ON e.chart_id = c.id "
+            "GROUP BY c.id ORDER BY COUNT(*) DESC LIMIT 1"
+        ).fetchone()
+        user_id = conn.execute("SELECT MIN(id) FROM users").fetchone()[0]
+    auth = {"Authorization": f"Bearer {create_access_token({'sub': str(user_id)})}"}
+    targets = [
+        ("charts.weekly", f"{API}/charts/weekly?week={week}&year={year}", {}),
+        ("songs.trending", f"{API}/songs/trending?limit=50", {}),
+        ("analytics.overview", f"{API}/analytics/overview", auth),
+    ]
+    routes = list(settings.SINGLE_FLIGHT_ROUTES)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        # Warm up connections, caches and lazy imports
+        for _, path, headers in targets:
+            await _burst(client, path, headers, 2)
+
+        print(f"{'route':<20} {'concurrency':>11} {'mode':>5} {'statements':>11} {'per request':>12} "
+              f"{'leaders':>8} {'wall ms':>8}")
+        for route, path, headers in targets:
+            for concurrency in args.concurrency:
+                for mode in ("off", "on"):
+                    settings.SINGLE_FLIGHT_ROUTES = routes if mode == "on" else []
+                    statements[0] = 0
+                    leaders = single_flight.leaders
+                    started = time.perf_counter()
+                    await _burst(client, path, headers, concurrency)
+                    wall = time.perf_counter() - started
+                    led = single_flight.leaders - leaders if mode == "on" else concurrency
+                    print(f"{route:<20} {concurrency:>11} {mode:>5} {statements[0]:>11} "
+                          f"{statements[0] / concurrency:>12.2f} {led:>8} {wall * 1000:>8.1f}")
+    settings.SINGLE_FLIGHT_ROUTES = routes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Single-flight coalescing load test")
+    parser.add_argument("--db", required=True, help="Database created by benchmarks.run generate")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 100, 500])
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        raise SystemExit(f"{args.db} not found; create it with python -m benchmarks.run generate")
+    os.environ["DATABASE_URL"] = f"sqlite:///{args.db}"
+    os.environ.setdefault("SCHEDULER_ENABLED", "false")
+    asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
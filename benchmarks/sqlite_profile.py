@@ -0,0 +1,121 @@
+"""Mixed read/write throughput on SQLite with and without the performance profile.
+
+Usage: python -m benchmarks.sqlite_profile --threads 8 --seconds 5 --write-ratio 0.2
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from sqlalchemy import create_engine, select, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session, sessionmaker
+from app.database.connection import Base
+from app.database.sqlite import WriteSerializer, apply_sqlite_profile, install_write_serializer
+from app.models import Artist, Song
+
+SEED_ARTISTS = 200
+SEED_SONGS = 20_000
+
+
+def build_session_factory(path: str, profiled: bool):
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    session_class = type("BenchSession", (Session,), {})
+    if profiled:
+        apply_sqlite_profile(engine, mmap_size=268435456, cache_size=-65536)
+        install_write_serializer(session_class, WriteSerializer())
+    Base.metadata.create_all(bind=engine)
+    return engine, sessionmaker(class_=session_class, bind=engine, autoflush=False)
+
+
+def seed(factory):
+    db = factory()
+    db.execute(Artist.__table__.insert(), [{"name": f"Artist {i}"} for i in range(SEED_ARTISTS)])
+    db.execute(Song.__table__.insert(), [
+        {"title": f"Song {i}", "artist_id": i % SEED_ARTISTS + 1, "duration_seconds": 180, "stream_count": 0}
+        for i in range(SEED_SONGS)
+    ])
+    db.commit()
+    db.close()
+
+
+def worker(factory, deadline, write_ratio, stats, lock):
+    rng = random.Random()
+    reads = writes = errors = 0
+    latencies = []
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        db = factory()
+        try:
+            if rng.random() < write_ratio:
+                db.add(Song(title="bench", artist_id=rng.randint(1, SEED_ARTISTS), duration_seconds=200))
+                db.execute(
+                    update(Song)
+                    .where(Song.id == rng.randint(1, SEED_SONGS))
+                    .values(stream_count=Song.stream_count + 1)
+                )
+                db.commit()
+                writes += 1
+            else:
+                db.execute(
+                    select(Song).where(Song.artist_id == rng.randint(1, SEED_ARTISTS)).limit(20)
+                ).scalars().all()
+                reads += 1
+            latencies.append(time.perf_counter() - start)
+        except OperationalError:
+            db.rollback()
+            errors += 1
+        finally:
+            db.close()
+    with lock:
+        stats["reads"] += reads
+        stats["writes"] += writes
+        stats["errors"] += errors
+        stats["latencies"].extend(latencies)
+
+
+def run(profiled: bool, threads: int, seconds: float, write_ratio: float) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine, factory = build_session_factory(os.path.join(tmp, "bench.db"), profiled)
+        seed(factory)
+
+        stats = {"reads": 0, "writes": 0, "errors": 0, "latencies": []}
+        lock = threading.Lock()
+        deadline = time.perf_counter() + seconds
+        pool = [
+            threading.Thread(target=worker, args=(factory, deadline, write_ratio, stats, lock))
+            for _ in range(threads)
+        ]
+        for t in pool:
+            t.start()
+        for t in pool:
+            t.join()
+        engine.dispose()
+
+    latencies = sorted(stats.pop("latencies")) or [0.0]
+    return {
+        "profile": "tuned" if profiled else "default",
+        "ops_per_second": round((stats["reads"] + stats["writes"]) / seconds, 1),
+        "reads": stats["reads"],
+        "writes": stats["writes"],
+        "lock_errors": stats["errors"],
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 2),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99)] * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite mixed read/write benchmark")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    args = parser.parse_args()
+
+    results = [run(profiled, args.threads, args.seconds, args.write_ratio) for profiled in (False, True)]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
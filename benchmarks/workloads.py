@@ -0,0 +1,191 @@
+"""Scripted request mix covering every router in app/routers.
+
+Each workload returns the request to issue as ``(method, path, options)``, where
+options may carry ``params``, ``json``, ``data`` and ``auth`` (True to send the
+virtual user's bearer token).
+"""
+import random
+from datetime import datetime, timedelta
+from benchmarks.datagen import GENRES, REGIONS, BENCH_PASSWORD, bench_email
+
+API = "/api/v1"
+
+
+class WorkloadContext:
+    """Dataset sizes plus per-run state shared by the workloads"""
+
+    def __init__(self, sizes: dict, tokens: dict):
+        self.sizes = sizes
+        # user id -> bearer token, created by the runner before timing starts
+        self.tokens = tokens
+        # user id -> ids of playlists that user created during the run
+        self.own_playlists = {user_id: [] for user_id in tokens}
+        self.chart_count = sizes["chart_years"] * 52 * (len(REGIONS) + 1)
+
+    def song_id(self, rng: random.Random) -> int:
+        return rng.randint(1, self.sizes["songs"])
+
+    def artist_id(self, rng: random.Random) -> int:
+        return rng.randint(1, self.sizes["artists"])
+
+    def playlist_id(self, rng: random.Random) -> int:
+        return rng.randint(1, self.sizes["playlists"])
+
+
+def _login(rng, ctx, user_id):
+    return "POST", f"{API}/auth/login", {"data": {"username": bench_email(user_id), "password": BENCH_PASSWORD}}
+
+
+def _me(rng, ctx, user_id):
+    return "GET", f"{API}/auth/me", {"auth": True}
+
+
+def _songs_list(rng, ctx, user_id):
+    return "GET", f"{API}/songs/", {"params": {"skip": rng.randint(0, 1000), "limit": 50}}
+
+
+def _songs_by_genre(rng, ctx, user_id):
+    return "GET", f"{API}/songs/", {"params": {"genre": rng.choice(GENRES), "limit": 50}}
+
+
+def _songs_trending(rng, ctx, user_id):
+    return "GET", f"{API}/songs/trending", {"params": {"limit": 20}}
+
+
+def _songs_new(rng, ctx, user_id):
+    return "GET", f"{API}/songs/new-releases", {"params": {"limit": 20}}
+
+
+def _song_get(rng, ctx, user_id):
+    return "GET", f"{API}/songs/{ctx.song_id(rng)}", {}
+
+
+def _artists_list(rng, ctx, user_id):
+    return "GET", f"{API}/artists/", {"params": {"region": rng.choice(REGIONS), "limit": 50}}
+
+
+def _artist_get(rng, ctx, user_id):
+    return "GET", f"{API}/artists/{ctx.artist_id(rng)}", {}
+
+
+def _artist_songs(rng, ctx, user_id):
+    return "GET", f"{API}/artists/{ctx.artist_id(rng)}/songs", {"params": {"limit": 50}}
+
+
+def _playlists_list(rng, ctx, user_id):
+    return "GET", f"{API}/playlists/", {"params": {"skip": rng.randint(0, 1000), "limit": 50}}
+
+
+def _playlist_get(rng, ctx, user_id):
+    return "GET", f"{API}/playlists/{ctx.playlist_id(rng)}", {}
+
+
+def _playlists_of_user(rng, ctx, user_id):
+    return "GET", f"{API}/playlists/user/{rng.randint(1, ctx.sizes['users'])}", {"auth": True}
+
+
+def _playlist_create(rng, ctx, user_id):
+    return "POST", f"{API}/playlists/", {"auth": True, "json": {"name": f"Bench {rng.random():.6f}"}}
+
+
+def _playlist_add_song(rng, ctx, user_id):
+    own = ctx.own_playlists[user_id]
+    if not own:
+        return _playlist_create(rng, ctx, user_id)
+    return "POST", f"{API}/playlists/{rng.choice(own)}/songs", {
+        "auth": True, "json": {"song_id": ctx.song_id(rng)}
+    }
+
+
+def _charts_list(rng, ctx, user_id):
+    return "GET", f"{API}/charts/", {"params": {"limit": 50}}
+
+
+def _charts_weekly(rng, ctx, user_id):
+    year, week, _ = datetime.now().isocalendar()
+    return "GET", f"{API}/charts/weekly", {"params": {"week": week, "year": year, "region": rng.choice(REGIONS)}}
+
+
+def _chart_get(rng, ctx, user_id):
+    return "GET", f"{API}/charts/{rng.randint(1, ctx.chart_count)}", {}
+
+
+def _chart_history(rng, ctx, user_id):
+    return "GET", f"{API}/charts/history/{ctx.song_id(rng)}", {}
+
+
+def _analytics_overview(rng, ctx, user_id):
+    return "GET", f"{API}/analytics/overview", {"auth": True}
+
+
+def _analytics_regions(rng, ctx, user_id):
+    return "GET", f"{API}/analytics/regions", {"auth": True}
+
+
+def _analytics_song(rng, ctx, user_id):
+    return "GET", f"{API}/analytics/songs/{ctx.song_id(rng)}", {"auth": True}
+
+
+def _analytics_trends(rng, ctx, user_id):
+    entity = rng.choice(["song", "artist", "region", "genre"])
+    key = {
+        "song": lambda: ctx.song_id(rng),
+        "artist": lambda: ctx.artist_id(rng),
+        "region": lambda: rng.choice(REGIONS),
+        "genre": lambda: rng.choice(GENRES),
+    }[entity]()
+    end = datetime.now()
+    return "GET", f"{API}/analytics/trends", {"auth": True, "params": {
+        "entity": entity, "key": key, "metric": ["streams", "listeners"], "bucket": "day",
+        "start": (end - timedelta(days=365)).isoformat(), "end": end.isoformat(),
+    }}
+
+
+def _user_get(rng, ctx, user_id):
+    return "GET", f"{API}/users/{rng.randint(1, ctx.sizes['users'])}", {}
+
+
+def _user_playlists(rng, ctx, user_id):
+    return "GET", f"{API}/users/{rng.randint(1, ctx.sizes['users'])}/playlists", {"auth": True}
+
+
+# name -> (relative weight, request builder)
+WORKLOADS = {
+    "auth.login": (1, _login),
+    "auth.me": (4, _me),
+    "songs.list": (8, _songs_list),
+    "songs.by_genre": (6, _songs_by_genre),
+    "songs.trending": (10, _songs_trending),
+    "songs.new_releases": (6, _songs_new),
+    "songs.get": (12, _song_get),
+    "artists.list": (4, _artists_list),
+    "artists.get": (6, _artist_get),
+    "artists.songs": (5, _artist_songs),
+    "playlists.list": (5, _playlists_list),
+    "playlists.get": (8, _playlist_get),
+    "playlists.of_user": (3, _playlists_of_user),
+    "playlists.create": (1, _playlist_create),
+    "playlists.add_song": (2, _playlist_add_song),
+    "charts.list": (2, _charts_list),
+    "charts.weekly": (8, _charts_weekly),
+    "charts.get": (3, _chart_get),
+    "charts.history": (3, _chart_history),
+    "analytics.overview": (2, _analytics_overview),
+    "analytics.regions": (2, _analytics_regions),
+    "analytics.song": (3, _analytics_song),
+    "analytics.trends": (3, _analytics_trends),
+    "users.get": (3, _user_get),
+    "users.playlists": (2, _user_playlists),
+}
+
+
+def selection(only=None):
+    """Workload names and cumulative weights for ``random.choices``"""
+    names = [name for name in WORKLOADS if not only or name in only]
+    if not names:
+        raise ValueError(f"No workloads match {only}")
+    cumulative, total = [], 0
+    for name in names:
+        total += WORKLOADS[name][0]
+        cumulative.append(total)
+    return names, cumulative
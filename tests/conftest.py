@@ -0,0 +1,44 @@
+import os
+import tempfile
+import uuid
+import pytest
+
+# Settings are read at import time, so point the app at a scratch database first
+_tmp = tempfile.mkdtemp(prefix="playlist-ke-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmp}/test.db")
+os.environ.setdefault("SCHEDULER_ENABLED", "false")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+# Fail fast instead of hanging when a test exhausts the connection pool
+os.environ.setdefault("DB_POOL_TIMEOUT_SECONDS", "5")
+
+
+@pytest.fixture(scope="session")
+def app_db():
+    """Create the schema of the scratch database once per run"""
+    from app.database.connection import init_db
+
+    init_db()
+
+
+@pytest.fixture
+def make_user(app_db):
+    """Create a user and return (user id, bearer headers); emails get a unique suffix"""
+    from app.database.connection import SessionLocal
+    from app.models import User
+    from app.services import create_access_token, get_password_hash
+
+    def make(email: str, password: str = "secret-password", is_admin: bool = False):
+        local, domain = email.split("@")
+        email = f"{local}+{uuid.uuid4().hex[:8]}@{domain}"
+        db = SessionLocal()
+        try:
+            user = User(email=email, name=email.split("@")[0], hashed_password=get_password_hash(password),
+                        is_admin=is_admin, is_active=True)
+            db.add(user)
+            db.commit()
+            headers = {"Authorization": f"Bearer {create_access_token({'sub': str(user.id)})}"}
+            return user.id, headers
+        finally:
+            db.close()
+
+    return make
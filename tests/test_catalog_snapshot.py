@@ -0,0 +1,69 @@
+import uuid
+import pytest
+from app.database.connection import SessionLocal
+from app.models import Artist
+from app.services.catalog_snapshot import Catalog, build_snapshot
+
+
+@pytest.fixture
+def db(app_db):
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def _artist(db) -> int:
+    artist = Artist(name=f"Snapshot {uuid.uuid4().hex[:8]}")
+    db.add(artist)
+    db.commit()
+    return artist.id
+
+
+@pytest.fixture
+def catalog(db, tmp_path):
+    _artist(db)
+    path = str(tmp_path / "catalog.bin")
+    build_snapshot(db, path)
+    return Catalog(path, check_seconds=0)
+
+
+def test_disabled_catalog_ignores_writes():
+    catalog = Catalog("")
+    catalog.mark_written("songs", [1, 2])
+    catalog.mark_written("artists", None)
+    assert catalog._written == {"songs": {}, "artists": {}}
+    assert catalog._written_all == {}
+
+
+def test_written_ids_come_from_the_database(db, catalog):
+    artist_id = db.query(Artist.id).order_by(Artist.id).first()[0]
+    assert catalog.get("artists", artist_id).id == artist_id
+    catalog.mark_written("artists", [artist_id])
+    assert catalog.get("artists", artist_id) is None
+
+
+def test_bulk_writes_bypass_the_snapshot_until_the_next_build(db, catalog):
+    artist_id = db.query(Artist.id).order_by(Artist.id).first()[0]
+    catalog.mark_written("artists", None)
+    assert catalog.get("artists", artist_id) is None
+    assert catalog.page(db, "artists", 0, 10) is None
+    # Songs are deleted in bulk along with their artist
+    assert catalog.page(db, "songs", 0, 10) is None
+
+    build_snapshot(db, catalog.path)
+    assert catalog.get("artists", artist_id).id == artist_id
+    assert catalog.page(db, "artists", 0, 10) is not None
+
+
+def test_pages_include_rows_added_after_the_build(db, catalog):
+    count = db.query(Artist).count()
+    assert len(catalog.page(db, "artists", 0, 1000)) == count
+
+    new_id = _artist(db)
+    catalog.mark_written("artists", [new_id])
+    assert catalog.page(db, "artists", 0, 1000) is None
+
+    build_snapshot(db, catalog.path)
+    assert new_id in [artist.id for artist in catalog.page(db, "artists", 0, 1000)]
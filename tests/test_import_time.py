@@ -0,0 +1,11 @@
+from benchmarks.import_time import LAZY_MODULES, profile_import
+
+BUDGET_MS = 1500
+
+
+def test_app_main_imports_within_budget():
+    # Best of three cold interpreters, as benchmarks.import_time reports it
+    total, timings = min((profile_import("app.main") for _ in range(3)), key=lambda run: run[0])
+    assert total / 1000 <= BUDGET_MS, f"import of app.main took {total / 1000:.0f} ms"
+    eager = sorted(name for name in timings if name.split(".")[0] in LAZY_MODULES)
+    assert not eager, f"imported at startup: {', '.join(eager)}"
@@ -0,0 +1,69 @@
+from datetime import datetime
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import func
+from app.database.connection import SessionLocal
+from app.models import Artist, ListenerSketch, Song
+from app.services.analytics_service import AnalyticsService
+
+API = "/api/v1/analytics"
+
+
+@pytest.fixture
+def client(app_db):
+    from app.main import app
+
+    return TestClient(app)
+
+
+@pytest.fixture
+def song_id(app_db):
+    db = SessionLocal()
+    try:
+        artist = Artist(name="Listen Artist")
+        db.add(artist)
+        db.flush()
+        song = Song(title="Listen Song", artist_id=artist.id, duration_seconds=180)
+        db.add(song)
+        db.commit()
+        return song.id
+    finally:
+        db.close()
+
+
+def _sketched(song_id: int):
+    db = SessionLocal()
+    try:
+        rows = db.query(func.count()).filter(ListenerSketch.song_id == song_id).scalar()
+        return rows, AnalyticsService(db).get_song_analytics(song_id)
+    finally:
+        db.close()
+
+
+def test_listens_feed_analytics_and_sketches(client, make_user, song_id):
+    listens = [{"song_id": song_id, "region": "Nairobi", "listened_at": datetime(2026, 9, 1, 8, m).isoformat()}
+               for m in range(3)]
+    for email in ("listener-a@example.com", "listener-b@example.com"):
+        _, headers = make_user(email)
+        # The same user on the same day twice: summed counts would see them twice
+        for _ in range(2):
+            response = client.post(f"{API}/listens", json={"listens": listens}, headers=headers)
+            assert response.status_code == 201
+            assert response.json()["recorded"] == 3
+
+    rows, analytics = _sketched(song_id)
+    assert rows > 0
+    assert analytics["total_streams"] == 12
+    assert analytics["total_unique_listeners"] == 2
+
+
+def test_unknown_songs_are_rejected(client, make_user, song_id):
+    _, headers = make_user("listener-c@example.com")
+    response = client.post(f"{API}/listens", json={"listens": [{"song_id": song_id + 10_000}]}, headers=headers)
+    assert response.status_code == 404
+    assert _sketched(song_id)[0] == 0
+
+
+def test_listens_require_authentication(client, song_id):
+    response = client.post(f"{API}/listens", json={"listens": [{"song_id": song_id}]})
+    assert response.status_code == 401
@@ -0,0 +1,157 @@
+import uuid
+import pytest
+from app.database.connection import SessionLocal
+from app.models import Artist
+# Registers the flush hook that writes change_log records
+import app.services.change_log  # noqa: F401
+from app.services.checkpoint_service import get_checkpoint
+from app.services.outbox_service import OutboxDispatcher, head
+from app.services.scheduler_service import release_lease, utcnow
+
+
+@pytest.fixture
+def name(app_db):
+    """A consumer name no other test has checkpointed"""
+    return f"test-{uuid.uuid4().hex[:8]}"
+
+
+def _artists(count: int = 2) -> list:
+    """Commit ``count`` new artists; returns their ids"""
+    db = SessionLocal()
+    try:
+        artists = [Artist(name=f"Outbox {uuid.uuid4().hex[:8]}") for _ in range(count)]
+        db.add_all(artists)
+        db.commit()
+        return [artist.id for artist in artists]
+    finally:
+        db.close()
+
+
+def _checkpoint(name: str) -> int:
+    db = SessionLocal()
+    try:
+        return int(get_checkpoint(db, f"outbox:{name}", "0"))
+    finally:
+        db.close()
+
+
+def _head() -> int:
+    db = SessionLocal()
+    try:
+        return head(db)
+    finally:
+        db.close()
+
+
+class Recorder:
+    def __init__(self, fail_times: int = 0):
+        self.fail_times = fail_times
+        self.batches = []
+
+    def __call__(self, records):
+        if self.fail_times:
+            self.fail_times -= 1
+            raise RuntimeError("handler down")
+        self.batches.append([record.entity_id for record in records])
+
+    @property
+    def ids(self) -> list:
+        return [entity_id for batch in self.batches for entity_id in batch]
+
+
+def _durable(dispatcher: OutboxDispatcher, name: str, handler, batch_size: int = 500):
+    return dispatcher.register(name, handler, entities=["artists"], batch_size=batch_size, durable=True)
+
+
+def test_local_consumers_start_at_the_head(name):
+    dispatcher = OutboxDispatcher(session_factory=SessionLocal)
+    recorder = Recorder()
+    dispatcher.register(name, recorder, entities=["artists"])
+    assert dispatcher.poll() == 0
+    ids = _artists(3)
+    assert dispatcher.poll() == 3
+    assert recorder.ids == ids
+
+
+def test_durable_checkpoint_survives_a_restart(name):
+    first = OutboxDispatcher(session_factory=SessionLocal)
+    recorder = Recorder()
+    _durable(first, name, recorder, batch_size=2)
+    first.replay(name, _head())
+    ids = _artists(3)
+    assert first.poll() == 3
+    assert recorder.batches == [ids[:2], ids[2:]]
+    assert _checkpoint(name) == first.consumers[name].position
+
+    # A new process takes over once the old lease has lapsed and resumes from the checkpoint
+    db = SessionLocal()
+    release_lease(db, f"outbox:{name}", first.owner, utcnow())
+    db.close()
+    restarted = OutboxDispatcher(session_factory=SessionLocal)
+    resumed = Recorder()
+    _durable(restarted, name, resumed)
+    more = _artists(1)
+    assert restarted.poll() == 1
+    assert resumed.ids == more
+
+
+def test_lease_hands_over_without_redelivery(name):
+    holder, standby = OutboxDispatcher(session_factory=SessionLocal), OutboxDispatcher(session_factory=SessionLocal)
+    held, waiting = Recorder(), Recorder()
+    _durable(holder, name, held)
+    _durable(standby, name, waiting)
+    holder.replay(name, _head())
+    ids = _artists(2)
+    assert holder.poll() == 2
+
+    later = _artists(1)
+    # Only the lease holder delivers
+    assert standby.poll() == 0
+    assert waiting.ids == []
+
+    db = SessionLocal()
+    release_lease(db, f"outbox:{name}", holder.owner, utcnow())
+    db.close()
+    assert standby.poll() == 1
+    assert held.ids == ids and waiting.ids == later
+    # And the old holder is locked out now
+    _artists(1)
+    assert holder.poll() == 0
+
+
+def test_failed_batch_is_retried(name):
+    dispatcher = OutboxDispatcher(session_factory=SessionLocal)
+    recorder = Recorder(fail_times=1)
+    consumer = _durable(dispatcher, name, recorder)
+    dispatcher.replay(name, _head())
+    start = consumer.position
+    ids = _artists(2)
+
+    assert dispatcher.poll() == 0
+    assert consumer.failures == 1
+    assert consumer.last_error == "RuntimeError: handler down"
+    assert consumer.position == start and _checkpoint(name) == start
+
+    assert dispatcher.poll() == 2
+    assert recorder.ids == ids
+    assert consumer.last_error is None
+    assert _checkpoint(name) == consumer.position > start
+
+
+def test_replay_from_an_offset(name):
+    dispatcher = OutboxDispatcher(session_factory=SessionLocal)
+    recorder = Recorder()
+    consumer = _durable(dispatcher, name, recorder)
+    dispatcher.replay(name, _head())
+    start = consumer.position
+    ids = _artists(3)
+    assert dispatcher.poll() == 3
+    first_record = start + 1
+
+    dispatcher.replay(name, first_record)
+    assert _checkpoint(name) == first_record
+    assert dispatcher.poll() == 2
+    assert recorder.ids == ids + ids[1:]
+
+    with pytest.raises(KeyError):
+        dispatcher.replay("no-such-consumer", 0)
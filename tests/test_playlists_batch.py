@@ -0,0 +1,56 @@
+import pytest
+from fastapi.testclient import TestClient
+from app.database.connection import SessionLocal
+from app.models import Playlist
+
+API = "/api/v1/playlists"
+
+
+@pytest.fixture
+def client(app_db):
+    from app.main import app
+
+    return TestClient(app)
+
+
+@pytest.fixture
+def playlists(make_user):
+    owner_id, owner_headers = make_user("batch-owner@example.com")
+    _, other_headers = make_user("batch-other@example.com")
+    db = SessionLocal()
+    try:
+        public = Playlist(name="Public", is_public=True, user_id=owner_id)
+        private = Playlist(name="Private", is_public=False, user_id=owner_id)
+        db.add_all([public, private])
+        db.commit()
+        return public.id, private.id, owner_headers, other_headers
+    finally:
+        db.close()
+
+
+def _batch(client, ids, headers=None):
+    response = client.get(f"{API}/batch", params={"ids": ",".join(map(str, ids))}, headers=headers or {})
+    assert response.status_code == 200
+    body = response.json()
+    return [item["id"] for item in body["items"]], body["missing"]
+
+
+def test_anonymous_callers_only_get_public_playlists(client, playlists):
+    public, private, _, _ = playlists
+    assert _batch(client, [public, private, 999_999]) == ([public], [private, 999_999])
+
+
+def test_other_users_do_not_see_private_playlists(client, playlists):
+    public, private, _, other = playlists
+    assert _batch(client, [private, public], other) == ([public], [private])
+
+
+def test_owner_gets_their_private_playlists(client, playlists):
+    public, private, owner, _ = playlists
+    assert _batch(client, [private, public], owner) == ([private, public], [])
+
+
+def test_invalid_token_is_rejected(client, playlists):
+    public, _, _, _ = playlists
+    response = client.get(f"{API}/batch", params={"ids": str(public)}, headers={"Authorization": "Bearer nope"})
+    assert response.status_code == 401
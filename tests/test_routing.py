@@ -0,0 +1,176 @@
+import threading
+import time
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from starlette.requests import Request
+from app.database.routing import ReplicaPool, RoutingSession, WriteStickiness
+
+
+def _sqlite_file(path, name: str):
+    engine = create_engine(f"sqlite:///{path / name}.db")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE whoami (name TEXT)"))
+        conn.execute(text("INSERT INTO whoami VALUES (:name)"), {"name": name})
+    return engine
+
+
+def _whoami(db) -> str:
+    return db.execute(text("SELECT name FROM whoami")).scalar()
+
+
+@pytest.fixture
+def databases(tmp_path):
+    primary = _sqlite_file(tmp_path, "primary")
+    replicas = [_sqlite_file(tmp_path, "replica1"), _sqlite_file(tmp_path, "replica2")]
+    yield primary, replicas
+    for engine in [primary, *replicas]:
+        engine.dispose()
+
+
+def _factory(primary, replicas, window: float = 5, interval: float = 30):
+    stickiness = WriteStickiness(window)
+    return sessionmaker(
+        class_=RoutingSession,
+        primary=primary,
+        replicas=ReplicaPool(replicas, health_check_interval=interval),
+        stickiness=stickiness
+    ), stickiness
+
+
+def _session(factory, read_only: bool, key: str = "client"):
+    db = factory()
+    db.info["client_key"] = key
+    db.info["read_only"] = read_only
+    return db
+
+
+def _request(method: str, authorization: str = None) -> Request:
+    headers = [(b"authorization", authorization.encode())] if authorization else []
+    return Request({"type": "http", "method": method, "headers": headers, "client": ("10.0.0.1", 1234)})
+
+
+@pytest.mark.parametrize("method, read_only", [("GET", True), ("HEAD", True), ("POST", False), ("PUT", False), ("DELETE", False)])
+def test_get_db_marks_only_reads_read_only(method, read_only):
+    from app.database.connection import get_db
+
+    dependency = get_db(_request(method, "Bearer reader"))
+    db = next(dependency)
+    try:
+        assert db.info["read_only"] is read_only
+    finally:
+        dependency.close()
+
+
+def test_read_only_session_reads_from_replica(databases):
+    primary, replicas = databases
+    factory, _ = _factory(primary, replicas)
+    with _session(factory, read_only=True) as db:
+        assert _whoami(db).startswith("replica")
+
+
+def test_write_session_uses_primary(databases):
+    primary, replicas = databases
+    factory, _ = _factory(primary, replicas)
+    with _session(factory, read_only=False) as db:
+        assert _whoami(db) == "primary"
+
+
+def test_session_pins_to_primary_after_writing(databases):
+    primary, replicas = databases
+    factory, _ = _factory(primary, replicas)
+    with _session(factory, read_only=True) as db:
+        db.execute(text("CREATE TABLE scratch (id INTEGER)"))
+        db.info["wrote"] = True
+        assert _whoami(db) == "primary"
+
+
+def test_replicas_are_used_round_robin(databases):
+    primary, replicas = databases
+    factory, _ = _factory(primary, replicas)
+    served = []
+    for _ in range(4):
+        with _session(factory, read_only=True) as db:
+            served.append(_whoami(db))
+    assert served == ["replica1", "replica2", "replica1", "replica2"]
+
+
+def test_unhealthy_replica_is_skipped(databases):
+    primary, replicas = databases
+    factory, _ = _factory(primary, replicas)
+    pool = factory.kw["replicas"]
+    pool._probe = lambda index: index != 0
+    served = set()
+    for _ in range(4):
+        with _session(factory, read_only=True) as db:
+            served.add(_whoami(db))
+    assert served == {"replica2"}
+
+
+def test_falls_back_to_primary_when_no_replica_is_healthy(databases, tmp_path):
+    primary, _ = databases
+    # The directory does not exist, so connecting (and the health check) fails
+    broken = create_engine(f"sqlite:///{tmp_path / 'missing' / 'replica.db'}")
+    factory, _ = _factory(primary, [broken])
+    with _session(factory, read_only=True) as db:
+        assert _whoami(db) == "primary"
+    broken.dispose()
+
+
+def test_health_is_rechecked_after_interval(databases):
+    primary, replicas = databases
+    factory, _ = _factory(primary, replicas[:1], interval=0.05)
+    pool = factory.kw["replicas"]
+    pool._probe = lambda index: False
+    assert pool.get_engine() is None
+
+    pool._probe = lambda index: True
+    assert pool.get_engine() is None  # still cached
+    time.sleep(0.06)
+    assert pool.get_engine() is replicas[0]
+
+
+def test_reads_stick_to_primary_after_a_write(databases):
+    primary, replicas = databases
+    factory, stickiness = _factory(primary, replicas, window=0.2)
+    with _session(factory, read_only=False, key="writer") as db:
+        db.execute(text("UPDATE whoami SET name = name"))
+        db.info["wrote"] = True
+        db.commit()
+
+    assert stickiness.is_sticky("writer")
+    assert not stickiness.is_sticky("someone-else")
+
+    time.sleep(0.25)
+    assert not stickiness.is_sticky("writer")
+
+
+def test_get_db_routes_sticky_client_to_primary():
+    from app.database.connection import get_db, write_stickiness
+    from app.database.routing import client_key
+
+    write_stickiness.mark(client_key("Bearer writer", "10.0.0.1"))
+    dependency = get_db(_request("GET", "Bearer writer"))
+    db = next(dependency)
+    try:
+        assert db.info["read_only"] is False
+    finally:
+        dependency.close()
+
+
+def test_concurrent_marks_keep_every_key():
+    stickiness = WriteStickiness(60, max_keys=50)
+    keys = [f"client-{i}" for i in range(400)]
+
+    def mark(chunk):
+        for key in chunk:
+            stickiness.mark(key)
+
+    threads = [threading.Thread(target=mark, args=(keys[i::8],)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Nothing expires within the window, so pruning at max_keys drops nothing
+    assert all(stickiness.is_sticky(key) for key in keys)
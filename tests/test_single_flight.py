@@ -0,0 +1,33 @@
+import asyncio
+import httpx
+import pytest
+from app.config import settings
+
+API = settings.API_V1_PREFIX
+# Above DB_POOL_SIZE + DB_MAX_OVERFLOW, so waiters holding connections would starve the computation
+CONCURRENCY = settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW + 25
+
+
+async def _burst(path: str, headers: dict):
+    from app.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=30) as client:
+        return await asyncio.wait_for(
+            asyncio.gather(*(client.get(path, headers=headers) for _ in range(CONCURRENCY))), 30
+        )
+
+
+@pytest.mark.parametrize("coalesce", [True, False])
+@pytest.mark.parametrize("path, authenticated", [
+    ("/analytics/overview", True),
+    ("/charts/weekly", False),
+    ("/songs/trending", False),
+])
+def test_concurrent_requests_above_pool_size_complete(make_user, monkeypatch, coalesce, path, authenticated):
+    routes = list(settings.SINGLE_FLIGHT_ROUTES) if coalesce else []
+    monkeypatch.setattr(settings, "SINGLE_FLIGHT_ROUTES", routes)
+    _, headers = make_user(f"burst-{coalesce}-{path.strip('/').replace('/', '-')}@example.com")
+
+    responses = asyncio.run(_burst(API + path, headers if authenticated else {}))
+    assert {response.status_code for response in responses} == {200}
@@ -0,0 +1,144 @@
+import asyncio
+import threading
+import time
+import pytest
+from sqlalchemy import Column, Integer, MetaData, Table, create_engine, insert
+from sqlalchemy.orm import Session, sessionmaker
+from app.database.sqlite import WriteSerializer, install_write_serializer
+
+
+class SerializedSession(Session):
+    pass
+
+
+rows = Table("rows", MetaData(), Column("id", Integer, primary_key=True))
+serializer = WriteSerializer()
+install_write_serializer(SerializedSession, serializer, timeout=2.0)
+
+
+def _factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'writes.db'}", connect_args={"check_same_thread": False})
+    rows.metadata.create_all(engine)
+    return engine, sessionmaker(bind=engine, class_=SerializedSession)
+
+
+def _write(factory):
+    with factory() as db:
+        db.execute(insert(rows))
+        db.commit()
+
+
+def _hold_lock(seconds: float) -> threading.Thread:
+    """Simulate a background job holding the write queue"""
+    held = threading.Event()
+
+    def job():
+        serializer.acquire()
+        held.set()
+        time.sleep(seconds)
+        serializer.release()
+
+    thread = threading.Thread(target=job)
+    thread.start()
+    held.wait()
+    return thread
+
+
+def test_event_loop_stays_responsive_while_a_job_holds_the_lock(tmp_path):
+    engine, factory = _factory(tmp_path)
+    job = _hold_lock(1.0)
+
+    async def scenario():
+        ticks = []
+
+        async def ticker():
+            while True:
+                ticks.append(time.monotonic())
+                await asyncio.sleep(0.01)
+
+        task = asyncio.create_task(ticker())
+        await asyncio.sleep(0.05)
+        started = time.monotonic()
+        # A session used directly on the loop thread, as in an async handler
+        _write(factory)
+        elapsed = time.monotonic() - started
+        await asyncio.sleep(0.05)
+        task.cancel()
+        return elapsed, ticks
+
+    try:
+        elapsed, ticks = asyncio.run(scenario())
+    finally:
+        job.join()
+        engine.dispose()
+
+    assert elapsed < 0.5
+    gaps = [b - a for a, b in zip(ticks, ticks[1:])]
+    assert max(gaps) < 0.5
+
+
+def test_threadpool_writes_wait_for_the_lock(tmp_path):
+    engine, factory = _factory(tmp_path)
+    job = _hold_lock(0.3)
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        started = time.monotonic()
+        await loop.run_in_executor(None, _write, factory)
+        return time.monotonic() - started
+
+    try:
+        elapsed = asyncio.run(scenario())
+    finally:
+        job.join()
+        engine.dispose()
+
+    assert elapsed >= 0.25
+
+
+def test_concurrent_posts_queue_on_the_app_serializer(make_user, monkeypatch):
+    import httpx
+    from app.database import connection
+    from app.main import app
+
+    if not connection.is_sqlite(connection.DATABASE_URL):
+        pytest.skip("the write serializer is only installed for SQLite")
+    app_serializer = connection.write_serializer
+    holders, granted, overlaps, on_loop = [], [], [], []
+    acquire, release = app_serializer.acquire, app_serializer.release
+
+    def spy_acquire(timeout=None):
+        try:
+            asyncio.get_running_loop()
+            on_loop.append(True)
+        except RuntimeError:
+            pass
+        acquired = acquire(timeout)
+        if acquired:
+            if holders:
+                overlaps.append(len(holders))
+            holders.append(threading.get_ident())
+            granted.append(True)
+        return acquired
+
+    def spy_release():
+        holders.pop()
+        release()
+
+    monkeypatch.setattr(app_serializer, "acquire", spy_acquire)
+    monkeypatch.setattr(app_serializer, "release", spy_release)
+    _, headers = make_user("serialized-writer@example.com")
+
+    async def burst():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(*(
+                client.post("/api/v1/artists/", json={"name": f"Queued {i}"}, headers=headers)
+                for i in range(20)
+            ))
+
+    responses = asyncio.run(burst())
+    assert {response.status_code for response in responses} == {200}
+    assert len(granted) >= 20
+    assert not overlaps
+    assert not on_loop
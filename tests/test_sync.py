@@ -0,0 +1,170 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+from app.database.connection import SessionLocal
+from app.models import Artist, ChangeLog, Playlist, PlaylistSong, Song
+from app.services import sync_service
+from app.services.checkpoint_service import set_checkpoint
+
+API = "/api/v1/sync/"
+
+
+@pytest.fixture
+def client(app_db):
+    from app.main import app
+
+    return TestClient(app)
+
+
+@pytest.fixture
+def library(make_user):
+    """A user with one playlist of two songs; returns (user id, headers, ids by entity)"""
+    user_id, headers = make_user("sync@example.com")
+    db = SessionLocal()
+    try:
+        artists = [Artist(name=f"Sync artist {i}") for i in range(3)]
+        db.add_all(artists)
+        db.flush()
+        songs = [Song(title=f"Sync song {i}", artist_id=artists[i % 3].id) for i in range(5)]
+        playlist = Playlist(name="Sync", user_id=user_id)
+        db.add_all([*songs, playlist])
+        db.flush()
+        tracks = [PlaylistSong(playlist_id=playlist.id, song_id=song.id, order=i) for i, song in enumerate(songs[:2])]
+        db.add_all(tracks)
+        db.commit()
+        ids = {
+            "artists": [a.id for a in artists], "songs": [s.id for s in songs],
+            "playlists": [playlist.id], "playlist_songs": [t.id for t in tracks],
+        }
+        return user_id, headers, ids
+    finally:
+        db.close()
+
+
+def _walk(client, headers, token=None, limit=2):
+    """Every page from ``token`` until has_more is false"""
+    pages = []
+    while True:
+        params = {"limit": limit, **({"token": token} if token else {})}
+        response = client.get(API, params=params, headers=headers)
+        assert response.status_code == 200
+        page = response.json()
+        pages.append(page)
+        token = page["token"]
+        if not page["has_more"]:
+            return pages
+
+
+def _ids(pages, entity):
+    return [row["id"] for page in pages for row in page.get(entity, [])]
+
+
+def _current(entity, user_id):
+    db = SessionLocal()
+    try:
+        if entity == "artists":
+            return db.execute(select(Artist.id).order_by(Artist.id)).scalars().all()
+        if entity == "songs":
+            return db.execute(select(Song.id).order_by(Song.id)).scalars().all()
+        if entity == "playlists":
+            return db.execute(select(Playlist.id).where(Playlist.user_id == user_id).order_by(Playlist.id)).scalars().all()
+        return db.execute(
+            select(PlaylistSong.id).join(Playlist).where(Playlist.user_id == user_id).order_by(PlaylistSong.id)
+        ).scalars().all()
+    finally:
+        db.close()
+
+
+def test_full_sync_walks_every_row_once(client, library):
+    user_id, headers, _ = library
+    pages = _walk(client, headers)
+    assert [page["reset"] for page in pages] == [True] + [False] * (len(pages) - 1)
+    for entity in ("artists", "songs", "playlists", "playlist_songs"):
+        assert _ids(pages, entity) == _current(entity, user_id)
+
+
+def test_full_sync_is_not_cut_short_by_rows_that_vanish_mid_page(client, library, monkeypatch):
+    user_id, headers, _ = library
+    load_many = sync_service.load_many
+
+    def losing_first(db, model, schema, ids):
+        # As if the first row was deleted between the id query and the load
+        return load_many(db, model, schema, ids[1:])
+
+    monkeypatch.setattr(sync_service, "load_many", losing_first)
+    pages = _walk(client, headers, limit=2)
+    artists = _current("artists", user_id)
+    # Every other artist is lost to the patch, the rest are all still synced
+    assert _ids(pages, "artists") == artists[1::2]
+    assert _ids(pages, "playlists") == _current("playlists", user_id)
+
+
+def test_delta_sync_after_full_sync(client, library):
+    user_id, headers, ids = library
+    token = _walk(client, headers, limit=100)[-1]["token"]
+    assert sync_service.decode_token(token)["m"] == "d"
+
+    db = SessionLocal()
+    try:
+        artist = db.get(Artist, ids["artists"][0])
+        artist.name = "Renamed"
+        song = Song(title="Brand new", artist_id=artist.id)
+        db.add(song)
+        db.delete(db.get(PlaylistSong, ids["playlist_songs"][0]))
+        db.commit()
+        song_id = song.id
+    finally:
+        db.close()
+
+    pages = _walk(client, headers, token=token)
+    assert not any(page.get("reset") for page in pages)
+    assert _ids(pages, "artists") == [ids["artists"][0]]
+    assert pages[0]["artists"][0]["name"] == "Renamed"
+    assert _ids(pages, "songs") == [song_id]
+    # Removing a track also moves its playlist's counters
+    assert _ids(pages, "playlists") == ids["playlists"]
+    assert [i for page in pages for i in page["deleted"]["playlist_songs"]] == [ids["playlist_songs"][0]]
+
+    # Nothing changed since the last token
+    again = _walk(client, headers, token=pages[-1]["token"])
+    assert len(again) == 1 and again[0]["token"] == pages[-1]["token"]
+
+
+def test_delta_pages_follow_the_limit(client, library):
+    user_id, headers, ids = library
+    token = _walk(client, headers, limit=100)[-1]["token"]
+    db = SessionLocal()
+    try:
+        for artist_id in ids["artists"]:
+            db.get(Artist, artist_id).name = "Bulk renamed"
+        db.commit()
+    finally:
+        db.close()
+
+    pages = _walk(client, headers, token=token, limit=2)
+    assert [page["has_more"] for page in pages] == [True, False]
+    assert sorted(_ids(pages, "artists")) == ids["artists"]
+
+
+def test_pruned_token_starts_a_full_sync(client, library):
+    _, headers, _ = library
+    token = _walk(client, headers, limit=100)[-1]["token"]
+    db = SessionLocal()
+    try:
+        head = db.execute(select(func.max(ChangeLog.id))).scalar()
+        set_checkpoint(db, sync_service.PRUNED_CHECKPOINT, str(head + 1))
+        db.commit()
+        pages = _walk(client, headers, token=token, limit=100)
+        assert pages[0]["reset"]
+    finally:
+        set_checkpoint(db, sync_service.PRUNED_CHECKPOINT, "0")
+        db.commit()
+        db.close()
+
+
+def test_invalid_token_is_rejected(client, library):
+    _, headers, _ = library
+    response = client.get(API, params={"token": "not-a-token"}, headers=headers)
+    assert response.status_code == 400
+    forged = sync_service.encode_token({"m": "f", "h": 0, "e": 9, "k": 0})
+    assert client.get(API, params={"token": forged}, headers=headers).status_code == 400
@@ -0,0 +1,112 @@
+import uuid
+from datetime import datetime, timedelta
+import pytest
+from fastapi.testclient import TestClient
+from app.database.connection import SessionLocal
+from app.models import RefreshToken
+from app.services.token_service import hash_token
+
+API = "/api/v1/auth"
+PASSWORD = "first-password"
+
+
+@pytest.fixture
+def client(app_db):
+    from app.main import app
+
+    return TestClient(app)
+
+
+@pytest.fixture
+def email(client):
+    email = f"tokens-{uuid.uuid4().hex[:8]}@example.com"
+    response = client.post(f"{API}/register", json={"email": email, "name": "Tokens", "password": PASSWORD})
+    assert response.status_code == 200
+    return email
+
+
+def _login(client, email: str, password: str = PASSWORD) -> dict:
+    response = client.post(f"{API}/login", data={"username": email, "password": password})
+    assert response.status_code == 200
+    return response.json()
+
+
+def _refresh(client, token: str):
+    return client.post(f"{API}/refresh", json={"refresh_token": token})
+
+
+def _bearer(tokens: dict) -> dict:
+    return {"Authorization": f"Bearer {tokens['access_token']}"}
+
+
+def test_refresh_rotates_the_token(client, email):
+    first = _login(client, email)["refresh_token"]
+    response = _refresh(client, first)
+    assert response.status_code == 200
+    second = response.json()
+    assert second["refresh_token"] != first
+    assert client.get(f"{API}/me", headers=_bearer(second)).json()["email"] == email
+    assert _refresh(client, second["refresh_token"]).status_code == 200
+
+
+def test_reused_token_is_rejected_and_revokes_its_family(client, email):
+    first = _login(client, email)["refresh_token"]
+    other_login = _login(client, email)["refresh_token"]
+    second = _refresh(client, first).json()["refresh_token"]
+
+    assert _refresh(client, first).status_code == 401
+    # Everything rotated from that login is gone, other logins are not
+    assert _refresh(client, second).status_code == 401
+    assert _refresh(client, other_login).status_code == 200
+
+
+def test_logout_revokes_the_login(client, email):
+    first = _login(client, email)["refresh_token"]
+    second = _refresh(client, first).json()["refresh_token"]
+    assert client.post(f"{API}/logout", json={"refresh_token": first}).status_code == 204
+    assert _refresh(client, second).status_code == 401
+    # Unknown tokens are ignored
+    assert client.post(f"{API}/logout", json={"refresh_token": "unknown"}).status_code == 204
+
+
+def test_password_change_revokes_other_sessions(client, email):
+    other = _login(client, email)["refresh_token"]
+    current = _login(client, email)
+    response = client.put(
+        f"{API}/me", json={"email": email, "name": "Tokens", "password": "second-password"}, headers=_bearer(current)
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert body["user"]["email"] == email
+
+    assert _refresh(client, other).status_code == 401
+    assert _refresh(client, current["refresh_token"]).status_code == 401
+    # The session that changed the password carries on with its new tokens
+    assert _refresh(client, body["refresh_token"]).status_code == 200
+    _login(client, email, "second-password")
+
+
+def test_same_password_revokes_nothing(client, email):
+    current = _login(client, email)
+    response = client.put(
+        f"{API}/me", json={"email": email, "name": "Tokens", "password": PASSWORD}, headers=_bearer(current)
+    )
+    assert response.status_code == 200
+    assert "refresh_token" not in response.json()
+    assert _refresh(client, current["refresh_token"]).status_code == 200
+
+
+def test_expired_token_is_rejected(client, email):
+    token = _login(client, email)["refresh_token"]
+    db = SessionLocal()
+    try:
+        row = db.query(RefreshToken).filter(RefreshToken.token_hash == hash_token(token)).one()
+        row.expires_at = datetime.utcnow() - timedelta(seconds=1)
+        db.commit()
+    finally:
+        db.close()
+    assert _refresh(client, token).status_code == 401
+
+
+def test_unknown_token_is_rejected(client, app_db):
+    assert _refresh(client, "not-a-token").status_code == 401